@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Module d'affichage du plateau du jeu Squadro
+Ce module produit le plateau ASCII de `Squadro.__str__` sans reconstruire la
+grille case par case. Le glyphe de chaque pion, pour chaque voie et chaque
+position, est précalculé une seule fois; le plateau est ensuite rempli en une
+seule opération à partir d'un gabarit. Le plateau rendu est conservé en cache
+(LRU) par position, sous forme d'entier compact (voir le module `moteur`).
+
+La grille compte 85 cases: 17 lignes de 5 colonnes, la case `5 * ligne + colonne`.
+Les lignes 2, 5, 8, 11 et 14 sont les rangées parcourues par les pions du joueur 1.
+Attributes:
+    TAILLE_CACHE (int): Le nombre maximal de plateaux conservés en cache.
+Functions:
+    * dessiner_plateau - Retourne le plateau d'une position (sans la légende).
+    * dessiner - Retourne le plateau complet d'une partie, légende comprise.
+"""
+from functools import lru_cache
+
+from moteur import BITS_JOUEUR, BITS_PION, MASQUE_PION
+
+TAILLE_CACHE = 4096
+
+_GABARIT = (
+    "                   . | . : | : : | : : | : . | .     \n"
+    "                     {}   . {} .   {}   . {} .   {}       \n"
+    "              ...    {}     {}     {}     {}     {}      .\n"
+    "            1 ──{}─{}─{}─{}─{}──\n"
+    "              ...    {}     {}     {}     {}     {}      .\n"
+    "              .      {}     {}     {}     {}     {}    ...\n"
+    "            2 ──{}─{}─{}─{}─{}──\n"
+    "              .      {}     {}     {}     {}     {}    ...\n"
+    "              ..     {}     {}     {}     {}     {}     ..\n"
+    "            3 ──{}─{}─{}─{}─{}──\n"
+    "              ..     {}     {}     {}     {}     {}     ..\n"
+    "              .      {}     {}     {}     {}     {}    ...\n"
+    "            4 ──{}─{}─{}─{}─{}──\n"
+    "              .      {}     {}     {}     {}     {}    ...\n"
+    "              ...    {}     {}     {}     {}     {}      .\n"
+    "            5 ──{}─{}─{}─{}─{}──\n"
+    "              ...    {}     {}     {}     {}     {}      .\n"
+    "                   . {} .   {}     {}     {}   . {} .     \n"
+    "                   : | : . | . : | : . | . : | :"
+)
+
+_RANGÉES = (2, 5, 8, 11, 14)
+_RANGÉE_VIDE = ("─────┼──", "──|──", "──|──", "──|──", "──┼─────")
+
+# Joueur 1: colonne et glyphe du pion de chaque rangée selon sa position
+_GLYPHES_J1 = (
+    (0, '□□ ○─┼──'), (0, '────□□ ○'), (1, '─□□ ○'), (2, '─□□ ○'), (3, '─□□ ○'),
+    (4, '─□□ ○───'), (4, '──┼─○ □□'), (4, '○ □□────'), (3, '○ □□─'), (2, '○ □□─'),
+    (1, '○ □□─'), (0, '───○ □□─'), (0, '○ □□─┼──'),
+)
+
+
+def _lignes_j2(position):
+    """Retourner la ligne du point (●) et celle du pion (█) d'une colonne du joueur 2."""
+    if position == 0:
+        return 1, 0
+    if position <= 5:
+        return 3 * position, 3 * position - 1
+    if position == 6:
+        return 15, 16
+    if position <= 11:
+        return 3 * (11 - position) + 1, 3 * (11 - position) + 2
+    return 0, 1
+
+
+def _superposer(colonne, case):
+    """Retourner le contenu d'une case après y avoir placé un pion du joueur 2."""
+    if case == '|':
+        return '█'
+    if colonne == 0:
+        return case[0:4] + '─█──'
+    if colonne == 4:
+        return '──█─' + case[4:]
+    return '──█──'
+
+
+def _construire_tables():
+    """Précalculer les cases de la grille vide et les glyphes de chaque pion.
+    Returns:
+        tuple: La grille vide, puis, pour chaque joueur, voie et position, les
+            cases modifiées par le pion; pour le joueur 2, la case du pion
+            dépend du contenu de la case et passe par une table de superposition.
+    """
+    vide = ['|'] * 85
+    for ligne in _RANGÉES:
+        vide[5 * ligne:5 * ligne + 5] = _RANGÉE_VIDE
+
+    cases_j1 = tuple(
+        tuple((5 * _RANGÉES[voie] + colonne, glyphe) for colonne, glyphe in _GLYPHES_J1)
+        for voie in range(5))
+
+    cases_j2 = []
+    for colonne in range(5):
+        contenus = {'|', _RANGÉE_VIDE[colonne]}
+        contenus.update(glyphe for col, glyphe in _GLYPHES_J1 if col == colonne)
+        superposition = {case: _superposer(colonne, case) for case in contenus}
+        cases_j2.append(tuple(
+            (5 * point + colonne, 5 * pion + colonne, superposition)
+            for point, pion in map(_lignes_j2, range(13))))
+
+    return tuple(vide), cases_j1, tuple(cases_j2)
+
+
+_VIDE, _CASES_J1, _CASES_J2 = _construire_tables()
+
+
+@lru_cache(maxsize=TAILLE_CACHE)
+def dessiner_plateau(code):
+    """Dessiner le plateau d'une position, sans la légende.
+    Args:
+        code (int): L'entier compact de la position; le joueur au trait est ignoré.
+    Returns:
+        str: Le plateau ASCII.
+    """
+    cases = list(_VIDE)
+    for voie in range(5):
+        indice, glyphe = _CASES_J1[voie][(code >> (voie * BITS_PION)) & MASQUE_PION]
+        cases[indice] = glyphe
+    code >>= BITS_JOUEUR
+    for colonne in range(5):
+        point, pion, superposition = _CASES_J2[colonne][(code >> (colonne * BITS_PION))
+                                                        & MASQUE_PION]
+        cases[point] = '●'
+        cases[pion] = superposition[cases[pion]]
+    return _GABARIT.format(*cases)
+
+
+def dessiner(noms, code):
+    """Dessiner le plateau complet d'une partie.
+    Args:
+        noms (list): Le nom des deux joueurs, le joueur 1 en premier.
+        code (int): L'entier compact de la position.
+    Returns:
+        str: La légende suivie du plateau ASCII.
+    """
+    return "            Légende:\n              □ = " + noms[0] + "\n              ■ = " \
+        + noms[1] + "\n\n" + dessiner_plateau(code & ((1 << 2 * BITS_JOUEUR) - 1))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Module d'anticipation du jeu Squadro
+Ce module fait réfléchir le robot pendant le temps de l'adversaire: un fil
+d'arrière-plan cherche la meilleure réponse à chacun des coups possibles de
+l'adversaire, les plus probables d'abord, et remplit au passage la table de
+transposition. Lorsque le vrai coup arrive, la recherche est interrompue
+aussitôt et la réponse déjà calculée pour la position obtenue, le cas échéant,
+est reprise par `Squadro.jouer_coup`.
+
+Les recherches sont menées par tranches de temps qui doublent à chaque passage
+sur les coups adverses; après chaque passage, les coups adverses sont
+reclassés du plus menaçant au moins menaçant. L'anticipation s'arrête d'elle-
+même après une durée limite, afin qu'une partie abandonnée n'occupe pas le
+processeur indéfiniment.
+Attributes:
+    TRANCHE (float): Le budget de temps du premier passage, par coup adverse.
+    LIMITE (float): La durée maximale d'une anticipation, en secondes.
+Classes:
+    * Anticipation - Recherche en arrière-plan des réponses aux coups adverses.
+"""
+import threading
+from time import perf_counter
+
+from moteur import gagnant, jouer_compact, pions_actifs
+from recherche import Recherche, évaluer
+
+TRANCHE = 0.02
+LIMITE = 60.0
+
+
+class Anticipation:
+    '''
+    Recherche en arrière-plan des réponses aux coups adverses.
+    '''
+
+    def __init__(self, limite=LIMITE):
+        """Constructeur de la classe Anticipation.
+        Args:
+            limite (float): La durée maximale d'une anticipation, en secondes.
+        """
+        self.limite = limite
+        self.réponses = {}
+        self._arrêt = threading.Event()
+        self._fil = None
+        # Sérialise le démarrage et l'arrêt, qu'un autre fil peut demander
+        self._verrou = threading.Lock()
+
+    def démarrer(self, code, table=None, finales=None, évaluation=évaluer):
+        """Commencer à réfléchir pendant que l'adversaire joue.
+        Une anticipation en cours est d'abord arrêtée.
+        Args:
+            code (int): L'entier compact de la position, l'adversaire au trait.
+            table (TableTransposition): La table de transposition du robot, que
+                l'anticipation remplit; elle ne doit pas servir à une autre
+                recherche avant l'arrêt de l'anticipation.
+            finales (TableFinale): Table de finales à consulter, le cas échéant.
+            évaluation (callable): Fonction d'évaluation des feuilles, celle du robot.
+        """
+        with self._verrou:
+            self._arrêter()
+            self.réponses = {}
+            self._arrêt.clear()
+            self._fil = threading.Thread(target=self._réfléchir,
+                                         args=(code, table, finales, évaluation), daemon=True)
+            self._fil.start()
+
+    def arrêter(self):
+        """Interrompre l'anticipation et attendre la fin du fil; l'arrêt peut
+        être demandé par un autre fil que celui qui l'a démarrée."""
+        with self._verrou:
+            self._arrêter()
+
+    def _arrêter(self):
+        if self._fil is not None:
+            self._arrêt.set()
+            self._fil.join()
+            self._fil = None
+
+    def conclure(self, code):
+        """Arrêter l'anticipation et retourner la réponse calculée pour une position.
+        Args:
+            code (int): L'entier compact de la position après le coup adverse.
+        Returns:
+            Rapport/None: La meilleure réponse trouvée, dont la durée est le temps
+                total consacré à la position; None si elle n'a pas été cherchée.
+        """
+        self.arrêter()
+        return self.réponses.get(code)
+
+    def _réfléchir(self, code, table, finales, évaluation):
+        recherche = Recherche(évaluation, table, finales, self._arrêt)
+        positions = [position for position in (jouer_compact(code, pion)
+                                               for pion in pions_actifs(code))
+                     if gagnant(position) is None]
+        fin = perf_counter() + self.limite
+        tranche = TRANCHE
+        while positions and not self._arrêt.is_set() and perf_counter() < fin:
+            for position in positions:
+                rapport = recherche.chercher(position, min(tranche, fin - perf_counter()))
+                précédent = self.réponses.get(position)
+                durée = rapport.durée + (précédent.durée if précédent is not None else 0.0)
+                if rapport.profondeur and (précédent is None
+                                           or rapport.profondeur >= précédent.profondeur):
+                    self.réponses[position] = rapport._replace(durée=durée)
+                elif précédent is not None:
+                    self.réponses[position] = précédent._replace(durée=durée)
+                if self._arrêt.is_set():
+                    return
+            # L'adversaire jouera vraisemblablement le coup qui nous laisse le pire score
+            positions.sort(key=lambda position: self.réponses[position].score
+                           if position in self.réponses else 0)
+            tranche *= 2
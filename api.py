@@ -2,16 +2,241 @@
 """Module d'API du jeu Squadro
 Ce module permet d'interagir avec le serveur
 afin de pouvoir jouer contre un adversaire robotisé.
+Les requêtes passent par un `ClientSquadro` qui conserve ses connexions
+ouvertes d'une requête à l'autre (une seule poignée de main TLS par partie
+plutôt qu'une par coup), borne la durée de chaque requête, réessaie les
+requêtes échouées (les coups et les nouvelles parties, seulement s'ils n'ont
+pas pu être envoyés) et mesure la latence de chaque point d'accès.
 Attributes:
-    URL (str): Constante représentant le début de l'url du serveur de jeu.
+    URL (str): Le début de l'url du serveur de jeu; la variable d'environnement
+        `SQUADRO_URL` ou la fonction `configurer` la remplacent.
+    DÉLAIS (tuple): Délais de connexion et de lecture par défaut, en secondes.
+    ESSAIS (int): Nombre maximal d'essais d'une requête.
+    ATTENTE (float): Attente avant le premier nouvel essai, doublée à chaque essai.
+    IDEMPOTENTES (tuple): Méthodes HTTP réessayées après toute erreur de connexion
+        ou 5xx; les autres ne le sont que si la requête n'a pas pu être envoyée.
+Classes:
+    * ClientSquadro - Client HTTP persistant du serveur de jeu.
 Functions:
+    * configurer - Change le serveur de jeu des fonctions du module.
+    * client - Retourne le client partagé par les fonctions du module.
     * lister_parties - Retourne la liste des parties reçus du serveur.
     * récupérer_partie - Retourne l'état d'une partie spécifique.
     * débuter_partie - Créer une nouvelle partie et retourne l'état de cette dernière.
     * jouer_coup - Joue un coup et retourne le nouvel état de jeu.
 """
+import os
+import time
+
 import requests
-URL = "https://pax.ulaval.ca/squadro/api/"  # URL du serveur
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+URL = os.environ.get('SQUADRO_URL', "https://pax.ulaval.ca/squadro/api/")  # URL du serveur
+DÉLAIS = (3.05, 10.0)
+ESSAIS = 4
+ATTENTE = 0.25
+IDEMPOTENTES = ('GET',)
+
+
+def _avant_envoi(erreur):
+    """Indiquer si une erreur de connexion est survenue avant l'envoi de la requête."""
+    if isinstance(erreur, requests.ConnectTimeout):
+        return True
+    raison = getattr(erreur.args[0], 'reason', None) if erreur.args else None
+    return isinstance(raison, NewConnectionError)
+
+
+class ClientSquadro:
+    '''
+    Client HTTP persistant du serveur de jeu.
+    '''
+
+    def __init__(self, url=None, délais=DÉLAIS, essais=ESSAIS, attente=ATTENTE, connexions=10):
+        """Constructeur de la classe ClientSquadro.
+        Args:
+            url (str): Le début de l'url du serveur de jeu; par défaut, `URL`.
+            délais (tuple): Les délais de connexion et de lecture, en secondes.
+            essais (int): Le nombre maximal d'essais d'une requête.
+            attente (float): L'attente avant le premier nouvel essai, en secondes;
+                elle double à chaque nouvel essai.
+            connexions (int): Le nombre de connexions conservées ouvertes.
+        """
+        self.url = url or URL
+        self.délais = délais
+        self.essais = essais
+        self.attente = attente
+        self.session = requests.Session()
+        adaptateur = HTTPAdapter(pool_connections=connexions, pool_maxsize=connexions)
+        self.session.mount('https://', adaptateur)
+        self.session.mount('http://', adaptateur)
+        self._mesures = {}
+
+    def fermer(self):
+        """Fermer les connexions du client."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.fermer()
+
+    def _mesurer(self, point, durée, essais, erreur):
+        mesure = self._mesures.setdefault(
+            point, {'requêtes': 0, 'essais': 0, 'erreurs': 0, 'durée': 0.0, 'durée_max': 0.0})
+        mesure['requêtes'] += 1
+        mesure['essais'] += essais
+        mesure['erreurs'] += erreur
+        mesure['durée'] += durée
+        mesure['durée_max'] = max(mesure['durée_max'], durée)
+
+    def statistiques(self):
+        """Retourner la latence de chaque point d'accès.
+        Returns:
+            dict: Pour chaque point d'accès, le nombre de requêtes, d'essais et
+                d'erreurs, ainsi que la latence moyenne et maximale en secondes
+                (nouveaux essais compris).
+        """
+        return {point: {'requêtes': mesure['requêtes'], 'essais': mesure['essais'],
+                        'erreurs': mesure['erreurs'],
+                        'latence_moyenne': mesure['durée'] / mesure['requêtes'],
+                        'latence_max': mesure['durée_max']}
+                for point, mesure in self._mesures.items()}
+
+    def _requête(self, méthode, point, **paramètres):
+        """Envoyer une requête en réessayant après une erreur de connexion ou 5xx.
+        Une requête non idempotente (voir `IDEMPOTENTES`), comme un coup joué,
+        n'est réessayée que si elle n'a pas pu être envoyée: le serveur a pu
+        l'appliquer même si sa réponse est perdue.
+        Args:
+            méthode (str): La méthode HTTP.
+            point (str): Le point d'accès, relatif à l'url du serveur.
+        Raises:
+            RuntimeError: Le serveur a retourné le code 406 (requête invalide)
+                ou un code inattendu.
+            requests.RequestException: Le serveur est resté injoignable.
+        Returns:
+            dict: La réponse du serveur, après avoir décodé son JSON.
+        """
+        début = time.perf_counter()
+        for essai in range(1, self.essais + 1):
+            try:
+                rep = self.session.request(méthode, self.url + point,
+                                           timeout=self.délais, **paramètres)
+            except (requests.ConnectionError, requests.Timeout) as erreur:
+                if essai == self.essais or (méthode not in IDEMPOTENTES
+                                            and not _avant_envoi(erreur)):
+                    self._mesurer(point, time.perf_counter() - début, essai, True)
+                    raise
+            else:
+                if rep.status_code < 500 or essai == self.essais \
+                        or méthode not in IDEMPOTENTES:
+                    break
+            time.sleep(self.attente * 2 ** (essai - 1))
+
+        self._mesurer(point, time.perf_counter() - début, essai, rep.status_code != 200)
+
+        if rep.status_code == 200:
+            # la requête s'est déroulée normalement; décoder le JSON
+            return rep.json()
+
+        if rep.status_code == 406:
+            # Votre requête est invalide; décoder le JSON
+            raise RuntimeError(rep.json())
+
+        # Une erreur innatendue est survenu
+        raise RuntimeError(
+            f"Le {méthode} sur '{self.url}{point}' a produit le code d'erreur {rep.status_code}.")
+
+    def lister_parties(self, iduls):
+        """Lister les identifiants de vos parties les plus récentes.
+        Args:
+            iduls (list): Liste des identifiant des joueurs.
+        Returns:
+            list: Liste des parties reçues du serveur,
+                après avoir décodé le JSON de sa réponse.
+        Raises:
+            RuntimeError: Erreur levée lorsqu'il y a présence d'un message
+                dans la réponse du serveur.
+        """
+        return list(self._requête('GET', 'parties', params={'iduls': iduls})['parties'])
+
+    def récupérer_partie(self, id_partie):
+        """Récupérer une partie depuis son identifiant.
+        Args:
+            id_partie (str): Identifiant de la partie à récupérer.
+        Returns:
+            tuple: Tuple constitué de l'identifiant de la partie en cours,
+                du prochain joueur à jouer et de l'état courant du jeu,
+                après avoir décodé le JSON de sa réponse.
+        Raises:
+            RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
+        """
+        rep = self._requête('GET', 'partie', params={'id': id_partie})
+        return (rep['id'], rep['prochain_joueur'], rep['état'])
+
+    def débuter_partie(self, iduls):
+        """Débuter une nouvelle partie.
+        Args:
+            iduls (list): Liste de string représentant le ou les identifiant(s)
+                du ou des joueur(s).
+        Returns:
+            dict: L'identifiant de la partie en cours, le prochain joueur à jouer
+                et l'état courant du jeu, après avoir décodé le JSON de sa réponse.
+        Raises:
+            RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
+        """
+        return self._requête('POST', 'partie', data={'iduls': iduls, 'bot': None})
+
+    def jouer_coup(self, id_partie, idul, pion):
+        """Jouer votre coup dans une partie en cours
+        Args:
+            id_partie (str): identifiant de la partie;
+            idul (str): IDUL jouant un coup;
+            pion (int): Numéro du pion à déplacer.
+        Returns:
+            dict: L'identifiant de la partie en cours, le prochain joueur à jouer
+                et l'état courant du jeu, après avoir décodé le JSON de sa réponse.
+        Raises:
+            RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
+            StopIteration: Erreur levée lorsqu'il y a un gagnant dans la réponse du serveur;
+                son attribut `état` est l'état final de la partie.
+        """
+        rep = self._requête('PUT', 'jouer', data={'id': id_partie, 'idul': idul, 'pion': pion})
+        if rep['gagnant']:
+            fin = StopIteration(rep['gagnant'])
+            fin.état = rep.get('état')
+            raise fin
+
+        return rep  # retourne dictionnaire
+
+
+_client = None
+
+
+def configurer(url):
+    """Changer le serveur de jeu des fonctions du module.
+    Args:
+        url (str): Le début de l'url du serveur de jeu, par exemple celle
+            d'un serveur local (voir le module `serveur`).
+    """
+    global URL, _client
+    URL = url
+    if _client is not None:
+        _client.fermer()
+    _client = ClientSquadro(url)
+
+
+def client():
+    """Retourner le client partagé par les fonctions du module.
+    Returns:
+        ClientSquadro: Le client, créé au premier appel.
+    """
+    global _client
+    if _client is None:
+        _client = ClientSquadro()
+    return _client
 
 
 def lister_parties(iduls):
@@ -25,23 +250,7 @@ def lister_parties(iduls):
         RuntimeError: Erreur levée lorsqu'il y a présence d'un message
             dans la réponse du serveur.
     """
-
-    rep = requests.get(URL+'parties', params={'iduls': iduls})
-
-    if rep.status_code == 200:
-        # la requête s'est déroulée normalement; décoder le JSON
-        rep = rep.json()
-        rep = list(rep['parties'])
-        return rep  # retourne dictionnaire
-
-    if rep.status_code == 406:
-        # Votre requête est invalide; décoder le JSON
-        rep = rep.json()
-        raise RuntimeError(rep)
-
-    # Une erreur innatendue est survenu
-    print(
-        f"Le GET sur '{URL}parties' a produit le code d'erreur {rep.status_code}.")
+    return client().lister_parties(iduls)
 
 
 def récupérer_partie(id_partie):
@@ -57,22 +266,7 @@ def récupérer_partie(id_partie):
     Raises:
         RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
     """
-
-    rep = requests.get(URL+'partie', params={'id': id_partie})
-
-    if rep.status_code == 200:
-        # la requête s'est déroulée normalement; décoder le JSON
-        rep = rep.json()
-        # retourne dictionnaire
-        return (rep['id'], rep['prochain_joueur'], rep['état'])
-
-    if rep.status_code == 406:
-        # Votre requête est invalide; décoder le JSON
-        rep = rep.json()
-        raise RuntimeError(rep)
-        # Une erreur innatendue est survenu
-    print(
-        f"Le GET sur '{URL}parties' a produit le code d'erreur {rep.status_code}.")
+    return client().récupérer_partie(id_partie)
 
 
 def débuter_partie(iduls):
@@ -82,29 +276,12 @@ def débuter_partie(iduls):
     Args:
         iduls (list): Liste de string représentant le ou les identifiant(s) du ou des joueur(s).
     Returns:
-        tuple: Tuple constitué de l'identifiant de la partie en cours,
-            du prochain joueur à jouer et de l'état courant du jeu,
-            après avoir décodé le JSON de sa réponse.
+        dict: L'identifiant de la partie en cours, le prochain joueur à jouer
+            et l'état courant du jeu, après avoir décodé le JSON de sa réponse.
     Raises:
         RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
     """
-
-    # créer la nouvelle partie et retourner l'état initial
-
-    rep = requests.post(URL+'partie', data={'iduls': iduls, 'bot': None})
-
-    if rep.status_code == 200:
-        # la requête s'est déroulée normalement; décoder le JSON
-        rep = rep.json()
-        return rep  # retourne dictionnaire
-
-    if rep.status_code == 406:
-        # Votre requête est invalide; décoder le JSON
-        rep = rep.json()
-        raise RuntimeError(rep)
-    # Une erreur innatendue est survenu
-    print(
-        f"Le GET sur '{URL}parties' a produit le code d'erreur {rep.status_code}.")
+    return client().débuter_partie(iduls)
 
 
 def jouer_coup(id_partie, idul, pion):
@@ -116,30 +293,11 @@ def jouer_coup(id_partie, idul, pion):
         idul (str): IDUL jouant un coup;
         pion (int): Numéro du pion à déplacer.
     Returns:
-        tuple: Tuple constitué de l'identifiant de la partie en cours,
-            du prochain joueur à jouer et de l'état courant du jeu,
-            après avoir décodé le JSON de sa réponse.
+        dict: L'identifiant de la partie en cours, le prochain joueur à jouer
+            et l'état courant du jeu, après avoir décodé le JSON de sa réponse.
     Raises:
         RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
-        StopIteration: Erreur levée lorsqu'il y a un gagnant dans la réponse du serveur.
+        StopIteration: Erreur levée lorsqu'il y a un gagnant dans la réponse du serveur;
+            son attribut `état` est l'état final de la partie.
     """
-
-# créer la nouvelle partie et retourner l'état initial
-
-    rep = requests.put(
-        URL+'jouer', data={'id': id_partie, 'idul': idul, 'pion': pion})
-
-    if rep.status_code == 200:
-        # la requête s'est déroulée normalement; décoder le JSON
-        rep = rep.json()
-        if rep['gagnant']:
-            raise StopIteration(rep['gagnant'])
-
-        return rep  # retourne dictionnaire
-
-    if rep.status_code == 406:
-        # Votre requête est invalide; décoder le JSON
-        rep = rep.json()
-        raise RuntimeError(rep)
-    print(
-        f"Le GET sur '{URL}parties' a produit le code d'erreur {rep.status_code}.")
+    return client().jouer_coup(id_partie, idul, pion)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Module d'API asynchrone du jeu Squadro
+Ce module est le pendant asynchrone (asyncio) du module `api`: il permet de
+mener plusieurs centaines de parties à la fois contre le serveur dans une seule
+boucle d'événements. Les requêtes partagent un bassin de connexions dont la
+taille borne le nombre de requêtes simultanées; le choix des coups, qui
+sollicite le processeur, est confié à un exécuteur afin de ne jamais bloquer
+la boucle.
+Ce module nécessite aiohttp.
+Classes:
+    * PartieTerminée - Exception levée lorsqu'un coup termine la partie.
+    * ClientSquadroAsync - Client HTTP asynchrone du serveur de jeu.
+Functions:
+    * choisir_coup - Choisit le coup d'un joueur à partir de l'état reçu du serveur.
+    * jouer_partie - Joue une partie complète contre le serveur.
+    * jouer_parties - Joue plusieurs parties simultanées contre le serveur.
+"""
+import asyncio
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import aiohttp
+
+import api
+from api import ATTENTE, DÉLAIS, ESSAIS, IDEMPOTENTES
+from squadro import Squadro
+from transposition import TableTransposition
+
+CONCURRENCE = 50
+# Erreurs survenues avant l'envoi de la requête, qui peut donc toujours être réessayée
+_AVANT_ENVOI = (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)
+# Table de transposition de chaque fil (ou processus) qui choisit des coups
+_local = threading.local()
+
+
+class PartieTerminée(Exception):
+    """Exception levée lorsqu'un coup termine la partie.
+    Une coroutine ne peut pas lever StopIteration (PEP 479); cette exception
+    en tient lieu et conserve le nom du gagnant dans l'attribut `gagnant` et
+    l'état final de la partie dans l'attribut `état`, comme `api.jouer_coup`.
+    """
+
+    def __init__(self, gagnant, état=None):
+        super().__init__(gagnant)
+        self.gagnant = gagnant
+        self.état = état
+
+
+class ClientSquadroAsync:
+    '''
+    Client HTTP asynchrone du serveur de jeu.
+    S'utilise comme gestionnaire de contexte asynchrone:
+    `async with ClientSquadroAsync() as client: ...`
+    '''
+
+    def __init__(self, url=None, délais=DÉLAIS, essais=ESSAIS, attente=ATTENTE,
+                 concurrence=CONCURRENCE):
+        """Constructeur de la classe ClientSquadroAsync.
+        Args:
+            url (str): Le début de l'url du serveur de jeu; par défaut, `api.URL`.
+            délais (tuple): Les délais de connexion et de lecture, en secondes.
+            essais (int): Le nombre maximal d'essais d'une requête.
+            attente (float): L'attente avant le premier nouvel essai, en secondes;
+                elle double à chaque nouvel essai.
+            concurrence (int): Le nombre maximal de requêtes simultanées.
+        """
+        self.url = url or api.URL
+        self.délais = aiohttp.ClientTimeout(sock_connect=délais[0], sock_read=délais[1])
+        self.essais = essais
+        self.attente = attente
+        self.concurrence = concurrence
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrence), timeout=self.délais)
+        return self
+
+    async def __aexit__(self, *exception):
+        await self.session.close()
+
+    async def _requête(self, méthode, point, **paramètres):
+        """Envoyer une requête en réessayant après une erreur de connexion ou 5xx.
+        Comme pour `api.ClientSquadro`, une requête non idempotente n'est
+        réessayée que si elle n'a pas pu être envoyée.
+        Raises:
+            RuntimeError: Le serveur a retourné le code 406 (requête invalide)
+                ou un code inattendu.
+            aiohttp.ClientError: Le serveur est resté injoignable.
+        Returns:
+            dict: La réponse du serveur, après avoir décodé son JSON.
+        """
+        for essai in range(1, self.essais + 1):
+            try:
+                async with self.session.request(méthode, self.url + point, **paramètres) as rep:
+                    if rep.status < 500 or essai == self.essais \
+                            or méthode not in IDEMPOTENTES:
+                        if rep.status == 200:
+                            # la requête s'est déroulée normalement; décoder le JSON
+                            return await rep.json()
+                        if rep.status == 406:
+                            # Votre requête est invalide; décoder le JSON
+                            raise RuntimeError(await rep.json())
+                        # Une erreur innatendue est survenu
+                        raise RuntimeError(f"Le {méthode} sur '{self.url}{point}' "
+                                           f"a produit le code d'erreur {rep.status}.")
+            except _AVANT_ENVOI:
+                if essai == self.essais:
+                    raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if essai == self.essais or méthode not in IDEMPOTENTES:
+                    raise
+            await asyncio.sleep(self.attente * 2 ** (essai - 1))
+
+    async def lister_parties(self, iduls):
+        """Lister les identifiants de vos parties les plus récentes.
+        Voir `api.lister_parties`.
+        """
+        rep = await self._requête('GET', 'parties', params=[('iduls', idul) for idul in iduls])
+        return list(rep['parties'])
+
+    async def récupérer_partie(self, id_partie):
+        """Récupérer une partie depuis son identifiant.
+        Voir `api.récupérer_partie`.
+        """
+        rep = await self._requête('GET', 'partie', params={'id': id_partie})
+        return (rep['id'], rep['prochain_joueur'], rep['état'])
+
+    async def débuter_partie(self, iduls):
+        """Débuter une nouvelle partie.
+        Voir `api.débuter_partie`.
+        """
+        return await self._requête('POST', 'partie', data=[('iduls', idul) for idul in iduls])
+
+    async def jouer_coup(self, id_partie, idul, pion):
+        """Jouer votre coup dans une partie en cours
+        Voir `api.jouer_coup`.
+        Raises:
+            RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
+            PartieTerminée: Erreur levée lorsqu'il y a un gagnant dans la réponse du serveur;
+                son attribut `état` est l'état final de la partie.
+        """
+        rep = await self._requête('PUT', 'jouer',
+                                  data={'id': id_partie, 'idul': idul, 'pion': str(pion)})
+        if rep['gagnant']:
+            raise PartieTerminée(rep['gagnant'], rep.get('état'))
+
+        return rep  # retourne dictionnaire
+
+
+def choisir_coup(état, joueur, strategie='alphabeta', temps=0.1):
+    """Choisir le coup d'un joueur à partir de l'état reçu du serveur.
+    La table de transposition de la stratégie alphabeta est conservée d'un coup
+    à l'autre dans chaque fil ou processus de l'exécuteur.
+    Args:
+        état (list): L'état de la partie reçu du serveur.
+        joueur (str): Le nom du joueur au trait.
+        strategie (str): La stratégie de `Squadro.jouer_coup`.
+        temps (float): Budget de temps de la recherche en secondes.
+    Returns:
+        int: Le numéro du pion à déplacer.
+    """
+    jeu = Squadro(*état)
+    if strategie == 'alphabeta':
+        if not hasattr(_local, 'table'):
+            _local.table = TableTransposition()
+        jeu.table = _local.table
+    return jeu.jouer_coup(joueur, strategie, temps)[1]
+
+
+async def jouer_partie(client, idul, strategie='alphabeta', temps=0.1, exécuteur=None):
+    """Jouer une partie complète contre le serveur.
+    Args:
+        client (ClientSquadroAsync): Le client du serveur de jeu.
+        idul (str): L'IDUL du joueur.
+        strategie (str): La stratégie de `Squadro.jouer_coup`.
+        temps (float): Budget de temps par coup en secondes.
+        exécuteur (Executor): L'exécuteur qui choisit les coups; par défaut,
+            celui de la boucle d'événements.
+    Returns:
+        tuple: L'identifiant de la partie et le nom du gagnant.
+    """
+    boucle = asyncio.get_running_loop()
+    rep = await client.débuter_partie([idul])
+    id_partie = rep['id']
+    while True:
+        pion = await boucle.run_in_executor(exécuteur, choisir_coup, rep['état'],
+                                            rep['prochain_joueur'], strategie, temps)
+        try:
+            rep = await client.jouer_coup(id_partie, rep['prochain_joueur'], pion)
+        except PartieTerminée as fin:
+            return id_partie, fin.gagnant
+
+
+async def _jouer_parties(idul, parties, strategie, temps, concurrence, exécuteur, url):
+    async with ClientSquadroAsync(url, concurrence=concurrence) as client:
+        return await asyncio.gather(
+            *(jouer_partie(client, idul, strategie, temps, exécuteur) for _ in range(parties)),
+            return_exceptions=True)
+
+
+def jouer_parties(idul, parties, strategie='alphabeta', temps=0.1,
+                  concurrence=CONCURRENCE, processus=None, url=None):
+    """Jouer plusieurs parties simultanées contre le serveur.
+    Args:
+        idul (str): L'IDUL du joueur.
+        parties (int): Le nombre de parties à jouer.
+        strategie (str): La stratégie de `Squadro.jouer_coup`.
+        temps (float): Budget de temps par coup en secondes.
+        concurrence (int): Le nombre maximal de requêtes simultanées.
+        processus (int): Le nombre de processus qui choisissent les coups;
+            par défaut, le nombre de coeurs.
+        url (str): Le début de l'url du serveur de jeu; par défaut, `api.URL`.
+    Returns:
+        list: Pour chaque partie, l'identifiant de la partie et le nom du gagnant,
+            ou l'exception qui a interrompu la partie.
+    """
+    with ProcessPoolExecutor(max_workers=processus) as exécuteur:
+        return asyncio.run(_jouer_parties(idul, parties, strategie, temps,
+                                          concurrence, exécuteur, url))
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Parties simultanées contre le serveur")
+    analyseur.add_argument('IDUL', help="IDUL du joueur.")
+    analyseur.add_argument('--parties', type=int, default=10, help="Nombre de parties.")
+    analyseur.add_argument('--strategie', default='alphabeta',
+                           help="Stratégie du joueur (hasard, alphabeta ou mcts).")
+    analyseur.add_argument('-t', '--temps', type=float, default=0.1,
+                           help="Budget de temps par coup en secondes.")
+    analyseur.add_argument('--concurrence', type=int, default=CONCURRENCE,
+                           help="Nombre maximal de requêtes simultanées.")
+    analyseur.add_argument('--processus', type=int, default=None,
+                           help="Nombre de processus qui choisissent les coups.")
+    arguments = analyseur.parse_args()
+    début = perf_counter()
+    résultats = jouer_parties(arguments.IDUL, arguments.parties, arguments.strategie,
+                              arguments.temps, arguments.concurrence, arguments.processus)
+    victoires = sum(1 for résultat in résultats
+                    if isinstance(résultat, tuple) and résultat[1] == arguments.IDUL)
+    erreurs = sum(1 for résultat in résultats if isinstance(résultat, Exception))
+    print(f"{len(résultats)} parties en {perf_counter() - début:.1f} s: "
+          f"{victoires} victoires, {erreurs} erreurs")
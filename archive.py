@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Module d'archivage des parties du jeu Squadro
+Ce module enregistre des parties dans un format binaire compact: le nom des
+joueurs et la position de départ une seule fois par partie, puis un octet par
+coup. Les parties sont regroupées en blocs compressés indépendamment; un bloc
+ne contient que des parties entières, de sorte que la lecture ne garde jamais
+plus d'un bloc en mémoire, quelle que soit la taille de l'archive.
+
+Format d'une archive:
+    * en-tête: signature, version et méthode de compression;
+    * blocs: taille compressée et taille brute (4 octets chacune), puis les données.
+Format d'une partie, dans un bloc:
+    * le nom des deux joueurs (1 octet de longueur, puis l'UTF-8);
+    * la position de départ (entier compact du module `moteur`, 8 octets);
+    * l'indice du gagnant (255 si la partie n'est pas terminée);
+    * le nombre de coups (4 octets), puis un octet par coup: le bit 3 est
+      l'indice du joueur et les bits 0 à 2 le numéro du pion.
+Les entiers sont petit-boutistes. La compression zstd nécessite zstandard.
+Classes:
+    * PartieArchivée - Une partie lue d'une archive.
+    * ÉcrivainParties - Écrit des parties dans une archive, bloc par bloc.
+Functions:
+    * lire_parties - Lit les parties d'une archive, une à la fois.
+    * rejouer - Rejoue les coups d'une partie avec le moteur compact.
+"""
+import gzip
+import struct
+from argparse import ArgumentParser
+from collections import namedtuple
+
+from moteur import BIT_TRAIT, ÉTAT_INITIAL, jouer_compact
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SIGNATURE = b'SQPA'
+VERSION = 1
+COMPRESSIONS = ('aucune', 'gzip', 'zstd')
+TAILLE_BLOC = 1 << 20
+_ENTÊTE = struct.Struct('<4sBB2x')  # signature, version, compression
+_BLOC = struct.Struct('<II')  # taille compressée, taille brute
+_PARTIE = struct.Struct('<QBI')  # position de départ, gagnant, nombre de coups
+_AUCUN_GAGNANT = 255
+_BIT_JOUEUR = 8
+
+
+class PartieArchivée(namedtuple('PartieArchivée', ['noms', 'départ', 'coups', 'gagnant'])):
+    """Une partie lue d'une archive.
+    Attributes:
+        noms (tuple): Le nom des deux joueurs, le joueur 1 en premier.
+        départ (int): L'entier compact de la position de départ.
+        coups (bytes): Un octet par coup (voir la documentation du module).
+        gagnant (int): L'indice du gagnant; None si la partie n'est pas terminée.
+    """
+    __slots__ = ()
+
+    def liste_coups(self):
+        """Retourner les coups de la partie.
+        Returns:
+            list: L'indice du joueur et le numéro du pion de chaque coup.
+        """
+        return [(octet >> 3, octet & 7) for octet in self.coups]
+
+
+def _compresseur(compression):
+    """Retourner les fonctions de compression et de décompression d'une méthode.
+    Raises:
+        ValueError: La méthode de compression est inconnue ou indisponible.
+    """
+    if compression == 'aucune':
+        return bytes, bytes
+    if compression == 'gzip':
+        return (lambda données: gzip.compress(données, compresslevel=6)), gzip.decompress
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("La compression zstd nécessite le module zstandard.")
+        return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"La compression {compression} est inconnue.")
+
+
+class ÉcrivainParties:
+    '''
+    Écrit des parties dans une archive, bloc par bloc.
+    S'utilise comme gestionnaire de contexte: le dernier bloc est écrit à la fermeture.
+    '''
+
+    def __init__(self, chemin, compression='gzip', taille_bloc=TAILLE_BLOC):
+        """Constructeur de la classe ÉcrivainParties.
+        Args:
+            chemin (str): Le fichier de l'archive à écrire.
+            compression (str): La méthode de compression des blocs
+                ('aucune', 'gzip' ou 'zstd').
+            taille_bloc (int): La taille brute approximative d'un bloc, en octets.
+        Raises:
+            ValueError: La méthode de compression est inconnue ou indisponible.
+        """
+        self._compresser = _compresseur(compression)[0]
+        self.taille_bloc = taille_bloc
+        self._fichier = open(chemin, 'wb')
+        self._fichier.write(_ENTÊTE.pack(SIGNATURE, VERSION, COMPRESSIONS.index(compression)))
+        self._bloc = bytearray()
+        self.parties = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.fermer()
+
+    def _écrire_bloc(self):
+        if self._bloc:
+            données = self._compresser(bytes(self._bloc))
+            self._fichier.write(_BLOC.pack(len(données), len(self._bloc)))
+            self._fichier.write(données)
+            self._bloc.clear()
+
+    def fermer(self):
+        """Écrire le dernier bloc et fermer l'archive."""
+        if not self._fichier.closed:
+            self._écrire_bloc()
+            self._fichier.close()
+
+    def écrire(self, noms, coups, départ=ÉTAT_INITIAL, gagnant=None):
+        """Ajouter une partie à l'archive.
+        Args:
+            noms (tuple): Le nom des deux joueurs, le joueur 1 en premier.
+            coups (iterable): L'indice du joueur (0 ou 1) et le numéro du pion
+                de chaque coup, dans l'ordre.
+            départ (int): L'entier compact de la position de départ.
+            gagnant (int): L'indice du gagnant; None si la partie n'est pas terminée.
+        """
+        for nom in noms:
+            nom = nom.encode('utf-8')
+            self._bloc.append(len(nom))
+            self._bloc += nom
+        octets = bytes(ind_joueur * _BIT_JOUEUR | pion for ind_joueur, pion in coups)
+        self._bloc += _PARTIE.pack(départ, _AUCUN_GAGNANT if gagnant is None else gagnant,
+                                   len(octets))
+        self._bloc += octets
+        self.parties += 1
+        if len(self._bloc) >= self.taille_bloc:
+            self._écrire_bloc()
+
+
+def _lire_nom(bloc, position):
+    longueur = bloc[position]
+    return str(bloc[position + 1:position + 1 + longueur], 'utf-8'), position + 1 + longueur
+
+
+def lire_parties(chemin):
+    """Lire les parties d'une archive, une à la fois.
+    Un seul bloc est décompressé et gardé en mémoire à la fois.
+    Args:
+        chemin (str): Le fichier de l'archive.
+    Raises:
+        ValueError: Le fichier n'est pas une archive de parties.
+    Yields:
+        PartieArchivée: Chaque partie de l'archive, dans l'ordre d'écriture.
+    """
+    with open(chemin, 'rb') as fichier:
+        signature, version, compression = _ENTÊTE.unpack(fichier.read(_ENTÊTE.size))
+        if signature != SIGNATURE or version != VERSION:
+            raise ValueError(f"{chemin} n'est pas une archive de parties.")
+        décompresser = _compresseur(COMPRESSIONS[compression])[1]
+
+        while True:
+            entête = fichier.read(_BLOC.size)
+            if not entête:
+                return
+            taille, _ = _BLOC.unpack(entête)
+            bloc = memoryview(décompresser(fichier.read(taille)))
+            position = 0
+            while position < len(bloc):
+                nom1, position = _lire_nom(bloc, position)
+                nom2, position = _lire_nom(bloc, position)
+                départ, gagnant, nombre = _PARTIE.unpack_from(bloc, position)
+                position += _PARTIE.size
+                yield PartieArchivée((nom1, nom2), départ, bytes(bloc[position:position + nombre]),
+                                     None if gagnant == _AUCUN_GAGNANT else gagnant)
+                position += nombre
+
+
+def rejouer(partie):
+    """Rejouer les coups d'une partie avec le moteur compact.
+    Args:
+        partie (PartieArchivée): La partie à rejouer.
+    Yields:
+        tuple: L'indice du joueur, le numéro du pion joué et l'entier compact
+            de la position obtenue, pour chaque coup.
+    """
+    code = partie.départ
+    masque = ~(1 << BIT_TRAIT)
+    for octet in partie.coups:
+        ind_joueur, pion = octet >> 3, octet & 7
+        code = jouer_compact(code & masque | ind_joueur << BIT_TRAIT, pion)
+        yield ind_joueur, pion, code
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Résumé d'une archive de parties")
+    analyseur.add_argument('chemin', help="Fichier de l'archive.")
+    arguments = analyseur.parse_args()
+    parties = coups = 0
+    victoires = [0, 0]
+    for archivée in lire_parties(arguments.chemin):
+        parties += 1
+        coups += len(archivée.coups)
+        if archivée.gagnant is not None:
+            victoires[archivée.gagnant] += 1
+    print(f"{parties} parties, {coups} coups, victoires: {victoires[0]} - {victoires[1]}")
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Module du mode automatique du jeu Squadro
+Ce module joue une partie complète contre le serveur: `Squadro.jouer_coup`
+choisit chaque coup sur une copie locale (un miroir) de l'état du serveur.
+
+La partie est menée en pipeline. Chaque coup est envoyé par un fil
+d'arrière-plan; pendant que la requête est en vol, le plateau est affiché, la
+partie est sauvegardée et, pour la stratégie alpha-bêta, les réponses aux
+coups possibles du robot sont cherchées d'avance (voir `Squadro.anticiper`):
+à la réception de la réponse, le coup suivant est souvent déjà calculé. La
+réponse du serveur n'est pas reconstruite en une nouvelle partie: le coup du
+robot est retrouvé parmi ses coups légaux et rejoué sur le miroir.
+Functions:
+    * jouer_automatique - Joue une partie complète contre le serveur.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import api
+from moteur import compacter
+from squadro import Squadro
+
+
+def _suivre(jeu, idul, robot, état):
+    """Rejouer sur le miroir le coup du robot contenu dans l'état du serveur.
+    Si aucun coup légal du robot ne mène à cet état, le miroir est remplacé
+    par l'état du serveur.
+    Returns:
+        int: L'entier compact de la position, du point de vue de `idul`.
+    """
+    ind_idul = jeu._indice_joueur(idul)
+    cible = compacter(état, ind_idul)
+    if jeu.état_compact(idul) == cible:
+        return cible
+    for coup in jeu.coups_légaux(robot):
+        annulation = jeu.jouer(coup)
+        if jeu.état_compact(idul) == cible:
+            return cible
+        jeu.annuler(annulation)
+    jeu.état = Squadro(*état).état
+    jeu.arrivés = None
+    return cible
+
+
+def jouer_automatique(iduls, strategie='alphabeta', temps=1.0, client=None,
+                      afficher=True, sauvegarder=None):
+    """Jouer une partie complète contre le serveur.
+    Args:
+        iduls (list): Les IDUL des joueurs, tels que donnés à `débuter_partie`.
+        strategie (str): La stratégie de `Squadro.jouer_coup`.
+        temps (float): Budget de temps par coup en secondes.
+        client (ClientSquadro): Le client du serveur de jeu; par défaut, celui
+            du module `api`.
+        afficher (bool): Afficher le plateau après chaque échange.
+        sauvegarder (callable): Fonction appelée avec l'identifiant de la partie,
+            le prochain joueur, l'état et, à la fin, le gagnant (par exemple
+            `sauvergarder_partie_local`).
+    Returns:
+        tuple: L'identifiant de la partie, le nom du gagnant et le nombre de
+            coups joués.
+    Raises:
+        RuntimeError: Erreur levée lorsque le serveur retourne un code 406.
+    """
+    client = client or api.client()
+    rep = client.débuter_partie(iduls)
+    id_partie, idul = rep['id'], rep['prochain_joueur']
+    jeu = Squadro(*rep['état'])
+    robot = jeu.état[1 - jeu._indice_joueur(idul)]['nom']
+    coups = 0
+
+    with ThreadPoolExecutor(1) as exécuteur:
+        while True:
+            avant = jeu.cloner().état
+            pion = jeu.jouer_coup(idul, strategie, temps)[1]
+            envoi = exécuteur.submit(client.jouer_coup, id_partie, idul, pion)
+            coups += 1
+
+            # Travail utile pendant que la requête est en vol
+            if sauvegarder is not None:
+                sauvegarder(id_partie, idul, avant)
+                sauvegarder(id_partie, robot, jeu.état)
+            if afficher:
+                print(jeu)
+            if strategie == 'alphabeta':
+                jeu.anticiper(robot)
+
+            try:
+                rep = envoi.result()
+            except StopIteration as gagnant:
+                if jeu.anticipation is not None:
+                    jeu.anticipation.arrêter()
+                if sauvegarder is not None:
+                    # Le robot a pu jouer le coup gagnant: l'état final vient du serveur
+                    sauvegarder(id_partie, None, getattr(gagnant, 'état', None) or jeu.état,
+                                str(gagnant))
+                return id_partie, str(gagnant), coups
+            _suivre(jeu, idul, robot, rep['état'])
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""Module de mesure de performance du jeu Squadro
+Ce module mesure la vitesse des chemins critiques du jeu sur des positions
+tirées au hasard avec une graine fixe, afin que deux exécutions soient
+comparables. Chaque banc est répété plusieurs fois; la médiane des répétitions
+est retenue et l'écart-type indique la stabilité de la mesure.
+
+Les résultats peuvent être sauvegardés en JSON et comparés à une référence
+sauvegardée auparavant. La vitesse d'une même machine varie d'une exécution à
+l'autre bien au-delà de l'écart-type des répétitions: chaque banc est donc
+précédé d'un étalon, une boucle fixe qui ne dépend pas du code du jeu, et les
+débits sont comparés après correction par le rapport des étalons. Un banc dont
+même la meilleure répétition est plus lente que la pire répétition de la
+référence, de plus du seuil donné, est mesuré à nouveau, puis signalé comme
+une régression si la baisse persiste.
+Examples:
+    `> python3 bench.py --json reference.json`
+    `> python3 bench.py --reference reference.json --seuil 0.1`
+Attributes:
+    BANCS (dict): Les bancs disponibles, par nom. Un banc retourne l'opération à
+        mesurer, ses arguments et, au besoin, une fonction qui libère ses ressources.
+    ÉTALON (list): Les arguments de l'étalon mesuré avant chaque banc.
+Functions:
+    * mesurer - Mesure le débit d'une opération sur plusieurs répétitions.
+    * exécuter - Exécute des bancs et retourne leurs résultats.
+    * comparer - Compare des résultats à une référence.
+    * confirmer - Mesure à nouveau les bancs en régression avant de les signaler.
+"""
+import json
+import platform
+import random
+import statistics
+import sys
+from argparse import ArgumentParser
+from datetime import datetime
+from time import perf_counter
+
+from affichage import dessiner_plateau
+from squadro import Squadro
+
+GRAINE = 0x5C0AD2
+NOMS = ('joueur1', 'joueur2')
+ÉTALON = [1000] * 100
+
+
+def mesurer(opération, arguments, répétitions=5):
+    """Mesurer le débit d'une opération sur plusieurs répétitions.
+    Args:
+        opération (callable): L'opération à mesurer, appelée avec chaque argument.
+        arguments (list): Les arguments successifs de l'opération.
+        répétitions (int): Le nombre de passages sur la liste d'arguments.
+    Returns:
+        dict: Le débit médian, moyen, minimal et maximal en opérations par
+            seconde, l'écart-type et le nombre de répétitions.
+    """
+    débits = []
+    for _ in range(répétitions):
+        début = perf_counter()
+        for argument in arguments:
+            opération(argument)
+        débits.append(len(arguments) / (perf_counter() - début))
+    return {
+        'ops_par_seconde': statistics.median(débits),
+        'moyenne': statistics.fmean(débits),
+        'écart_type': statistics.stdev(débits) if len(débits) > 1 else 0.0,
+        'min': min(débits),
+        'max': max(débits),
+        'répétitions': répétitions,
+    }
+
+
+def _étalon(itérations):
+    """Boucle fixe dont le débit ne mesure que la vitesse de la machine."""
+    total = 0
+    for ind in range(itérations):
+        total += ind * ind % 7
+    return total
+
+
+def _vitesse(mesure):
+    """Retourner le débit de l'étalon mesuré avec un banc, 1 s'il n'y en a pas."""
+    return mesure.get('étalon', 1.0)
+
+
+def _positions(nombre, générateur):
+    """Tirer des positions au hasard où aucun joueur n'a encore gagné."""
+    positions = []
+    while len(positions) < nombre:
+        pions = [[générateur.randrange(13) for _ in range(5)] for _ in range(2)]
+        if all(joueur.count(12) < 4 for joueur in pions):
+            positions.append(pions)
+    return positions
+
+
+def _partie(pions):
+    return Squadro({'nom': NOMS[0], 'pions': list(pions[0])},
+                   {'nom': NOMS[1], 'pions': list(pions[1])})
+
+
+def _coups(positions, générateur, renvoyés_min=0):
+    """Choisir un coup légal dans chaque position.
+    Args:
+        renvoyés_min (int): Ne retenir que les coups qui renvoient au moins ce
+            nombre de pions adverses (sauts multiples).
+    Returns:
+        list: La partie, le joueur, le pion et les pions à restaurer après le coup.
+    """
+    coups = []
+    for pions in positions:
+        partie = _partie(pions)
+        ind_joueur = générateur.randrange(2)
+        légaux = partie.coups_légaux(NOMS[ind_joueur])
+        générateur.shuffle(légaux)
+        for _, pion in légaux:
+            annulation = partie.jouer((NOMS[ind_joueur], pion))
+            partie.annuler(annulation)
+            if bin(annulation[3]).count('1') >= renvoyés_min:
+                coups.append((partie, NOMS[ind_joueur], pion,
+                              (list(pions[0]), list(pions[1]))))
+                break
+    return coups
+
+
+def _banc_validation(générateur, taille):
+    partie = Squadro(*NOMS)
+    joueurs = [({'nom': NOMS[0], 'pions': pions[0]}, {'nom': NOMS[1], 'pions': pions[1]})
+               for pions in _positions(taille, générateur)]
+    return lambda joueurs: partie.validation(*joueurs), joueurs
+
+
+def _déplacer(coup):
+    partie, joueur, pion, pions = coup
+    partie.déplacer_pion(joueur, pion)
+    # Remettre la position en place pour la répétition suivante
+    partie.état[0]['pions'][:] = pions[0]
+    partie.état[1]['pions'][:] = pions[1]
+    partie.arrivés = None
+
+
+def _banc_déplacer_pion(générateur, taille):
+    return _déplacer, _coups(_positions(taille, générateur), générateur)
+
+
+def _banc_sauts_multiples(générateur, taille):
+    coups = []
+    while len(coups) < taille:
+        coups += _coups(_positions(taille, générateur), générateur, renvoyés_min=2)
+    return _déplacer, coups[:taille]
+
+
+def _banc_construction(générateur, taille):
+    return (lambda état: Squadro(*état)), [_partie(pions).état for pions in
+                                           _positions(taille, générateur)]
+
+
+def _banc_clonage(générateur, taille):
+    return Squadro.cloner, [_partie(pions) for pions in _positions(taille, générateur)]
+
+
+def _banc_partie_terminée(générateur, taille):
+    return Squadro.partie_terminée, [_partie(pions) for pions in _positions(taille, générateur)]
+
+
+def _banc_affichage(générateur, taille):
+    return str, [_partie(pions) for pions in _positions(taille, générateur)]
+
+
+def _banc_affichage_sans_cache(générateur, taille):
+    return (lambda partie: dessiner_plateau.__wrapped__(partie.état_compact(NOMS[0])),
+            [_partie(pions) for pions in _positions(taille, générateur)])
+
+
+def _banc_état_partie(générateur, taille):
+    return Squadro.état_partie, [_partie(pions) for pions in _positions(taille, générateur)]
+
+
+def _partie_au_hasard(_):
+    partie = Squadro(*NOMS)
+    tour = 0
+    while not partie.partie_terminée():
+        partie.jouer_coup(NOMS[tour])
+        tour ^= 1
+
+
+def _banc_parties_hasard(générateur, taille):
+    random.seed(générateur.random())
+    return _partie_au_hasard, range(max(1, taille // 100))
+
+
+def _banc_api(générateur, taille):
+    # Importés ici: ce banc démarre un serveur local (voir le module `serveur`)
+    from api import ClientSquadro
+    from serveur import lancer
+
+    serveur = lancer()
+    client = ClientSquadro(serveur.url)
+    id_partie = client.débuter_partie([NOMS[0], NOMS[1]])['id']
+
+    def fermer():
+        client.fermer()
+        serveur.shutdown()
+        serveur.server_close()
+
+    # Aller-retour complet d'une requête sur une connexion gardée ouverte
+    return ((lambda _: client.récupérer_partie(id_partie)), range(max(1, taille // 10)),
+            fermer)
+
+
+BANCS = {
+    'validation': _banc_validation,
+    'déplacer_pion': _banc_déplacer_pion,
+    'sauts_multiples': _banc_sauts_multiples,
+    'construction': _banc_construction,
+    'clonage': _banc_clonage,
+    'partie_terminée': _banc_partie_terminée,
+    'affichage': _banc_affichage,
+    'affichage_sans_cache': _banc_affichage_sans_cache,
+    'état_partie': _banc_état_partie,
+    'parties_hasard': _banc_parties_hasard,
+    'api': _banc_api,
+}
+
+
+def exécuter(noms=None, taille=1000, répétitions=5, graine=GRAINE):
+    """Exécuter des bancs et retourner leurs résultats.
+    Args:
+        noms (list): Les bancs à exécuter; par défaut, tous.
+        taille (int): Le nombre de positions de chaque banc.
+        répétitions (int): Le nombre de répétitions de chaque banc.
+        graine (int): La graine du tirage des positions.
+    Returns:
+        dict: L'environnement de la mesure et le résultat de chaque banc
+            (voir `mesurer`), avec le débit maximal de l'étalon mesuré juste avant.
+    """
+    résultats = {}
+    for nom in noms or BANCS:
+        opération, arguments, *fermeture = BANCS[nom](random.Random(graine), taille)
+        try:
+            mesurer(opération, arguments, 1)  # échauffement (caches, imports)
+            étalon = mesurer(_étalon, ÉTALON, répétitions)['max']
+            résultats[nom] = mesurer(opération, arguments, répétitions)
+            résultats[nom]['étalon'] = étalon
+        finally:
+            for fermer in fermeture:
+                fermer()
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plateforme': platform.platform(),
+        'taille': taille,
+        'bancs': résultats,
+    }
+
+
+def comparer(résultats, référence, seuil=0.1):
+    """Comparer des résultats à une référence.
+    Args:
+        résultats (dict): Les résultats retournés par `exécuter`.
+        référence (dict): Des résultats sauvegardés auparavant.
+        seuil (float): La baisse relative de débit au-delà de laquelle un banc
+            est une régression.
+    Returns:
+        list: Pour chaque banc présent dans les deux résultats, son nom, le
+            rapport des débits médians (nouveau / référence) et s'il s'agit d'une
+            régression: le débit maximal (la meilleure répétition) est inférieur
+            de plus du seuil au débit minimal de la référence. Les débits sont
+            corrigés par le rapport des étalons lorsque les deux en ont un.
+    """
+    comparaison = []
+    for nom, mesure in résultats['bancs'].items():
+        if nom in référence['bancs']:
+            ancienne = référence['bancs'][nom]
+            échelle = _vitesse(ancienne) / _vitesse(mesure) \
+                if 'étalon' in mesure and 'étalon' in ancienne else 1.0
+            rapport = échelle * mesure['ops_par_seconde'] / ancienne['ops_par_seconde']
+            régression = échelle * mesure['max'] < (1 - seuil) * ancienne['min']
+            comparaison.append((nom, rapport, régression))
+    return comparaison
+
+
+def confirmer(résultats, référence, seuil=0.1, relances=2, répétitions=5):
+    """Mesurer à nouveau les bancs en régression avant de les signaler.
+    Args:
+        résultats (dict): Les résultats retournés par `exécuter`, dont les
+            mesures des bancs relancés sont remplacées par leur meilleure mesure.
+        référence (dict): Des résultats sauvegardés auparavant.
+        seuil (float): La baisse relative de débit au-delà de laquelle un banc
+            est une régression.
+        relances (int): Le nombre maximal de nouvelles mesures d'un banc.
+        répétitions (int): Le nombre de répétitions de chaque nouvelle mesure.
+    Returns:
+        list: La comparaison finale (voir `comparer`).
+    """
+    comparaison = comparer(résultats, référence, seuil)
+    for _ in range(relances):
+        suspects = [nom for nom, _, régression in comparaison if régression]
+        if not suspects:
+            break
+        relance = exécuter(suspects, résultats['taille'], répétitions)
+        for nom, mesure in relance['bancs'].items():
+            ancienne = résultats['bancs'][nom]
+            if mesure['max'] / _vitesse(mesure) > ancienne['max'] / _vitesse(ancienne):
+                résultats['bancs'][nom] = mesure
+        comparaison = comparer(résultats, référence, seuil)
+    return comparaison
+
+
+def _afficher(résultats, comparaison):
+    rapports = {nom: (rapport, régression) for nom, rapport, régression in comparaison}
+    aff = f"{'banc':<22}{'ops/s':>14}{'écart-type':>12}"
+    aff += f"{'référence':>12}\n" if comparaison else "\n"
+    for nom, mesure in résultats['bancs'].items():
+        aff += f"{nom:<22}{mesure['ops_par_seconde']:>14,.0f}" \
+            f"{100 * mesure['écart_type'] / mesure['moyenne']:>11.1f}%"
+        if nom in rapports:
+            rapport, régression = rapports[nom]
+            aff += f"{rapport:>11.2f}x" + ("  RÉGRESSION" if régression else "")
+        aff += "\n"
+    return aff
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Mesures de performance")
+    analyseur.add_argument('bancs', nargs='*', metavar='BANC',
+                           help=f"Bancs à exécuter parmi {', '.join(BANCS)}; par défaut, tous.")
+    analyseur.add_argument('--taille', type=int, default=1000,
+                           help="Nombre de positions par banc.")
+    analyseur.add_argument('--repetitions', type=int, default=5,
+                           help="Nombre de répétitions de chaque banc.")
+    analyseur.add_argument('--json', metavar='FICHIER',
+                           help="Sauvegarder les résultats dans ce fichier.")
+    analyseur.add_argument('--reference', metavar='FICHIER',
+                           help="Comparer les résultats à ce fichier.")
+    analyseur.add_argument('--seuil', type=float, default=0.1,
+                           help="Baisse relative de débit signalée comme une régression.")
+    analyseur.add_argument('--relances', type=int, default=2,
+                           help="Nombre maximal de nouvelles mesures d'un banc en "
+                           "régression avant de le signaler.")
+    arguments = analyseur.parse_args()
+    for nom in arguments.bancs:
+        if nom not in BANCS:
+            analyseur.error(f"le banc {nom} est inconnu.")
+
+    résultats = exécuter(arguments.bancs, arguments.taille, arguments.repetitions)
+    comparaison = []
+    if arguments.reference:
+        with open(arguments.reference, encoding='utf-8') as fichier:
+            référence = json.load(fichier)
+        comparaison = confirmer(résultats, référence, arguments.seuil, arguments.relances,
+                                arguments.repetitions)
+    print(_afficher(résultats, comparaison), end='')
+    if arguments.json:
+        with open(arguments.json, 'w', encoding='utf-8') as fichier:
+            json.dump(résultats, fichier, ensure_ascii=False, indent=2)
+    sys.exit(1 if any(régression for _, _, régression in comparaison) else 0)
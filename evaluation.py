@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""Module d'évaluation pondérée du jeu Squadro
+Ce module évalue des positions compactes (module `moteur`) par une somme
+pondérée de caractéristiques nommées, toutes du point de vue du joueur au
+trait:
+    * tempo: coups qui manquent à l'adversaire, moins ceux qui nous manquent,
+      pour faire terminer 4 pions (l'évaluation de `recherche.évaluer`);
+    * progrès: coups déjà faits par nos 5 pions, moins ceux de l'adversaire,
+      chaque pion comptant selon sa vitesse;
+    * arrivés: nos pions arrivés, moins ceux de l'adversaire;
+    * attaque: le plus grand nombre de pions adverses que l'un de nos coups
+      renvoie;
+    * menace: le plus grand nombre de nos pions que l'un des coups adverses
+      renverrait si l'adversaire avait le trait;
+    * trait: 1 (l'avantage d'avoir le trait).
+Les caractéristiques d'un lot de positions sont calculées en une seule fois
+sur des tableaux NumPy; `Évaluateur` évalue aussi une position isolée, sans
+NumPy, pour la recherche alpha-bêta (qui évalue une feuille à la fois).
+
+Les poids se lisent dans un fichier JSON et s'ajustent hors ligne par
+régression logistique sur des parties archivées (module `archive`): chaque
+position est étiquetée par la victoire ou la défaite du joueur au trait, et
+les caractéristiques sont calculées par plusieurs processus.
+Ce module nécessite NumPy.
+Examples:
+    `> python3 main.py -s 20000 --archive parties.sqpa`
+    `> python3 evaluation.py parties.sqpa --sortie poids.json`
+    `> python3 main.py -s 100 --strategies alphabeta alphabeta --poids poids.json`
+Attributes:
+    CARACTÉRISTIQUES (tuple): Le nom des caractéristiques, dans l'ordre des poids.
+    POIDS (dict): Les poids par défaut, par caractéristique.
+    ÉCHELLE (int): Le facteur entre le logit d'une position et son score entier.
+Classes:
+    * Évaluateur - Évaluation pondérée des positions.
+Functions:
+    * caractéristiques - Calcule les caractéristiques d'un lot de positions.
+    * charger_poids - Lit des poids dans un fichier JSON.
+    * sauvegarder_poids - Écrit des poids dans un fichier JSON.
+    * exemples - Extrait les positions étiquetées d'archives de parties.
+    * ajuster - Ajuste les poids par régression logistique.
+"""
+import json
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from archive import lire_parties, rejouer
+from moteur import BIT_TRAIT, BITS_JOUEUR, BITS_PION, CROISEMENTS, MASQUE_PION, TRANSITIONS
+from recherche import RESTANTS
+
+CARACTÉRISTIQUES = ('tempo', 'progrès', 'arrivés', 'attaque', 'menace', 'trait')
+# Ajustés sur 20 000 parties au hasard (1,65 million de positions)
+POIDS = {'tempo': 0.075, 'progrès': 0.216, 'arrivés': 0.354, 'attaque': 0.337,
+         'menace': -0.252, 'trait': 0.136}
+ÉCHELLE = 100
+RÉGULARISATION = 1e-3
+ITÉRATIONS = 25
+
+_RESTANTS = np.array(RESTANTS, dtype=np.int64)  # (joueur, pion, position)
+_CROISEMENTS = np.array(CROISEMENTS, dtype=np.int64)  # (pion, position)
+_RENVOYÉS = np.array([renvoyés for _, renvoyés in TRANSITIONS], dtype=np.int64)
+_NOMBRES = tuple(bin(masque).count('1') for masque in range(32))
+_BITS = np.array(_NOMBRES, dtype=np.int64)
+_DÉPART = tuple(sum(RESTANTS[ind_joueur][ind_pion][0] for ind_pion in range(5))
+                for ind_joueur in range(2))
+
+
+def _attaques(pions, ind_joueur):
+    """Compter, pour chaque position et chaque pion d'un joueur, les pions adverses
+    que son déplacement renverrait.
+    Returns:
+        ndarray: Tableau (N, 5).
+    """
+    actifs, adverses = pions[:, ind_joueur], pions[:, 1 - ind_joueur]
+    attaques = np.empty(actifs.shape, dtype=np.int64)
+    for ind_pion in range(5):
+        croisés = np.zeros(len(pions), dtype=np.int64)
+        for ind_adverse in range(5):
+            croisés |= _CROISEMENTS[ind_pion + 1][adverses[:, ind_adverse]] << ind_adverse
+        # Un pion arrivé (12) pointe sur une entrée vide de la table: aucun renvoi
+        indices = ((ind_joueur * 5 + ind_pion) << 4 | actifs[:, ind_pion]) << 5 | croisés
+        attaques[:, ind_pion] = _BITS[_RENVOYÉS[indices]]
+    return attaques
+
+
+def caractéristiques(codes):
+    """Calculer les caractéristiques d'un lot de positions.
+    Args:
+        codes (array_like): Les entiers compacts des positions.
+    Returns:
+        ndarray: Tableau (N, F) de flottants, une colonne par caractéristique
+            de CARACTÉRISTIQUES, du point de vue du joueur au trait.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    pions = ((codes[:, None] >> (np.arange(10) * BITS_PION)) & MASQUE_PION).reshape(-1, 2, 5)
+    au_trait = ((codes >> BIT_TRAIT) & 1).astype(bool)
+    signe = np.where(au_trait, -1, 1)
+
+    restants = _RESTANTS[np.arange(2)[:, None], np.arange(5), pions]  # (N, 2, 5)
+    totaux = restants.sum(axis=2)
+    tempo = totaux - restants.max(axis=2)
+    progrès = np.array(_DÉPART) - totaux
+    arrivés = (pions == 12).sum(axis=2)
+    attaques = np.stack([_attaques(pions, 0).max(axis=1), _attaques(pions, 1).max(axis=1)],
+                        axis=1)
+
+    résultat = np.empty((len(codes), len(CARACTÉRISTIQUES)))
+    résultat[:, 0] = signe * (tempo[:, 1] - tempo[:, 0])
+    résultat[:, 1] = signe * (progrès[:, 0] - progrès[:, 1])
+    résultat[:, 2] = signe * (arrivés[:, 0] - arrivés[:, 1])
+    résultat[:, 3] = np.where(au_trait, attaques[:, 1], attaques[:, 0])
+    résultat[:, 4] = np.where(au_trait, attaques[:, 0], attaques[:, 1])
+    résultat[:, 5] = 1.0
+    return résultat
+
+
+def _caractéristiques_position(code):
+    """Calculer les caractéristiques d'une position, sans NumPy.
+    Returns:
+        list: Les valeurs de CARACTÉRISTIQUES, comme une ligne de `caractéristiques`.
+    """
+    ind_trait = (code >> BIT_TRAIT) & 1
+    tempo = [0, 0]
+    progrès = [0, 0]
+    arrivés = [0, 0]
+    attaques = [0, 0]
+    for ind_joueur in range(2):
+        pions = code >> (ind_joueur * BITS_JOUEUR)
+        adverses = code >> ((1 - ind_joueur) * BITS_JOUEUR)
+        # Masque des pions adverses sur chaque voie: la voie v porte les pions
+        # adverses à la position v (aller) ou 12 - v (retour)
+        voies = [0] * 7
+        for ind_adverse in range(5):
+            valeur = (adverses >> (ind_adverse * BITS_PION)) & MASQUE_PION
+            voies[valeur if valeur <= 6 else 12 - valeur] |= 1 << ind_adverse
+        restants_joueur = RESTANTS[ind_joueur]
+        total = pire = attaque = 0
+        for ind_pion in range(5):
+            position = (pions >> (ind_pion * BITS_PION)) & MASQUE_PION
+            restants = restants_joueur[ind_pion][position]
+            total += restants
+            if restants > pire:
+                pire = restants
+            if position == 12:
+                arrivés[ind_joueur] += 1
+            else:
+                renvoyés = _NOMBRES[TRANSITIONS[
+                    (((ind_joueur * 5 + ind_pion) << 4 | position) << 5)
+                    | voies[ind_pion + 1]][1]]
+                if renvoyés > attaque:
+                    attaque = renvoyés
+        tempo[ind_joueur] = total - pire
+        progrès[ind_joueur] = _DÉPART[ind_joueur] - total
+        attaques[ind_joueur] = attaque
+
+    autre = 1 - ind_trait
+    return [tempo[autre] - tempo[ind_trait], progrès[ind_trait] - progrès[autre],
+            arrivés[ind_trait] - arrivés[autre], attaques[ind_trait], attaques[autre], 1]
+
+
+def charger_poids(chemin):
+    """Lire des poids dans un fichier JSON.
+    Les caractéristiques absentes du fichier gardent leur poids par défaut.
+    Args:
+        chemin (str): Le fichier JSON, un objet associant un poids à chaque nom.
+    Returns:
+        dict: Les poids, par caractéristique.
+    Raises:
+        ValueError: Le fichier nomme une caractéristique inconnue.
+    """
+    with open(chemin, encoding='utf-8') as fichier:
+        lus = json.load(fichier)
+    inconnues = set(lus) - set(CARACTÉRISTIQUES)
+    if inconnues:
+        raise ValueError(f"Caractéristiques inconnues: {', '.join(sorted(inconnues))}.")
+    return {**POIDS, **{nom: float(poids) for nom, poids in lus.items()}}
+
+
+def sauvegarder_poids(poids, chemin):
+    """Écrire des poids dans un fichier JSON.
+    Args:
+        poids (dict): Les poids, par caractéristique.
+        chemin (str): Le fichier JSON à écrire.
+    """
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        json.dump({nom: poids[nom] for nom in CARACTÉRISTIQUES}, fichier,
+                  ensure_ascii=False, indent=2)
+
+
+class Évaluateur:
+    '''
+    Évaluation pondérée des positions.
+    S'appelle comme `recherche.évaluer` (une position, un score entier) et
+    s'utilise donc comme fonction d'évaluation de `recherche.Recherche`.
+    '''
+
+    def __init__(self, poids=None):
+        """Constructeur de la classe Évaluateur.
+        Args:
+            poids (dict/str): Les poids par caractéristique, ou le fichier JSON
+                qui les contient; par défaut, POIDS.
+        Raises:
+            ValueError: Une caractéristique est inconnue.
+        """
+        if isinstance(poids, str):
+            poids = charger_poids(poids)
+        poids = {**POIDS, **(poids or {})}
+        inconnues = set(poids) - set(CARACTÉRISTIQUES)
+        if inconnues:
+            raise ValueError(f"Caractéristiques inconnues: {', '.join(sorted(inconnues))}.")
+        self.poids = poids
+        # Les poids sont arrondis en points de score: les caractéristiques étant
+        # entières, les deux chemins d'évaluation calculent exactement le même score
+        self._vecteur = np.rint(np.array([poids[nom] for nom in CARACTÉRISTIQUES])
+                                * ÉCHELLE).astype(np.int64)
+        self._liste = self._vecteur.tolist()
+
+    def __call__(self, code):
+        """Évaluer une position.
+        Args:
+            code (int): L'entier compact représentant la position.
+        Returns:
+            int: Le score de la position du point de vue du joueur au trait.
+        """
+        tempo, progrès, arrivés, attaque, menace, au_trait = _caractéristiques_position(code)
+        w = self._liste
+        return w[0] * tempo + w[1] * progrès + w[2] * arrivés + w[3] * attaque \
+            + w[4] * menace + w[5] * au_trait
+
+    def évaluer_lot(self, codes):
+        """Évaluer un lot de positions en un seul appel vectorisé.
+        Args:
+            codes (array_like): Les entiers compacts des positions.
+        Returns:
+            ndarray: Le score entier de chaque position, du point de vue du
+                joueur au trait; le même que celui de `__call__`.
+        """
+        return caractéristiques(codes).astype(np.int64) @ self._vecteur
+
+    def probabilités(self, codes):
+        """Estimer la probabilité de victoire du joueur au trait.
+        Args:
+            codes (array_like): Les entiers compacts des positions.
+        Returns:
+            ndarray: La probabilité de chaque position.
+        """
+        poids = np.array([self.poids[nom] for nom in CARACTÉRISTIQUES])
+        return 1 / (1 + np.exp(-caractéristiques(codes) @ poids))
+
+
+def _exemples_archive(tâche):
+    """Extraire les caractéristiques et les étiquettes d'une part des parties d'une archive.
+    Args:
+        tâche (tuple): Le fichier de l'archive, l'indice de la part et le nombre
+            de parts; la part i compte les parties dont le rang modulo le nombre
+            de parts vaut i.
+    """
+    chemin, part, parts = tâche
+    codes = []
+    étiquettes = []
+    for rang, partie in enumerate(lire_parties(chemin)):
+        if rang % parts != part or partie.gagnant is None:
+            continue
+        for ind_joueur, _, code in rejouer(partie):
+            # Après le coup du joueur `ind_joueur`, l'adversaire est au trait
+            codes.append(code)
+            étiquettes.append(ind_joueur != partie.gagnant)
+    return caractéristiques(codes), np.array(étiquettes, dtype=np.float64)
+
+
+def exemples(archives, processus=None):
+    """Extraire les positions étiquetées d'archives de parties.
+    Chaque position jouée d'une partie terminée est étiquetée 1 si le joueur
+    au trait a gagné la partie, 0 autrement. Les parties de chaque archive sont
+    réparties entre les processus.
+    Args:
+        archives (list): Les fichiers d'archives (module `archive`).
+        processus (int): Le nombre de processus; par défaut, un par cœur.
+    Returns:
+        tuple: Le tableau (N, F) des caractéristiques et le tableau (N,) des étiquettes.
+    """
+    processus = processus or os.cpu_count() or 1
+    tâches = [(chemin, part, processus) for chemin in archives for part in range(processus)]
+    if processus == 1:
+        morceaux = [_exemples_archive(tâche) for tâche in tâches]
+    else:
+        with ProcessPoolExecutor(processus) as exécuteur:
+            morceaux = list(exécuteur.map(_exemples_archive, tâches))
+    return (np.concatenate([x for x, _ in morceaux]),
+            np.concatenate([y for _, y in morceaux]))
+
+
+def ajuster(x, y, régularisation=RÉGULARISATION, itérations=ITÉRATIONS):
+    """Ajuster les poids par régression logistique (méthode de Newton).
+    Args:
+        x (ndarray): Tableau (N, F) des caractéristiques.
+        y (ndarray): Tableau (N,) des étiquettes (0 ou 1).
+        régularisation (float): Coefficient de la pénalité L2 des poids, par position.
+        itérations (int): Le nombre maximal d'itérations.
+    Returns:
+        tuple: Les poids, par caractéristique, et la perte logistique moyenne.
+    """
+    n, f = x.shape
+    pénalité = régularisation * n * np.eye(f)
+    pénalité[-1, -1] = 0.0  # le trait sert d'ordonnée à l'origine
+    w = np.zeros(f)
+    for _ in range(itérations):
+        p = 1 / (1 + np.exp(-x @ w))
+        gradient = x.T @ (p - y) + pénalité @ w
+        hessienne = (x * (p * (1 - p))[:, None]).T @ x + pénalité
+        pas = np.linalg.solve(hessienne, gradient)
+        w -= pas
+        if np.abs(pas).max() < 1e-8:
+            break
+    p = np.clip(1 / (1 + np.exp(-x @ w)), 1e-12, 1 - 1e-12)
+    perte = -np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))
+    return {nom: float(poids) for nom, poids in zip(CARACTÉRISTIQUES, w)}, float(perte)
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Ajustement des poids de l'évaluation")
+    analyseur.add_argument('archives', nargs='+', metavar='ARCHIVE',
+                           help="Archives de parties (voir le module archive).")
+    analyseur.add_argument('--sortie', default='poids.json', metavar='FICHIER',
+                           help="Fichier JSON des poids ajustés.")
+    analyseur.add_argument('--processus', type=int, default=None,
+                           help="Nombre de processus de l'extraction.")
+    analyseur.add_argument('--regularisation', type=float, default=RÉGULARISATION,
+                           help="Coefficient de la pénalité L2 des poids.")
+    arguments = analyseur.parse_args()
+
+    x, y = exemples(arguments.archives, arguments.processus)
+    poids, perte = ajuster(x, y, arguments.regularisation)
+    sauvegarder_poids(poids, arguments.sortie)
+    print(f"{len(y)} positions, perte logistique: {perte:.4f}")
+    for nom in CARACTÉRISTIQUES:
+        print(f"  {nom:<10}{poids[nom]:>10.4f}")
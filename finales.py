@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""Module de la table de finales du jeu Squadro
+Ce module résout exactement, par analyse rétrograde, toutes les positions où
+chaque joueur possède au plus N pions n'ayant pas terminé. Un pion arrivé à 12
+ne bouge plus et ne peut plus être renvoyé, de sorte que cet ensemble de
+positions est fermé: aucun coup n'en sort.
+
+Le résultat est écrit dans un fichier binaire compact (un entier signé de
+16 bits par position) que `TableFinale` ouvre avec `mmap`: chaque sondage lit
+deux octets sans charger le fichier en mémoire.
+
+Valeur d'une position, du point de vue du joueur au trait:
+    * 0: partie nulle (répétition sans fin);
+    * 1 + d: victoire en d demi-coups;
+    * -(1 + d): défaite en d demi-coups.
+
+Functions:
+    * générer - Génère une table de finales, en parallèle et de façon reprenable.
+Classes:
+    * TableFinale - Lecteur d'une table de finales.
+"""
+import mmap
+import os
+import struct
+import sys
+from argparse import ArgumentParser
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+
+from moteur import BIT_TRAIT, BITS_JOUEUR, MASQUE_JOUEUR, gagnant, jouer_compact, pions_actifs
+
+SIGNATURE = b'SQTF'
+VERSION = 1
+_ENTÊTE = struct.Struct('<4sBBxxI4x')  # signature, version, pions, taille par joueur
+TAILLE_LOT = 1 << 16
+
+
+def _états_joueur(pions):
+    """Énumérer les pions d'un joueur ayant au plus `pions` pions non terminés.
+    Returns:
+        list: Les champs de 20 bits (voir le module `moteur`), en ordre croissant.
+    """
+    états = []
+    for positions in product(range(13), repeat=5):
+        if sum(1 for position in positions if position != 12) <= pions:
+            états.append(sum(position << (4 * ind) for ind, position in enumerate(positions)))
+    return sorted(états)
+
+
+class _Indexation:
+    '''
+    Correspondance entre les positions couvertes et leur indice dans la table.
+    '''
+
+    def __init__(self, pions):
+        self.pions = pions
+        self.états = _états_joueur(pions)
+        self.rangs = {état: rang for rang, état in enumerate(self.états)}
+        self.taille = len(self.états)
+
+    def __len__(self):
+        return 2 * self.taille * self.taille
+
+    def indice(self, code):
+        """Retourner l'indice d'une position; None si elle n'est pas couverte."""
+        rang1 = self.rangs.get(code & MASQUE_JOUEUR)
+        rang2 = self.rangs.get((code >> BITS_JOUEUR) & MASQUE_JOUEUR)
+        if rang1 is None or rang2 is None:
+            return None
+        return (((code >> BIT_TRAIT) & 1) * self.taille + rang1) * self.taille + rang2
+
+    def position(self, indice):
+        """Retourner l'entier compact de la position d'indice donné."""
+        trait_joueur, reste = divmod(indice, self.taille * self.taille)
+        rang1, rang2 = divmod(reste, self.taille)
+        return self.états[rang1] | self.états[rang2] << BITS_JOUEUR | trait_joueur << BIT_TRAIT
+
+
+@lru_cache(maxsize=None)
+def _indexation(pions):
+    """Retourner l'indexation des positions, construite une seule fois par processus."""
+    return _Indexation(pions)
+
+
+def _calculer_lot(pions, début, fin):
+    """Calculer les positions enfants d'un lot de positions.
+    Returns:
+        array: Pour chaque position, `pions` indices d'enfants (-1 si absent);
+            -2 en première case pour une position terminée.
+    """
+    indexation = _indexation(pions)
+    enfants = array('i', [-1]) * ((fin - début) * pions)
+    for indice in range(début, fin):
+        code = indexation.position(indice)
+        base = (indice - début) * pions
+        if gagnant(code) is not None:
+            enfants[base] = -2
+            continue
+        for rang, pion in enumerate(pions_actifs(code)):
+            enfants[base + rang] = indexation.indice(jouer_compact(code, pion))
+    return enfants
+
+
+def _fichier_lot(dossier, début):
+    return os.path.join(dossier, f'{début:012d}.bin')
+
+
+def _calculer_enfants(chemin, indexation, processus, taille_lot):
+    """Calculer les enfants de toutes les positions, lot par lot.
+    Les lots déjà calculés lors d'une génération interrompue sont conservés
+    dans le dossier `<chemin>.lots` et ne sont pas recalculés.
+    Returns:
+        array: Les indices des enfants, `pions` cases par position.
+    """
+    dossier = chemin + '.lots'
+    os.makedirs(dossier, exist_ok=True)
+    total = len(indexation)
+    lots = [(début, min(début + taille_lot, total)) for début in range(0, total, taille_lot)]
+    à_faire = [lot for lot in lots if not os.path.exists(_fichier_lot(dossier, lot[0]))]
+
+    with ProcessPoolExecutor(max_workers=processus) as exécuteur:
+        travaux = {exécuteur.submit(_calculer_lot, indexation.pions, début, fin): début
+                   for début, fin in à_faire}
+        for travail, début in travaux.items():
+            temporaire = _fichier_lot(dossier, début) + '.tmp'
+            with open(temporaire, 'wb') as fichier:
+                travail.result().tofile(fichier)
+            os.replace(temporaire, _fichier_lot(dossier, début))
+
+    enfants = array('i')
+    for début, fin in lots:
+        with open(_fichier_lot(dossier, début), 'rb') as fichier:
+            enfants.fromfile(fichier, (fin - début) * indexation.pions)
+    return enfants
+
+
+def _résoudre(enfants, pions, total):
+    """Résoudre toutes les positions par analyse rétrograde.
+    Les positions sont traitées en ordre croissant de distance à partir des
+    positions terminées: une position est gagnante dès qu'un enfant est perdant
+    et perdante lorsque tous ses enfants sont gagnants.
+    Returns:
+        array: La valeur de chaque position (voir la documentation du module).
+    """
+    # Prédécesseurs de chaque position, sous forme compressée
+    départs = array('i', [0]) * (total + 1)
+    restants = array('b', [0]) * total
+    for indice in range(total):
+        for rang in range(pions):
+            enfant = enfants[indice * pions + rang]
+            if enfant >= 0:
+                départs[enfant + 1] += 1
+                restants[indice] += 1
+    for indice in range(total):
+        départs[indice + 1] += départs[indice]
+    curseurs = array('i', départs[:total])
+    parents = array('i', [0]) * départs[total]
+    for indice in range(total):
+        for rang in range(pions):
+            enfant = enfants[indice * pions + rang]
+            if enfant >= 0:
+                parents[curseurs[enfant]] = indice
+                curseurs[enfant] += 1
+
+    valeurs = array('h', [0]) * total
+    file = deque()
+    for indice in range(total):
+        if enfants[indice * pions] == -2:
+            # Le joueur au trait a perdu (ou, position inatteignable, a déjà gagné)
+            valeurs[indice] = -1
+            file.append(indice)
+
+    while file:
+        indice = file.popleft()
+        valeur = valeurs[indice]
+        for parent in parents[départs[indice]:départs[indice + 1]]:
+            if valeurs[parent]:
+                continue
+            if valeur < 0:
+                valeurs[parent] = 1 - valeur  # victoire en d + 1 demi-coups
+                file.append(parent)
+            else:
+                restants[parent] -= 1
+                if not restants[parent]:
+                    valeurs[parent] = -valeur - 1  # défaite en d + 1 demi-coups
+                    file.append(parent)
+    return valeurs
+
+
+def générer(chemin, pions=2, processus=None, taille_lot=TAILLE_LOT):
+    """Générer une table de finales.
+    La génération est reprenable: les lots de positions déjà calculés sont
+    conservés sur le disque jusqu'à ce que la table soit écrite.
+    Args:
+        chemin (str): Le fichier de la table à écrire.
+        pions (int): Le nombre maximal de pions non terminés par joueur.
+        processus (int): Le nombre de processus; par défaut, le nombre de coeurs.
+        taille_lot (int): Le nombre de positions par lot.
+    Returns:
+        int: Le nombre de positions de la table.
+    """
+    indexation = _indexation(pions)
+    total = len(indexation)
+    enfants = _calculer_enfants(chemin, indexation, processus or os.cpu_count(), taille_lot)
+    valeurs = _résoudre(enfants, pions, total)
+    if sys.byteorder != 'little':
+        valeurs.byteswap()
+
+    temporaire = chemin + '.tmp'
+    with open(temporaire, 'wb') as fichier:
+        fichier.write(_ENTÊTE.pack(SIGNATURE, VERSION, pions, indexation.taille))
+        valeurs.tofile(fichier)
+    os.replace(temporaire, chemin)
+
+    dossier = chemin + '.lots'
+    for nom in os.listdir(dossier):
+        os.remove(os.path.join(dossier, nom))
+    os.rmdir(dossier)
+    return total
+
+
+class TableFinale:
+    '''
+    Lecteur d'une table de finales ouverte avec `mmap`. Transmise à un autre
+    processus, la table y rouvre son fichier.
+    '''
+
+    def __init__(self, chemin):
+        """Constructeur de la classe TableFinale.
+        Args:
+            chemin (str): Le fichier de la table.
+        Raises:
+            ValueError: Le fichier n'est pas une table de finales.
+        """
+        self.chemin = chemin
+        with open(chemin, 'rb') as fichier:
+            self._carte = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, pions, taille = _ENTÊTE.unpack_from(self._carte)
+        if signature != SIGNATURE or version != VERSION:
+            raise ValueError(f"{chemin} n'est pas une table de finales.")
+        self._indexation = _indexation(pions)
+        if self._indexation.taille != taille:
+            raise ValueError(f"{chemin} n'est pas une table de finales.")
+        self._valeur = struct.Struct('<h')
+
+    def __reduce__(self):
+        return TableFinale, (self.chemin,)
+
+    def fermer(self):
+        """Fermer le fichier de la table."""
+        self._carte.close()
+
+    def sonder(self, code):
+        """Lire la valeur d'une position.
+        Args:
+            code (int): L'entier compact représentant la position.
+        Returns:
+            int/None: La valeur de la position (voir la documentation du module);
+                None si la position n'est pas couverte par la table.
+        """
+        indice = self._indexation.indice(code)
+        if indice is None:
+            return None
+        return self._valeur.unpack_from(self._carte, _ENTÊTE.size + 2 * indice)[0]
+
+    def meilleur_coup(self, code):
+        """Choisir le meilleur coup d'une position couverte par la table.
+        Le coup choisi gagne le plus vite, perd le plus lentement ou conserve
+        la nulle.
+        Args:
+            code (int): L'entier compact représentant la position.
+        Returns:
+            tuple/None: Le pion à jouer et la valeur de la position; None si la
+                position n'est pas couverte ou si la partie est terminée.
+        """
+        valeur = self.sonder(code)
+        if valeur is None or gagnant(code) is not None:
+            return None
+        for pion in pions_actifs(code):
+            # La valeur de l'enfant est du point de vue de l'adversaire
+            enfant = self.sonder(jouer_compact(code, pion))
+            if (valeur > 0 and enfant == -(valeur - 1)) or (valeur < 0 and enfant == -valeur - 1) \
+                    or (valeur == 0 and enfant == 0):
+                return pion, valeur
+        return None
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Génération d'une table de finales")
+    analyseur.add_argument('chemin', help="Fichier de la table à écrire.")
+    analyseur.add_argument('--pions', type=int, default=2,
+                           help="Nombre maximal de pions non terminés par joueur.")
+    analyseur.add_argument('--processus', type=int, default=None,
+                           help="Nombre de processus.")
+    arguments = analyseur.parse_args()
+    print(f"{générer(arguments.chemin, arguments.pions, arguments.processus)} positions")
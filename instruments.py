@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""Module d'instrumentation du jeu Squadro
+Ce module compte et chronomètre les chemins critiques du jeu: coups appliqués,
+pions renvoyés par `mecanique_bouger_pion`, rendus du plateau, validations,
+requêtes HTTP par point d'accès et, pour les robots, noeuds et coupures des
+recherches alpha-bêta ou simulations Monte-Carlo.
+
+L'instrumentation ne coûte rien tant qu'elle est inactive: `activer` remplace
+les méthodes observées par des enveloppes qui mesurent puis appellent la
+méthode d'origine, et `désactiver` remet les méthodes d'origine en place.
+Les durées sont regroupées dans des histogrammes à cases logarithmiques
+(puissances de deux de microsecondes). Les mesures peuvent être prises par
+plusieurs fils à la fois, par exemple ceux du serveur local: un verrou protège
+chaque mise à jour.
+Classes:
+    * Histogramme - Distribution des durées d'une opération.
+Functions:
+    * activer - Active l'instrumentation.
+    * désactiver - Désactive l'instrumentation.
+    * réinitialiser - Remet les compteurs et les histogrammes à zéro.
+    * compter - Incrémente un compteur.
+    * chronométrer - Ajoute une durée à un histogramme.
+    * instantané - Retourne les mesures sous forme sérialisable en JSON.
+    * fusionner - Ajoute les mesures d'un instantané (d'un autre processus).
+    * résumé - Formate les mesures.
+    * rapporter - Affiche les mesures et les sauvegarde en JSON.
+"""
+import functools
+import json
+import threading
+from time import perf_counter
+
+CASES = 40
+
+_compteurs = {}
+_histogrammes = {}
+_originaux = []
+_verrou = threading.Lock()
+
+
+class Histogramme:
+    '''
+    Distribution des durées d'une opération.
+    La case i compte les durées de moins de 2**i microsecondes (et d'au moins
+    2**(i - 1) microsecondes).
+    '''
+    __slots__ = ('nombre', 'total', 'min', 'max', 'cases')
+
+    def __init__(self):
+        self.nombre = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.cases = [0] * CASES
+
+    def ajouter(self, durée):
+        """Ajouter une durée, en secondes."""
+        self.nombre += 1
+        self.total += durée
+        self.min = min(self.min, durée)
+        self.max = max(self.max, durée)
+        self.cases[min(int(durée * 1e6).bit_length(), CASES - 1)] += 1
+
+    def quantile(self, q):
+        """Estimer un quantile des durées.
+        Args:
+            q (float): Le quantile, entre 0 et 1.
+        Returns:
+            float: La borne supérieure de la case du quantile, en secondes.
+        """
+        rang = q * self.nombre
+        cumul = 0
+        for case, nombre in enumerate(self.cases):
+            cumul += nombre
+            if cumul >= rang and nombre:
+                return min(2 ** case * 1e-6, self.max)
+        return self.max
+
+    def fusionner(self, autre):
+        """Ajouter les durées d'un autre histogramme."""
+        self.nombre += autre.nombre
+        self.total += autre.total
+        self.min = min(self.min, autre.min)
+        self.max = max(self.max, autre.max)
+        self.cases = [nombre + autre_nombre
+                      for nombre, autre_nombre in zip(self.cases, autre.cases)]
+
+    def vers_dict(self):
+        return {'nombre': self.nombre, 'total': self.total, 'min': self.min,
+                'max': self.max, 'cases': list(self.cases)}
+
+    @classmethod
+    def depuis_dict(cls, données):
+        histogramme = cls()
+        for attribut in cls.__slots__:
+            setattr(histogramme, attribut, données[attribut])
+        return histogramme
+
+
+def compter(nom, nombre=1):
+    """Incrémenter un compteur.
+    Args:
+        nom (str): Le nom du compteur.
+        nombre (int): La valeur à ajouter.
+    """
+    with _verrou:
+        _compteurs[nom] = _compteurs.get(nom, 0) + nombre
+
+
+def chronométrer(nom, durée):
+    """Ajouter une durée à un histogramme.
+    Args:
+        nom (str): Le nom de l'opération.
+        durée (float): La durée en secondes.
+    """
+    with _verrou:
+        histogramme = _histogrammes.get(nom)
+        if histogramme is None:
+            histogramme = _histogrammes[nom] = Histogramme()
+        histogramme.ajouter(durée)
+
+
+def _envelopper(classe, méthode, nom, observer=None):
+    """Remplacer une méthode par une enveloppe qui la chronomètre.
+    Args:
+        classe (type): La classe de la méthode.
+        méthode (str): Le nom de la méthode.
+        nom (str/callable): Le nom de l'histogramme, ou une fonction des
+            arguments de l'appel qui le retourne.
+        observer (callable): Fonction appelée avec les arguments de l'appel
+            et son résultat, pour mettre à jour des compteurs.
+    """
+    originale = classe.__dict__[méthode]
+
+    @functools.wraps(originale)
+    def enveloppe(*args, **kwargs):
+        début = perf_counter()
+        try:
+            résultat = originale(*args, **kwargs)
+        finally:
+            chronométrer(nom(*args, **kwargs) if callable(nom) else nom, perf_counter() - début)
+        if observer is not None:
+            observer(args, résultat)
+        return résultat
+
+    setattr(classe, méthode, enveloppe)
+    _originaux.append((classe, méthode, originale))
+
+
+def _observer_mécanique(args, résultat):
+    compter('coups')
+    compter('pions_renvoyés', bin(résultat[1]).count('1'))
+
+
+def _observer_recherche(args, rapport):
+    recherche = args[0]
+    compter('recherches')
+    compter('noeuds', rapport.noeuds)
+    compter('coupures', recherche.coupures)
+
+
+def _observer_mcts(args, rapport):
+    compter('recherches_mcts')
+    compter('simulations', rapport.simulations)
+
+
+def activer():
+    """Activer l'instrumentation.
+    Les modules observés sont importés ici afin que ce module n'en dépende
+    pas lorsqu'il est inactif.
+    """
+    if _originaux:
+        return
+    from mcts import MCTS
+    from recherche import Recherche
+    from squadro import Squadro
+
+    _envelopper(Squadro, 'validation', 'validation')
+    _envelopper(Squadro, 'déplacer_pion', 'déplacer_pion')
+    _envelopper(Squadro, 'mecanique_bouger_pion', 'mecanique_bouger_pion', _observer_mécanique)
+    _envelopper(Squadro, 'partie_terminée', 'partie_terminée')
+    _envelopper(Squadro, '__str__', 'affichage')
+    _envelopper(Squadro, 'jouer_coup', lambda partie, joueur, strategie='hasard', temps=1.0:
+                f'jouer_coup.{strategie}')
+    _envelopper(Recherche, 'chercher', 'recherche', _observer_recherche)
+    _envelopper(MCTS, 'chercher', 'mcts', _observer_mcts)
+    try:
+        from api import ClientSquadro
+    except ImportError:
+        return
+    _envelopper(ClientSquadro, '_requête', lambda client, méthode, point, **_: f'http.{point}')
+
+
+def désactiver():
+    """Désactiver l'instrumentation et remettre les méthodes d'origine en place."""
+    while _originaux:
+        classe, méthode, originale = _originaux.pop()
+        setattr(classe, méthode, originale)
+
+
+def réinitialiser():
+    """Remettre les compteurs et les histogrammes à zéro."""
+    with _verrou:
+        _compteurs.clear()
+        _histogrammes.clear()
+
+
+def instantané():
+    """Retourner les mesures sous forme sérialisable en JSON.
+    Returns:
+        dict: Les compteurs et les histogrammes.
+    """
+    with _verrou:
+        return {'compteurs': dict(_compteurs),
+                'histogrammes': {nom: histogramme.vers_dict()
+                                 for nom, histogramme in _histogrammes.items()}}
+
+
+def fusionner(mesures):
+    """Ajouter les mesures d'un instantané, par exemple celui d'un autre processus.
+    Args:
+        mesures (dict): Un instantané retourné par `instantané`.
+    """
+    with _verrou:
+        for nom, nombre in mesures['compteurs'].items():
+            _compteurs[nom] = _compteurs.get(nom, 0) + nombre
+        for nom, données in mesures['histogrammes'].items():
+            histogramme = Histogramme.depuis_dict(données)
+            if nom in _histogrammes:
+                _histogrammes[nom].fusionner(histogramme)
+            else:
+                _histogrammes[nom] = histogramme
+
+
+def résumé():
+    """Formater les mesures.
+    Returns:
+        str: Un tableau des histogrammes (appels, durée totale, moyenne,
+            médiane, 99e centile et maximum) suivi des compteurs.
+    """
+    mesures = instantané()
+    aff = f"{'opération':<26}{'appels':>10}{'total (s)':>11}{'moyenne':>10}" \
+        f"{'médiane':>10}{'p99':>10}{'max':>10}  (µs)\n"
+    for nom, données in sorted(mesures['histogrammes'].items()):
+        histogramme = Histogramme.depuis_dict(données)
+        aff += f"{nom:<26}{histogramme.nombre:>10}{histogramme.total:>11.3f}" \
+            f"{1e6 * histogramme.total / histogramme.nombre:>10.1f}" \
+            f"{1e6 * histogramme.quantile(0.5):>10.0f}" \
+            f"{1e6 * histogramme.quantile(0.99):>10.0f}{1e6 * histogramme.max:>10.0f}\n"
+    for nom, nombre in sorted(mesures['compteurs'].items()):
+        aff += f"{nom}: {nombre}\n"
+    return aff
+
+
+def rapporter(chemin=None):
+    """Afficher les mesures et, le cas échéant, les sauvegarder en JSON.
+    Args:
+        chemin (str): Le fichier JSON à écrire; None pour seulement afficher.
+    """
+    print(résumé(), end='')
+    if chemin is not None:
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            json.dump(instantané(), fichier, ensure_ascii=False, indent=2)
@@ -4,13 +4,17 @@
 Ce programme permet de joueur au jeu Squadro.
 Examples:
     `> python3 main.py --help`
-        usage: main.py [-h] [-p] IDUL [IDUL ...]
+        usage: main.py [-h] [-a] [-l] [-p] [-s N] [--strategies J1 J2] [-t TEMPS]
+                       [--processus PROCESSUS] [IDUL ...]
         Squadro - Phase 1
         posipaOktional arguments:
         IDUL           IDUL du ou des joueur(s)
         optional arguments:
         -h, --help     show this help message and exit
+        -l, --local    Jouer contre un serveur local
         -p, --parties  Lister les 20 dernières parties
+        -s N, --simuler N  Simuler N parties entre deux stratégies
+    `> python3 main.py --simuler 1000 --strategies alphabeta hasard`
     `> python3 main.py jowic42`
         Légende:
           □ = jowic42
@@ -39,25 +43,79 @@ Examples:
 """
 
 
-from api import lister_parties, débuter_partie, jouer_coup
-from squadro import analyser_commande, afficher_parties
+import atexit
+
+import instruments
+from automatique import jouer_automatique
+from finales import TableFinale
+from api import configurer, lister_parties, débuter_partie, jouer_coup
+from parallele import RechercheParallèle
+from serveur import lancer
+from squadro import (Squadro, analyser_commande, afficher_parties, lister_parties_local,
+                     sauvergarder_partie_local)
+from simulation import afficher_simulation, simuler
 
 
 if __name__ == "__main__":
 
     args = analyser_commande()
 
-    if args.parties:
-        print(afficher_parties(lister_parties(args.IDUL)))
+    args.stats = args.stats or args.stats_json is not None
+    if args.stats:
+        instruments.activer()
+        atexit.register(instruments.rapporter, args.stats_json)
+
+    if args.poids:
+        # Importé ici: le module evaluation nécessite NumPy
+        from evaluation import Évaluateur
+        Squadro.évaluation = staticmethod(Évaluateur(args.poids))
+
+    if args.finales:
+        # Chargée avant la recherche parallèle, qui la transmet à ses processus
+        Squadro.finales = TableFinale(args.finales)
+
+    if args.coeurs and args.coeurs > 1:
+        Squadro.processus_mcts = args.coeurs
+        Squadro.parallèle = RechercheParallèle(args.coeurs,
+                                               évaluation=Squadro.évaluation,
+                                               finales=Squadro.finales)
+        atexit.register(Squadro.parallèle.fermer)
+
+    if args.local:
+        # Les fonctions du module api s'adressent au serveur local
+        # En partie interactive, le robot réfléchit pendant que le joueur choisit son coup
+        configurer(lancer(strategie=args.strategies[1], temps=args.temps,
+                          anticiper=not (args.simuler or args.automatique)).url)
+
+    if args.simuler:
+        print(afficher_simulation(simuler(args.simuler, args.strategies, args.temps,
+                                          args.processus, archive=args.archive,
+                                          statistiques=args.stats, poids=args.poids)))
+    elif args.parties:
+        parties = lister_parties_local(args.IDUL) if args.local else lister_parties(args.IDUL)
+        print(afficher_parties(parties))
+    elif args.automatique:
+        _, gagnant, _ = jouer_automatique(
+            args.IDUL, args.strategies[0], args.temps,
+            sauvegarder=sauvergarder_partie_local if args.local else None)
+        print(f'\n        {gagnant} a gagné la partie')
     elif not args.parties and args.IDUL:
         débuter_partie_retour = débuter_partie(args.IDUL)
         id_jeu = débuter_partie_retour['id']
         prochain_joueur = débuter_partie_retour['prochain_joueur']
         état_jeu = débuter_partie_retour['état']
 
-        while état_jeu:
-            print(f'\n        Au tour de {prochain_joueur} de jouer')
-            coup = input("        Choissisez le pion à déplacer: ")
-            état_tout = jouer_coup(id_jeu, prochain_joueur, coup)
-            état_jeu = état_tout['état']
-            prochain_joueur = état_tout['prochain_joueur']
+        try:
+            while état_jeu:
+                if args.local:
+                    sauvergarder_partie_local(id_jeu, prochain_joueur, état_jeu)
+                print(f'\n        Au tour de {prochain_joueur} de jouer')
+                coup = input("        Choissisez le pion à déplacer: ")
+                état_tout = jouer_coup(id_jeu, prochain_joueur, coup)
+                état_jeu = état_tout['état']
+                prochain_joueur = état_tout['prochain_joueur']
+        except StopIteration as gagnant:
+            if args.local:
+                # L'état final, après le coup gagnant, plutôt que celui d'avant l'échange
+                sauvergarder_partie_local(id_jeu, None, gagnant.état or état_jeu, str(gagnant))
+            print(f'\n        {gagnant} a gagné la partie')
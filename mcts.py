@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Module de recherche Monte-Carlo du jeu Squadro
+Ce module implémente une recherche arborescente Monte-Carlo (MCTS) avec une
+sélection UCT et des parties aléatoires jouées avec la mécanique du module
+`moteur`. La recherche accepte un budget de simulations ou de temps, réutilise
+le sous-arbre du coup précédent et peut répartir des arbres indépendants sur
+plusieurs processus (parallélisme à la racine) dont les statistiques sont
+fusionnées au moment de la décision.
+Attributes:
+    EXPLORATION (float): Constante d'exploration de la formule UCT.
+    COUPS_MAX (int): Longueur maximale d'une partie aléatoire; au-delà, elle est nulle.
+Classes:
+    * Noeud - Un noeud de l'arbre de recherche.
+    * RapportMCTS - Résultat d'une recherche.
+    * MCTS - Recherche Monte-Carlo persistante d'un coup à l'autre.
+"""
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from math import log, sqrt
+from time import perf_counter
+
+from moteur import gagnant, jouer_compact, pions_actifs, trait
+
+EXPLORATION = 1.4
+COUPS_MAX = 500
+INTERVALLE_HORLOGE = 64  # nombre de simulations entre deux lectures de l'horloge
+
+
+class Noeud:
+    '''
+    Un noeud de l'arbre de recherche.
+    Les gains sont comptés du point de vue du joueur ayant joué le coup menant
+    au noeud (1 par victoire, 0,5 par partie nulle).
+    '''
+    __slots__ = ('code', 'enfants', 'non_essayés', 'visites', 'gains')
+
+    def __init__(self, code):
+        """Constructeur de la classe Noeud.
+        Args:
+            code (int): L'entier compact de la position du noeud.
+        """
+        self.code = code
+        self.enfants = {}
+        self.non_essayés = pions_actifs(code) if gagnant(code) is None else []
+        self.visites = 0
+        self.gains = 0.0
+
+    def sélectionner(self, exploration):
+        """Choisir l'enfant maximisant la formule UCT.
+        Returns:
+            tuple: Le pion joué et le noeud enfant choisi.
+        """
+        facteur = exploration * sqrt(log(self.visites))
+        return max(self.enfants.items(),
+                   key=lambda item: item[1].gains / item[1].visites
+                   + facteur / sqrt(item[1].visites))
+
+
+class RapportMCTS(namedtuple('RapportMCTS', ['coup', 'statistiques', 'simulations', 'durée'])):
+    """Résultat d'une recherche Monte-Carlo.
+    Attributes:
+        coup (int): Le numéro du pion à déplacer.
+        statistiques (dict): Pour chaque pion, le nombre de visites et la valeur
+            moyenne (taux de gain estimé du joueur au trait).
+        simulations (int): Le nombre de simulations, tous processus confondus.
+        durée (float): La durée de la recherche en secondes.
+    """
+    __slots__ = ()
+
+
+def _partie_aléatoire(code, générateur):
+    """Terminer une partie au hasard.
+    Returns:
+        int/None: L'indice du gagnant; None si la partie dépasse COUPS_MAX coups.
+    """
+    for _ in range(COUPS_MAX):
+        vainqueur = gagnant(code)
+        if vainqueur is not None:
+            return vainqueur
+        code = jouer_compact(code, générateur.choice(pions_actifs(code)))
+    return None
+
+
+def _itérer(racine, exploration, générateur):
+    """Faire une simulation: sélection, expansion, partie aléatoire et rétropropagation."""
+    chemin = [racine]
+    noeud = racine
+    while not noeud.non_essayés and noeud.enfants:
+        noeud = noeud.sélectionner(exploration)[1]
+        chemin.append(noeud)
+
+    if noeud.non_essayés:
+        pion = noeud.non_essayés.pop(générateur.randrange(len(noeud.non_essayés)))
+        enfant = Noeud(jouer_compact(noeud.code, pion))
+        noeud.enfants[pion] = enfant
+        chemin.append(enfant)
+        noeud = enfant
+
+    vainqueur = _partie_aléatoire(noeud.code, générateur)
+    for noeud in chemin:
+        noeud.visites += 1
+        if vainqueur is None:
+            noeud.gains += 0.5
+        elif vainqueur != trait(noeud.code):
+            noeud.gains += 1.0
+
+
+def _développer(racine, simulations, temps, exploration, générateur):
+    """Développer un arbre jusqu'à l'épuisement du budget.
+    Returns:
+        int: Le nombre de simulations faites.
+    """
+    échéance = perf_counter() + temps if temps is not None else None
+    faites = 0
+    while simulations is None or faites < simulations:
+        if échéance is not None and faites % INTERVALLE_HORLOGE == 0 \
+                and perf_counter() > échéance:
+            break
+        _itérer(racine, exploration, générateur)
+        faites += 1
+    return faites
+
+
+def _statistiques_racine(racine):
+    """Retourner les visites et les gains de chaque enfant de la racine."""
+    return {pion: (enfant.visites, enfant.gains) for pion, enfant in racine.enfants.items()}
+
+
+def _chercher_processus(code, simulations, temps, exploration, graine):
+    """Développer un arbre indépendant dans un processus.
+    Returns:
+        tuple: Les statistiques des enfants de la racine et le nombre de simulations.
+    """
+    racine = Noeud(code)
+    faites = _développer(racine, simulations, temps, exploration, random.Random(graine))
+    return _statistiques_racine(racine), faites
+
+
+class MCTS:
+    '''
+    Recherche Monte-Carlo persistante d'un coup à l'autre.
+    '''
+
+    def __init__(self, simulations=None, temps=1.0, processus=1,
+                 exploration=EXPLORATION, graine=None):
+        """Constructeur de la classe MCTS.
+        Args:
+            simulations (int): Budget de simulations par processus; None pour
+                n'utiliser que le budget de temps.
+            temps (float): Budget de temps en secondes; None pour n'utiliser
+                que le budget de simulations.
+            processus (int): Nombre de processus; chaque processus supplémentaire
+                développe un arbre indépendant fusionné à la racine.
+            exploration (float): Constante d'exploration de la formule UCT.
+            graine (int): Graine du générateur aléatoire.
+        """
+        self.simulations = simulations
+        self.temps = temps
+        self.processus = processus
+        self.exploration = exploration
+        self.générateur = random.Random(graine)
+        self.racine = None
+        self._exécuteur = None
+
+    def fermer(self):
+        """Arrêter les processus de la recherche."""
+        if self._exécuteur is not None:
+            self._exécuteur.shutdown()
+            self._exécuteur = None
+
+    def _réutiliser(self, code):
+        """Retrouver la position dans l'arbre précédent, jusqu'à deux coups plus loin.
+        Returns:
+            Noeud: Le sous-arbre de la position; un nouveau noeud s'il est introuvable.
+        """
+        if self.racine is not None:
+            if self.racine.code == code:
+                return self.racine
+            for enfant in self.racine.enfants.values():
+                if enfant.code == code:
+                    return enfant
+                for petit_enfant in enfant.enfants.values():
+                    if petit_enfant.code == code:
+                        return petit_enfant
+        return Noeud(code)
+
+    def chercher(self, code, temps=None):
+        """Chercher le meilleur coup d'une position.
+        Args:
+            code (int): L'entier compact représentant la position.
+            temps (float): Budget de temps en secondes; par défaut, celui de l'instance.
+        Returns:
+            RapportMCTS: Le coup le plus visité et les statistiques de chaque pion.
+        """
+        début = perf_counter()
+        temps = self.temps if temps is None else temps
+        racine = self._réutiliser(code)
+
+        travaux = []
+        if self.processus > 1:
+            if self._exécuteur is None:
+                self._exécuteur = ProcessPoolExecutor(max_workers=self.processus - 1)
+            travaux = [self._exécuteur.submit(_chercher_processus, code, self.simulations,
+                                              temps, self.exploration,
+                                              self.générateur.getrandbits(32))
+                       for _ in range(self.processus - 1)]
+
+        faites = _développer(racine, self.simulations, temps, self.exploration, self.générateur)
+
+        # Fusionner les arbres des autres processus à la racine
+        fusion = {pion: list(valeurs) for pion, valeurs in _statistiques_racine(racine).items()}
+        for travail in travaux:
+            statistiques, simulations = travail.result()
+            faites += simulations
+            for pion, (visites, gains) in statistiques.items():
+                cumul = fusion.setdefault(pion, [0, 0.0])
+                cumul[0] += visites
+                cumul[1] += gains
+
+        if not fusion:
+            # Aucune simulation n'a pu être faite: jouer le premier coup légal
+            coup = pions_actifs(code)[0]
+            self.racine = None
+            return RapportMCTS(coup, {}, 0, perf_counter() - début)
+
+        statistiques = {pion: (visites, gains / visites if visites else 0.0)
+                        for pion, (visites, gains) in sorted(fusion.items())}
+        coup = max(statistiques, key=lambda pion: statistiques[pion][0])
+        self.racine = racine.enfants.get(coup)
+        return RapportMCTS(coup, statistiques, faites, perf_counter() - début)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Module du moteur compact du jeu Squadro
+Ce module représente une position de Squadro par un seul entier afin de pouvoir
+appliquer des millions de coups sans manipuler de listes, de dictionnaires ou de
+copies profondes. La conversion vers le format `état` de la classe Squadro ne se
+fait qu'aux extrémités (entrée et sortie du moteur).
+
+Format de l'entier compact (41 bits):
+    * bits 0 à 19: les 5 pions du joueur 1, 4 bits par pion (pion 1 aux bits 0 à 3);
+    * bits 20 à 39: les 5 pions du joueur 2, 4 bits par pion;
+    * bit 40: le joueur au trait (0 pour le joueur 1, 1 pour le joueur 2).
+
+Attributes:
+    VITESSES (tuple): Pour chaque joueur et chaque pion, le nombre de cases
+        parcourues à l'aller et au retour.
+    ÉTAT_INITIAL (int): La position de départ, joueur 1 au trait.
+    TRANSITIONS (tuple): Le résultat précalculé de chaque déplacement possible.
+    CROISEMENTS (tuple): Table indiquant si un pion adverse croise une voie.
+Functions:
+    * compacter - Convertit un `état` en entier compact.
+    * décompacter - Convertit un entier compact en `état`.
+    * position_pion - Retourne la position d'un pion dans un entier compact.
+    * trait - Retourne l'indice du joueur au trait.
+    * pions_actifs - Retourne les pions du joueur au trait pouvant encore bouger.
+    * gagnant - Retourne l'indice du gagnant ou None.
+    * transition - Retourne le résultat précalculé d'un déplacement.
+    * jouer_compact - Applique un coup du joueur au trait.
+"""
+
+BITS_PION = 4
+MASQUE_PION = 0xF
+BITS_JOUEUR = 5 * BITS_PION
+MASQUE_JOUEUR = (1 << BITS_JOUEUR) - 1
+BIT_TRAIT = 2 * BITS_JOUEUR
+
+VITESSES = (
+    ((3, 1), (1, 3), (2, 2), (1, 3), (3, 1)),  # joueur 1 - lignes
+    ((1, 3), (3, 1), (2, 2), (3, 1), (1, 3)),  # joueur 2 - colonnes
+)
+
+ÉTAT_INITIAL = 0
+
+
+def compacter(état, trait_joueur=0):
+    """Convertir un état de partie en entier compact.
+    Args:
+        état (list): L'état de la partie sous la forme d'une liste de deux
+            dictionnaires, tel que retourné par `Squadro.état_partie`.
+        trait_joueur (int): Indice du joueur au trait (0 ou 1).
+    Returns:
+        int: L'entier compact représentant la position.
+    """
+    code = trait_joueur << BIT_TRAIT
+    for ind_joueur in range(2):
+        for ind_pion, valeur in enumerate(état[ind_joueur]['pions']):
+            code |= valeur << (ind_joueur * BITS_JOUEUR + ind_pion * BITS_PION)
+    return code
+
+
+def décompacter(code, noms):
+    """Convertir un entier compact en état de partie.
+    Args:
+        code (int): L'entier compact représentant la position.
+        noms (list): Le nom des deux joueurs, le joueur 1 en premier.
+    Returns:
+        list: L'état de la partie sous la forme d'une liste de deux dictionnaires.
+    """
+    return [
+        {'nom': noms[ind_joueur],
+         'pions': [(code >> (ind_joueur * BITS_JOUEUR + ind_pion * BITS_PION)) & MASQUE_PION
+                   for ind_pion in range(5)]}
+        for ind_joueur in range(2)
+    ]
+
+
+def position_pion(code, ind_joueur, pion):
+    """Retourner la position d'un pion.
+    Args:
+        code (int): L'entier compact représentant la position.
+        ind_joueur (int): Indice du joueur (0 ou 1).
+        pion (int): Numéro du pion (de 1 à 5 inclusivement).
+    Returns:
+        int: La position du pion, entre 0 et 12 inclusivement.
+    """
+    return (code >> (ind_joueur * BITS_JOUEUR + (pion - 1) * BITS_PION)) & MASQUE_PION
+
+
+def trait(code):
+    """Retourner l'indice du joueur au trait.
+    Args:
+        code (int): L'entier compact représentant la position.
+    Returns:
+        int: 0 si le joueur 1 doit jouer; 1 autrement.
+    """
+    return (code >> BIT_TRAIT) & 1
+
+
+def pions_actifs(code):
+    """Retourner les pions du joueur au trait qui n'ont pas terminé.
+    Args:
+        code (int): L'entier compact représentant la position.
+    Returns:
+        list: Les numéros de pions (de 1 à 5) pouvant encore être déplacés.
+    """
+    pions = (code >> (trait(code) * BITS_JOUEUR)) & MASQUE_JOUEUR
+    return [pion for pion in range(1, 6)
+            if (pions >> ((pion - 1) * BITS_PION)) & MASQUE_PION != 12]
+
+
+def gagnant(code):
+    """Déterminer le gagnant d'une position.
+    Args:
+        code (int): L'entier compact représentant la position.
+    Returns:
+        int/None: L'indice du joueur ayant 4 pions arrivés; None autrement.
+    """
+    for ind_joueur in range(2):
+        pions = (code >> (ind_joueur * BITS_JOUEUR)) & MASQUE_JOUEUR
+        if bin(_quartets_nuls(pions ^ _ARRIVÉS)).count('1') >= 4:
+            return ind_joueur
+    return None
+
+
+def _avancer(pion, position, aller, retour, croisés):
+    """Avancer un pion sur sa voie.
+    Reproduit pas à pas la mécanique de `Squadro.mecanique_bouger_pion`, mais sur
+    des entiers seulement.
+    Args:
+        pion (int): Numéro du pion actif, soit aussi le numéro de sa voie.
+        position (int): Position actuelle du pion actif.
+        aller (int): Nombre de cases parcourues à l'aller.
+        retour (int): Nombre de cases parcourues au retour.
+        croisés (int): Masque de 5 bits; le bit k est à 1 si le pion adverse
+            k + 1 se trouve sur la voie du pion actif.
+    Returns:
+        tuple: La nouvelle position du pion actif et le masque des pions
+            adverses renvoyés.
+    """
+    partant = position <= 5
+    renvoyés = 0
+    for _ in range(aller if partant else retour):
+        position += 1
+        case = 0
+        if 0 < position <= 5:
+            case = position
+        elif 6 <= position < 12:
+            case = 12 - position
+
+        while 0 < case <= 5 and (croisés >> (case - 1)) & 1:
+            renvoyés |= 1 << (case - 1)
+            position += 1
+            case += 1
+
+        if partant and position >= 6:
+            position = 6
+            break
+        if position >= 12:
+            position = 12
+            break
+        if renvoyés:
+            break
+    return position, renvoyés
+
+
+def _construire_transitions():
+    """Précalculer le résultat de chaque déplacement possible.
+    Le résultat d'un déplacement ne dépend que du joueur, du pion, de sa position
+    et des pions adverses présents sur sa voie. Toutes ces combinaisons sont
+    calculées une seule fois avec `_avancer`, ce qui garantit un résultat
+    identique à la mécanique pas à pas.
+    Returns:
+        tuple: Les transitions, indexées par `_indice_transition`; chaque entrée
+            est la nouvelle position du pion actif et le masque des pions renvoyés.
+    """
+    transitions = [(0, 0)] * (2 * 5 * 16 * 32)
+    for ind_joueur in range(2):
+        for pion in range(1, 6):
+            aller, retour = VITESSES[ind_joueur][pion - 1]
+            for position in range(12):
+                for croisés in range(32):
+                    transitions[_indice_transition(ind_joueur, pion, position, croisés)] = \
+                        _avancer(pion, position, aller, retour, croisés)
+    return tuple(transitions)
+
+
+def _indice_transition(ind_joueur, pion, position, croisés):
+    """Calculer l'indice d'une entrée de TRANSITIONS."""
+    return (((ind_joueur * 5 + pion - 1) << 4 | position) << 5) | croisés
+
+
+def _construire_compression():
+    """Associer chaque motif de quartets nuls à un masque de 5 bits.
+    Returns:
+        dict: Pour chaque motif (bit 3 de chaque quartet), le masque de pions.
+    """
+    compression = {}
+    for masque in range(32):
+        motif = 0
+        for ind_pion in range(5):
+            if (masque >> ind_pion) & 1:
+                motif |= 0x8 << (ind_pion * BITS_PION)
+        compression[motif] = masque
+    return compression
+
+
+TRANSITIONS = _construire_transitions()
+_COMPRESSION = _construire_compression()
+_EXPANSION = tuple(
+    sum(MASQUE_PION << (ind_pion * BITS_PION) for ind_pion in range(5) if (masque >> ind_pion) & 1)
+    for masque in range(32))
+_SIX = tuple(valeur & 0x66666 for valeur in _EXPANSION)
+_QUARTETS_BAS = 0x77777
+_REPÉTITION = 0x11111
+_ARRIVÉS = 12 * _REPÉTITION
+
+# CROISEMENTS[pion][valeur] vaut 1 si un pion adverse à la position `valeur`
+# se trouve sur la voie `pion`.
+CROISEMENTS = tuple(
+    tuple(1 if valeur in (pion, 12 - pion) else 0 for valeur in range(16))
+    for pion in range(6))
+
+
+def transition(ind_joueur, pion, position, croisés):
+    """Retourner le résultat précalculé d'un déplacement.
+    Args:
+        ind_joueur (int): Indice du joueur actif (0 ou 1).
+        pion (int): Numéro du pion à déplacer (de 1 à 5 inclusivement).
+        position (int): Position actuelle du pion (de 0 à 11 inclusivement).
+        croisés (int): Masque de 5 bits des pions adverses présents sur la voie du pion.
+    Returns:
+        tuple: La nouvelle position du pion et le masque des pions adverses renvoyés.
+    """
+    return TRANSITIONS[_indice_transition(ind_joueur, pion, position, croisés)]
+
+
+def _quartets_nuls(valeur):
+    """Marquer le bit 3 de chaque quartet nul parmi les 5 quartets de `valeur`."""
+    return ~(((valeur & _QUARTETS_BAS) + _QUARTETS_BAS) | valeur | _QUARTETS_BAS) & 0x88888
+
+
+def jouer_compact(code, pion):
+    """Jouer un coup pour le joueur au trait.
+    Les pions adverses renvoyés retournent à 0 s'ils étaient à l'aller
+    et à 6 s'ils étaient au retour. Le trait passe ensuite à l'adversaire.
+    Aucune validation n'est faite: le pion doit pouvoir être déplacé.
+    Args:
+        code (int): L'entier compact représentant la position.
+        pion (int): Numéro du pion à déplacer (de 1 à 5 inclusivement).
+    Returns:
+        int: L'entier compact de la position résultante.
+    """
+    ind_joueur = (code >> BIT_TRAIT) & 1
+    décalage = ind_joueur * BITS_JOUEUR + (pion - 1) * BITS_PION
+    décalage_autre = (1 - ind_joueur) * BITS_JOUEUR
+    adverses = (code >> décalage_autre) & MASQUE_JOUEUR
+
+    # Pions adverses sur la voie, à l'aller (valeur pion) et au retour (valeur 12 - pion)
+    à_laller = _COMPRESSION[_quartets_nuls(adverses ^ (pion * _REPÉTITION))]
+    au_retour = _COMPRESSION[_quartets_nuls(adverses ^ ((12 - pion) * _REPÉTITION))]
+
+    position, renvoyés = TRANSITIONS[
+        (((ind_joueur * 5 + pion - 1) << 4 | (code >> décalage) & MASQUE_PION) << 5)
+        | à_laller | au_retour]
+
+    adverses = (adverses & ~_EXPANSION[renvoyés]) | _SIX[renvoyés & au_retour]
+    code &= ~((MASQUE_PION << décalage) | (MASQUE_JOUEUR << décalage_autre))
+    code |= (position << décalage) | (adverses << décalage_autre)
+    return code ^ (1 << BIT_TRAIT)
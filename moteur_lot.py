@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Module du moteur par lots du jeu Squadro
+Ce module fait avancer K parties à la fois avec NumPy. Les pions des K parties
+sont exposés dans un tableau (K, 2, 5) d'entiers non signés de 8 bits et
+chaque appel à `LotSquadro.jouer` applique un coup par partie en une seule
+étape vectorisée. Les déplacements proviennent de la table `moteur.TRANSITIONS`,
+ce qui reproduit exactement la mécanique de `Squadro.mecanique_bouger_pion`.
+
+Les 5 pions d'un joueur occupent les 5 premiers octets d'un mot de 64 bits;
+le tableau `pions` est une vue sur ces octets. Les calculs se font sur les mots
+entiers (un par joueur et par partie) plutôt que pion par pion.
+Ce module nécessite NumPy.
+Classes:
+    * LotSquadro - Un lot de K parties de Squadro.
+"""
+import numpy as np
+
+from moteur import BIT_TRAIT, BITS_PION, MASQUE_PION, TRANSITIONS
+from squadro import SquadroError
+
+_POSITIONS = np.array([position for position, _ in TRANSITIONS], dtype=np.int64)
+_RENVOYÉS = np.array([renvoyés for _, renvoyés in TRANSITIONS], dtype=np.int64)
+
+_MOT = np.dtype('<i8')  # petit-boutiste: l'octet 0 est le pion 1
+_OCTETS = 0x0101010101      # 1 dans chacun des 5 octets de pions
+_BAS = 0x7F7F7F7F7F
+_HAUTS = 0x8080808080
+_MULTIPLICATEUR = (1 << 32) | (1 << 25) | (1 << 18) | (1 << 11) | (1 << 4)
+_EXPANSION = np.array(
+    [sum(0xFF << (8 * ind) for ind in range(5) if (masque >> ind) & 1) for masque in range(32)],
+    dtype=np.int64)
+_SIX = _EXPANSION & 0x0606060606
+_GAGNANTS = np.array([bin(masque).count('1') >= 4 for masque in range(32)])
+_TIRAGES = 60
+
+
+def _octets_nuls(mots):
+    """Retourner le masque de 5 bits des octets nuls parmi les 5 octets de pions.
+    Le bit 7 de chaque octet nul est isolé, puis les 5 bits sont rassemblés aux
+    bits 32 à 36 par une seule multiplication, sans retenue possible entre eux.
+    """
+    # Les opérations se font en place pour éviter d'allouer des temporaires
+    nuls = mots & _BAS
+    nuls += _BAS
+    nuls |= mots
+    nuls |= _BAS
+    np.invert(nuls, out=nuls)
+    nuls &= _HAUTS
+    nuls >>= 7
+    nuls *= _MULTIPLICATEUR
+    nuls >>= 32
+    nuls &= 0x1F
+    return nuls
+
+
+def _construire_choix():
+    """Précalculer le choix d'un coup selon le masque des coups légaux.
+    Pour chaque masque de 5 bits et chaque tirage de 0 à 59, le coup choisi est
+    le (tirage modulo n)-ième pion légal; 60 étant divisible par 1, 2, 3, 4 et 5,
+    chaque pion légal est choisi avec la même probabilité.
+    Returns:
+        ndarray: Tableau (32, 60) des pions choisis (0 si aucun coup n'est légal).
+    """
+    choix = np.zeros((32, _TIRAGES), dtype=np.uint8)
+    for masque in range(1, 32):
+        légaux = [pion for pion in range(1, 6) if (masque >> (pion - 1)) & 1]
+        for tirage in range(_TIRAGES):
+            choix[masque, tirage] = légaux[tirage % len(légaux)]
+    return choix
+
+
+_CHOIX = _construire_choix()
+
+
+class LotSquadro:
+    '''
+    Un lot de K parties de Squadro avançant simultanément.
+    '''
+
+    def __init__(self, parties, pions=None, trait=None):
+        """Constructeur de la classe LotSquadro.
+        Args:
+            parties (int): Le nombre K de parties du lot.
+            pions (ndarray): Tableau (K, 2, 5) des positions de départ; par défaut,
+                tous les pions sont à 0.
+            trait (ndarray): Tableau (K,) de l'indice du joueur au trait;
+                par défaut, le joueur 1 joue en premier.
+        """
+        # Un mot par joueur et par partie; les mots d'un même joueur sont contigus
+        self._mots = np.zeros((2, parties), dtype=_MOT)
+        self.pions = self._mots.view(np.uint8).reshape(2, parties, 8)[:, :, :5] \
+            .transpose(1, 0, 2)
+        if pions is not None:
+            self.pions[...] = pions
+        self.trait = np.zeros(parties, dtype=np.uint8) if trait is None \
+            else np.array(trait, dtype=np.uint8)
+
+    def __len__(self):
+        return self._mots.shape[1]
+
+    @classmethod
+    def depuis_compacts(cls, codes):
+        """Construire un lot à partir d'entiers compacts du module `moteur`.
+        Args:
+            codes (list): Les entiers compacts des positions.
+        Returns:
+            LotSquadro: Le lot correspondant.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        pions = (codes[:, None] >> (np.arange(10) * BITS_PION)) & MASQUE_PION
+        return cls(len(codes), pions.reshape(-1, 2, 5), (codes >> BIT_TRAIT) & 1)
+
+    def vers_compacts(self):
+        """Convertir le lot en entiers compacts du module `moteur`.
+        Returns:
+            list: L'entier compact de chaque partie.
+        """
+        pions = self.pions.reshape(-1, 10).astype(np.int64)
+        codes = np.bitwise_or.reduce(pions << (np.arange(10) * BITS_PION), axis=1)
+        codes |= self.trait.astype(np.int64) << BIT_TRAIT
+        return [int(code) for code in codes]
+
+    def _gagnés(self):
+        """Retourner, pour chaque joueur, les parties où il a 4 pions arrivés."""
+        return _GAGNANTS[_octets_nuls(self._mots ^ (12 * _OCTETS))]
+
+    def gagnants(self):
+        """Déterminer le gagnant de chaque partie.
+        Returns:
+            ndarray: Tableau (K,) de l'indice du gagnant, ou -1 si la partie
+                n'est pas terminée.
+        """
+        gagnés = self._gagnés()
+        return np.where(gagnés[0], 0, np.where(gagnés[1], 1, -1)).astype(np.int8)
+
+    def parties_terminées(self):
+        """Déterminer quelles parties sont terminées.
+        Returns:
+            ndarray: Tableau (K,) de booléens.
+        """
+        gagnés = self._gagnés()
+        return gagnés[0] | gagnés[1]
+
+    def _mots_au_trait(self):
+        """Retourner les mots du joueur au trait et de son adversaire."""
+        # Échanger les deux mots des parties où le joueur 2 est au trait
+        échange = self._mots[0] ^ self._mots[1]
+        échange &= -self.trait.astype(np.int64)
+        return self._mots[0] ^ échange, self._mots[1] ^ échange
+
+    def _masques_légaux(self):
+        """Retourner le masque de 5 bits des coups légaux de chaque partie."""
+        mots_actifs, _ = self._mots_au_trait()
+        mots_actifs ^= 12 * _OCTETS
+        légaux = _octets_nuls(mots_actifs)
+        légaux ^= 0x1F
+        légaux[self.parties_terminées()] = 0
+        return légaux
+
+    def coups_légaux(self):
+        """Produire le masque des coups légaux du joueur au trait.
+        Returns:
+            ndarray: Tableau (K, 5) de booléens; le pion `i + 1` peut être joué
+                si l'élément `i` est vrai. Toute la ligne est fausse si la partie
+                est terminée.
+        """
+        return (self._masques_légaux()[:, None] >> np.arange(5)) & 1 != 0
+
+    def coups_au_hasard(self, générateur=None):
+        """Choisir un coup légal au hasard dans chaque partie.
+        Args:
+            générateur (Generator): Générateur NumPy à utiliser.
+        Returns:
+            ndarray: Tableau (K,) des pions choisis (de 1 à 5), ou 0 si la
+                partie est terminée.
+        """
+        générateur = générateur or np.random.default_rng()
+        tirages = générateur.integers(0, _TIRAGES, len(self), dtype=np.uint8)
+        return _CHOIX[self._masques_légaux(), tirages]
+
+    def jouer(self, coups):
+        """Jouer un coup dans chaque partie.
+        Les parties dont le coup vaut 0 ne sont pas modifiées; le trait passe
+        à l'adversaire dans toutes les autres.
+        Args:
+            coups (ndarray): Tableau (K,) des pions à déplacer (de 1 à 5), ou 0.
+        Raises:
+            SquadroError: Ce pion a déjà atteint la destination finale.
+        """
+        voie = np.asarray(coups).astype(np.int64)
+        inactives = voie == 0
+        trait = self.trait.astype(np.int64)
+        mots_actifs, adverses = self._mots_au_trait()
+
+        décalage = np.maximum(voie - 1, 0)
+        indices = trait * 5
+        indices += décalage
+        décalage <<= 3
+        position = mots_actifs >> décalage
+        position &= 0xFF
+        if ((position >= 12) & ~inactives).any():
+            raise SquadroError('Ce pion a déjà atteint la destination finale.')
+
+        # Pions adverses sur la voie, à l'aller (valeur pion) et au retour (valeur 12 - pion)
+        à_laller = _octets_nuls(adverses ^ (voie * _OCTETS))
+        voie -= 12
+        voie *= -_OCTETS
+        au_retour = _octets_nuls(adverses ^ voie)
+
+        indices <<= 4
+        indices |= position
+        indices <<= 5
+        indices |= à_laller
+        indices |= au_retour
+        nouvelle = _POSITIONS[indices]
+        renvoyés = _RENVOYÉS[indices]
+        nouvelle[inactives] = position[inactives]
+        renvoyés[inactives] = 0
+
+        nouvelle ^= position
+        nouvelle <<= décalage
+        mots_actifs ^= nouvelle
+        adverses &= ~_EXPANSION[renvoyés]
+        renvoyés &= au_retour
+        adverses |= _SIX[renvoyés]
+
+        # Replacer les mots du joueur 2 au trait à leur place
+        échange = mots_actifs ^ adverses
+        échange &= -trait
+        np.bitwise_xor(mots_actifs, échange, out=self._mots[0])
+        np.bitwise_xor(adverses, échange, out=self._mots[1])
+        self.trait ^= ~inactives
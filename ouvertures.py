@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Module du livre d'ouvertures du jeu Squadro
+Toutes les parties commencent de la même position (tous les pions à 0).
+Ce module recherche à l'avance, en profondeur, le meilleur coup de chaque
+position atteignable durant les premiers coups et l'écrit dans un fichier
+binaire d'enregistrements de taille fixe triés par position. `LivreOuvertures`
+ouvre ce fichier avec `mmap` et y cherche une position par recherche binaire.
+
+Format d'un enregistrement (12 octets, petit-boutiste):
+    * l'entier compact de la position (8 octets, voir le module `moteur`);
+    * le score du meilleur coup (2 octets, signé);
+    * le numéro du pion à jouer (1 octet), suivi d'un octet de remplissage.
+
+Functions:
+    * positions_ouverture - Énumère les positions des premiers coups.
+    * construire - Construit un livre d'ouvertures.
+Classes:
+    * LivreOuvertures - Lecteur d'un livre d'ouvertures.
+"""
+import mmap
+import os
+import struct
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+from moteur import ÉTAT_INITIAL, gagnant, jouer_compact, pions_actifs
+from recherche import Recherche
+
+SIGNATURE = b'SQLO'
+VERSION = 1
+_ENTÊTE = struct.Struct('<4sB3xI')  # signature, version, nombre d'enregistrements
+_ENREGISTREMENT = struct.Struct('<QhBx')
+PROFONDEUR_LIVRE = 4
+PROFONDEUR_RECHERCHE = 12
+
+
+def positions_ouverture(profondeur, départ=ÉTAT_INITIAL):
+    """Énumérer les positions atteignables durant les premiers coups.
+    Args:
+        profondeur (int): Le nombre de demi-coups depuis la position de départ.
+        départ (int): L'entier compact de la position de départ.
+    Returns:
+        list: Les entiers compacts des positions non terminées, sans doublons, triés.
+    """
+    positions = {départ}
+    niveau = {départ}
+    for _ in range(profondeur):
+        suivant = set()
+        for code in niveau:
+            if gagnant(code) is None:
+                suivant.update(jouer_compact(code, pion) for pion in pions_actifs(code))
+        positions |= suivant
+        niveau = suivant
+    return sorted(code for code in positions if gagnant(code) is None)
+
+
+def _analyser(code, profondeur, temps):
+    """Chercher le meilleur coup d'une position du livre.
+    Returns:
+        tuple: L'entier compact, le score et le pion à jouer.
+    """
+    rapport = Recherche().chercher(code, temps, profondeur)
+    return code, rapport.score, rapport.coup
+
+
+def construire(chemin, profondeur=PROFONDEUR_LIVRE, profondeur_recherche=PROFONDEUR_RECHERCHE,
+               temps=60.0, processus=None):
+    """Construire un livre d'ouvertures.
+    Args:
+        chemin (str): Le fichier du livre à écrire.
+        profondeur (int): Le nombre de demi-coups couverts par le livre.
+        profondeur_recherche (int): La profondeur de recherche de chaque position.
+        temps (float): Le budget de temps maximal de la recherche de chaque position.
+        processus (int): Le nombre de processus; par défaut, le nombre de coeurs.
+    Returns:
+        int: Le nombre de positions du livre.
+    """
+    positions = positions_ouverture(profondeur)
+    with ProcessPoolExecutor(max_workers=processus or os.cpu_count()) as exécuteur:
+        analyses = list(exécuteur.map(_analyser, positions,
+                                      [profondeur_recherche] * len(positions),
+                                      [temps] * len(positions), chunksize=8))
+
+    temporaire = chemin + '.tmp'
+    with open(temporaire, 'wb') as fichier:
+        fichier.write(_ENTÊTE.pack(SIGNATURE, VERSION, len(analyses)))
+        for code, score, coup in sorted(analyses):
+            fichier.write(_ENREGISTREMENT.pack(code, score, coup))
+    os.replace(temporaire, chemin)
+    return len(analyses)
+
+
+class LivreOuvertures:
+    '''
+    Lecteur d'un livre d'ouvertures ouvert avec `mmap`.
+    '''
+
+    def __init__(self, chemin):
+        """Constructeur de la classe LivreOuvertures.
+        Args:
+            chemin (str): Le fichier du livre.
+        Raises:
+            ValueError: Le fichier n'est pas un livre d'ouvertures.
+        """
+        with open(chemin, 'rb') as fichier:
+            self._carte = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, self._nombre = _ENTÊTE.unpack_from(self._carte)
+        if signature != SIGNATURE or version != VERSION:
+            raise ValueError(f"{chemin} n'est pas un livre d'ouvertures.")
+
+    def __len__(self):
+        return self._nombre
+
+    def fermer(self):
+        """Fermer le fichier du livre."""
+        self._carte.close()
+
+    def chercher(self, code):
+        """Chercher une position dans le livre.
+        Args:
+            code (int): L'entier compact représentant la position.
+        Returns:
+            tuple/None: Le pion à jouer et son score; None si la position est absente.
+        """
+        bas, haut = 0, self._nombre
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            position, score, coup = _ENREGISTREMENT.unpack_from(
+                self._carte, _ENTÊTE.size + milieu * _ENREGISTREMENT.size)
+            if position == code:
+                return coup, score
+            if position < code:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        return None
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Construction d'un livre d'ouvertures")
+    analyseur.add_argument('chemin', help="Fichier du livre à écrire.")
+    analyseur.add_argument('--profondeur', type=int, default=PROFONDEUR_LIVRE,
+                           help="Nombre de demi-coups couverts par le livre.")
+    analyseur.add_argument('--recherche', type=int, default=PROFONDEUR_RECHERCHE,
+                           help="Profondeur de recherche de chaque position.")
+    analyseur.add_argument('--temps', type=float, default=60.0,
+                           help="Budget de temps maximal par position, en secondes.")
+    analyseur.add_argument('--processus', type=int, default=None,
+                           help="Nombre de processus.")
+    arguments = analyseur.parse_args()
+    nombre = construire(arguments.chemin, arguments.profondeur, arguments.recherche,
+                        arguments.temps, arguments.processus)
+    print(f"{nombre} positions")
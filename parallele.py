@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""Module de la recherche parallèle du jeu Squadro
+Ce module répartit la recherche alpha-bêta du module `recherche` sur plusieurs
+processus selon le principe du « lazy SMP »: tous les processus cherchent la
+même position par approfondissement itératif et partagent une seule table de
+transposition. Chaque processus auxiliaire parcourt les coups de la racine dans
+un ordre décalé, de sorte que les processus explorent d'abord des sous-arbres
+différents; les résultats déposés dans la table par l'un évitent ensuite ce
+travail aux autres.
+
+La table partagée réside dans un segment `multiprocessing.shared_memory` et
+n'utilise aucun verrou: la clé de chaque entrée est enregistrée combinée (par
+ou exclusif) à ses données, de sorte qu'une entrée dont la clé et les données
+proviennent de deux écritures concurrentes ne correspond plus à aucune clé et
+est simplement ignorée.
+Attributes:
+    PROFONDEUR_MESURE (int): Profondeur par défaut de la mesure du temps de recherche.
+Classes:
+    * TablePartagée - Table de transposition en mémoire partagée.
+    * RechercheParallèle - Recherche alpha-bêta répartie sur plusieurs processus.
+Functions:
+    * mesurer - Mesure le temps pour atteindre une profondeur selon le nombre de processus.
+"""
+import multiprocessing
+import os
+import threading
+from argparse import ArgumentParser
+from multiprocessing import shared_memory
+
+from finales import TableFinale
+from moteur import ÉTAT_INITIAL
+from recherche import PROFONDEUR_MAX, Recherche, évaluer
+from transposition import (_BITS_COUP, _BITS_GÉNÉRATION, _BITS_PROFONDEUR, _BITS_TYPE,
+                           _DÉCALAGE_SCORE, _OCTETS_ENTRÉE, TableTransposition)
+
+PROFONDEUR_MESURE = 9
+
+
+class TablePartagée(TableTransposition):
+    '''
+    Table de transposition sans verrou dans un segment de mémoire partagée.
+    La table s'attache au segment par son nom lorsqu'elle est transmise à un
+    autre processus. Les compteurs de succès, d'échecs et de collisions sont
+    propres à chaque processus.
+    '''
+
+    def __init__(self, taille_mo=16, nom=None):
+        """Constructeur de la classe TablePartagée.
+        Args:
+            taille_mo (int): La taille maximale de la table en Mo. Le nombre
+                d'entrées est arrondi à la puissance de deux inférieure.
+            nom (str): Le nom d'un segment existant auquel s'attacher; None pour
+                créer un nouveau segment, détruit par `fermer`.
+        """
+        entrées = max(2, (taille_mo * 1024 * 1024) // _OCTETS_ENTRÉE)
+        entrées = 1 << (entrées.bit_length() - 1)
+        self.taille_mo = taille_mo
+        # Seul le processus qui a créé le segment le détruit, même si la table
+        # est héritée par un processus enfant
+        self.propriétaire = os.getpid() if nom is None else None
+        if nom is None:
+            self.segment = shared_memory.SharedMemory(create=True,
+                                                      size=_OCTETS_ENTRÉE * entrées)
+        else:
+            self.segment = shared_memory.SharedMemory(name=nom)
+        self.masque = (entrées // 2) - 1
+        self.clés = self.segment.buf[:8 * entrées].cast('Q')
+        self.données = self.segment.buf[8 * entrées:_OCTETS_ENTRÉE * entrées].cast('Q')
+        self.génération = 0
+        self.succès = 0
+        self.échecs = 0
+        self.collisions = 0
+
+    def __reduce__(self):
+        return _attacher, (self.taille_mo, self.segment.name, self.génération)
+
+    def vider(self):
+        """Effacer toutes les entrées et remettre les compteurs à zéro."""
+        taille = len(self.clés) * _OCTETS_ENTRÉE
+        self.segment.buf[:taille] = bytes(taille)
+        self.succès = self.échecs = self.collisions = 0
+
+    def fermer(self):
+        """Se détacher du segment et, pour la table qui l'a créé, le détruire."""
+        self.clés.release()
+        self.données.release()
+        self.segment.close()
+        if self.propriétaire == os.getpid():
+            self.segment.unlink()
+
+    def sonder(self, clé):
+        """Chercher une position dans la table.
+        Args:
+            clé (int): La clé de Zobrist de la position.
+        Returns:
+            tuple/None: Le score, la profondeur, le type et le meilleur coup de
+                l'entrée; None si la position est absente.
+        """
+        case = (clé & self.masque) << 1
+        for ind in (case, case + 1):
+            données = self.données[ind]
+            if données and self.clés[ind] ^ données == clé:
+                self.succès += 1
+                return ((données & 0xFFFF) - _DÉCALAGE_SCORE,
+                        (données >> _BITS_PROFONDEUR) & 0xFF,
+                        (données >> _BITS_TYPE) & 0x3,
+                        (données >> _BITS_COUP) & 0x7)
+        self.échecs += 1
+        if self.données[case] or self.données[case + 1]:
+            self.collisions += 1
+        return None
+
+    def enregistrer(self, clé, score, profondeur, type_entrée, coup):
+        """Enregistrer le résultat d'une recherche.
+        Args:
+            clé (int): La clé de Zobrist de la position.
+            score (int): Le score de la position.
+            profondeur (int): La profondeur de la recherche ayant produit le score.
+            type_entrée (int): EXACT, MINIMUM ou MAXIMUM.
+            coup (int): Le meilleur coup trouvé (0 si aucun).
+        """
+        case = (clé & self.masque) << 1
+        données_profondeur = self.données[case]
+        if (self.clés[case] ^ données_profondeur == clé or not données_profondeur
+                or profondeur >= (données_profondeur >> _BITS_PROFONDEUR) & 0xFF
+                or (données_profondeur >> _BITS_GÉNÉRATION) != self.génération):
+            ind = case
+        else:
+            ind = case + 1
+        données = ((score + _DÉCALAGE_SCORE)
+                   | profondeur << _BITS_PROFONDEUR
+                   | type_entrée << _BITS_TYPE
+                   | coup << _BITS_COUP
+                   | self.génération << _BITS_GÉNÉRATION)
+        self.clés[ind] = clé ^ données
+        self.données[ind] = données
+
+
+def _attacher(taille_mo, nom, génération):
+    """Reconstruire une table partagée dans un autre processus."""
+    table = TablePartagée(taille_mo, nom)
+    table.génération = génération
+    return table
+
+
+class _Auxiliaire(Recherche):
+    '''
+    Recherche d'un processus auxiliaire, qui parcourt les coups de la racine
+    dans un ordre décalé.
+    '''
+
+    def __init__(self, décalage, évaluation, table, finales, arrêt):
+        super().__init__(évaluation, table, finales, arrêt)
+        self.décalage = décalage
+
+    def _racine(self, code, clé, coups, profondeur):
+        décalage = self.décalage % len(coups)
+        return super()._racine(code, clé, coups[décalage:] + coups[:décalage], profondeur)
+
+
+def _travailler(ind, table, finales, évaluation, arrêt, tâches, résultats):
+    """Boucle d'un processus auxiliaire: chercher chaque position reçue jusqu'à
+    la réception de None."""
+    recherche = _Auxiliaire(ind, évaluation, table, finales, arrêt)
+    for code, temps, profondeur_max, génération in iter(tâches.get, None):
+        table.génération = génération
+        rapport = recherche.chercher(code, temps, profondeur_max)
+        # Le premier processus à terminer interrompt les autres
+        arrêt.set()
+        résultats.put((ind, rapport, recherche.finales_trouvées))
+    table.fermer()
+
+
+class RechercheParallèle:
+    '''
+    Recherche alpha-bêta répartie sur plusieurs processus (lazy SMP).
+    Le processus appelant cherche lui-même et les processus auxiliaires restent
+    en attente entre deux recherches. L'attribut `table` est la table partagée
+    et `noeuds_processus` le nombre de noeuds visités par chaque processus lors
+    de la dernière recherche, l'appelant en premier; `finales_processus` compte
+    de même les positions résolues par la table de finales.
+    '''
+
+    def __init__(self, processus=None, taille_mo=16, évaluation=évaluer, finales=None):
+        """Constructeur de la classe RechercheParallèle.
+        Args:
+            processus (int): Le nombre total de processus, l'appelant compris;
+                par défaut, le nombre de coeurs.
+            taille_mo (int): La taille de la table partagée en Mo.
+            évaluation (callable): Fonction d'évaluation des feuilles (voir `Recherche`).
+            finales (TableFinale): Table de finales à consulter, le cas échéant.
+        """
+        self.processus = processus or os.cpu_count() or 1
+        self.table = TablePartagée(taille_mo)
+        self.noeuds_processus = []
+        self.finales_processus = []
+        self._arrêt = multiprocessing.Event()
+        # Une file de tâches par auxiliaire: chacun reçoit exactement une position
+        self._tâches = [multiprocessing.SimpleQueue() for _ in range(1, self.processus)]
+        self._résultats = multiprocessing.SimpleQueue()
+        self._verrou = threading.Lock()
+        self._recherche = Recherche(évaluation, self.table, finales, self._arrêt)
+        self._auxiliaires = [
+            multiprocessing.Process(target=_travailler, daemon=True,
+                                    args=(ind + 1, self.table, finales, évaluation, self._arrêt,
+                                          tâches, self._résultats))
+            for ind, tâches in enumerate(self._tâches)]
+        for auxiliaire in self._auxiliaires:
+            auxiliaire.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.fermer()
+
+    def chercher(self, code, temps=1.0, profondeur_max=PROFONDEUR_MAX):
+        """Chercher le meilleur coup d'une position sur tous les processus.
+        Args:
+            code (int): L'entier compact représentant la position.
+            temps (float): Budget de temps en secondes.
+            profondeur_max (int): Profondeur maximale à atteindre.
+        Returns:
+            Rapport: Le rapport du processus ayant complété la plus grande
+                profondeur (l'appelant en cas d'égalité), avec le total des
+                noeuds visités par tous les processus.
+        """
+        with self._verrou:
+            self._arrêt.clear()
+            # Chaque `Recherche.chercher` passe la table à la génération suivante
+            for tâches in self._tâches:
+                tâches.put((code, temps, profondeur_max, self.table.génération))
+            principal = self._recherche.chercher(code, temps, profondeur_max)
+            self._arrêt.set()
+
+            rapports = [principal] + [None] * len(self._auxiliaires)
+            trouvées = [self._recherche.finales_trouvées] + [0] * len(self._auxiliaires)
+            for _ in self._auxiliaires:
+                ind, rapport, trouvées[ind] = self._résultats.get()
+                rapports[ind] = rapport
+        self.finales_processus = trouvées
+        self.noeuds_processus = [rapport.noeuds for rapport in rapports]
+        meilleur = max(rapports, key=lambda rapport: rapport.profondeur)
+        return meilleur._replace(noeuds=sum(self.noeuds_processus), durée=principal.durée)
+
+    def fermer(self):
+        """Arrêter les processus auxiliaires et détruire la table partagée."""
+        for tâches in self._tâches:
+            tâches.put(None)
+        for auxiliaire in self._auxiliaires:
+            auxiliaire.join()
+        self._auxiliaires = self._tâches = []
+        self.table.fermer()
+
+
+def mesurer(processus_max=None, profondeur=PROFONDEUR_MESURE, code=ÉTAT_INITIAL,
+            taille_mo=16, finales=None):
+    """Mesurer le temps nécessaire pour atteindre une profondeur selon le
+    nombre de processus, de 1 à `processus_max`, chaque mesure partant d'une
+    table vide.
+    Args:
+        processus_max (int): Le nombre maximal de processus; par défaut, le
+            nombre de coeurs.
+        profondeur (int): La profondeur à atteindre.
+        code (int): L'entier compact de la position à chercher.
+        taille_mo (int): La taille de la table partagée en Mo.
+        finales (TableFinale): Table de finales à consulter, le cas échéant.
+    Returns:
+        list: Pour chaque nombre de processus, un dict de la durée, de
+            l'accélération par rapport à un processus, du total des noeuds, des
+            noeuds de chaque processus et des positions de chaque processus
+            résolues par la table de finales.
+    """
+    mesures = []
+    for processus in range(1, (processus_max or os.cpu_count() or 1) + 1):
+        with RechercheParallèle(processus, taille_mo, finales=finales) as recherche:
+            rapport = recherche.chercher(code, float('inf'), profondeur)
+            noeuds_processus = recherche.noeuds_processus
+            finales_processus = recherche.finales_processus
+        mesures.append({'processus': processus, 'durée': rapport.durée,
+                        'accélération': mesures[0]['durée'] / rapport.durée if mesures else 1.0,
+                        'noeuds': rapport.noeuds, 'noeuds_processus': noeuds_processus,
+                        'finales_processus': finales_processus})
+    return mesures
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Mesure de la recherche parallèle")
+    analyseur.add_argument('--processus', type=int, default=None,
+                           help="Nombre maximal de processus.")
+    analyseur.add_argument('--profondeur', type=int, default=PROFONDEUR_MESURE,
+                           help="Profondeur à atteindre depuis la position initiale.")
+    analyseur.add_argument('--finales', default=None, metavar='FICHIER',
+                           help="Consulter la table de finales de ce fichier "
+                           "(voir le module finales).")
+    arguments = analyseur.parse_args()
+    table_finales = TableFinale(arguments.finales) if arguments.finales else None
+    for mesure in mesurer(arguments.processus, arguments.profondeur, finales=table_finales):
+        print(f"{mesure['processus']:>2} processus: {mesure['durée']:7.3f} s "
+              f"(x{mesure['accélération']:.2f}), {mesure['noeuds']} noeuds "
+              f"{mesure['noeuds_processus']}"
+              + (f", finales {mesure['finales_processus']}" if table_finales else ""))
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""Module de recherche du jeu Squadro
+Ce module implémente une recherche minimax avec élagage alpha-bêta sur les
+positions compactes du module `moteur`. La recherche procède par
+approfondissement itératif et s'arrête lorsque le budget de temps est écoulé,
+en retournant le meilleur coup de la dernière profondeur complétée.
+Attributes:
+    GAGNÉ (int): Score d'une position gagnée.
+    RESTANTS (tuple): Nombre de coups nécessaires à chaque pion pour terminer,
+        selon le joueur, le pion et sa position, sans tenir compte des collisions.
+Classes:
+    * Rapport - Résultat d'une recherche.
+    * Recherche - Recherche alpha-bêta par approfondissement itératif.
+Functions:
+    * évaluer - Évalue une position du point de vue du joueur au trait.
+    * score_finale - Convertit une valeur d'une table de finales en score.
+    * chercher - Lance une recherche limitée dans le temps.
+"""
+from collections import namedtuple
+from time import perf_counter
+
+from moteur import (BITS_JOUEUR, MASQUE_JOUEUR, MASQUE_PION, VITESSES,
+                    gagnant, jouer_compact, pions_actifs, trait)
+from transposition import EXACT, MAXIMUM, MINIMUM, hacher, hacher_coup
+
+GAGNÉ = 10000
+PROFONDEUR_MAX = 64
+_SEUIL_GAGNÉ = GAGNÉ - PROFONDEUR_MAX
+INTERVALLE_HORLOGE = 1024  # nombre de noeuds entre deux lectures de l'horloge
+
+
+def _coups_restants(aller, retour, position):
+    """Compter les coups nécessaires à un pion pour atteindre 12."""
+    if position <= 5:
+        return -(-(6 - position) // aller) + -(-6 // retour)
+    return -(-(12 - position) // retour)
+
+
+RESTANTS = tuple(
+    tuple(
+        tuple(_coups_restants(aller, retour, position) for position in range(13))
+        for aller, retour in VITESSES[ind_joueur])
+    for ind_joueur in range(2))
+
+
+class Rapport(namedtuple('Rapport', ['coup', 'score', 'profondeur', 'noeuds', 'durée'])):
+    """Résultat d'une recherche.
+    Attributes:
+        coup (int): Le numéro du pion à déplacer.
+        score (int): Le score du coup, du point de vue du joueur au trait.
+        profondeur (int): La dernière profondeur complétée.
+        noeuds (int): Le nombre de noeuds visités.
+        durée (float): La durée de la recherche en secondes.
+    """
+    __slots__ = ()
+
+    @property
+    def noeuds_par_seconde(self):
+        """float: Le nombre de noeuds visités par seconde."""
+        return self.noeuds / self.durée if self.durée else 0.0
+
+
+def _tempo_joueur(code, ind_joueur):
+    """Retourner le nombre de coups nécessaires pour faire terminer 4 pions."""
+    pions = (code >> (ind_joueur * BITS_JOUEUR)) & MASQUE_JOUEUR
+    restants = RESTANTS[ind_joueur]
+    total = 0
+    pire = 0
+    for ind_pion in range(5):
+        valeur = restants[ind_pion][(pions >> (ind_pion * 4)) & MASQUE_PION]
+        total += valeur
+        if valeur > pire:
+            pire = valeur
+    return total - pire
+
+
+def évaluer(code):
+    """Évaluer une position.
+    L'évaluation compare le nombre de coups qu'il reste à chaque joueur pour
+    faire terminer 4 de ses pions.
+    Args:
+        code (int): L'entier compact représentant la position.
+    Returns:
+        int: Le score de la position du point de vue du joueur au trait.
+    """
+    ind_joueur = trait(code)
+    return _tempo_joueur(code, 1 - ind_joueur) - _tempo_joueur(code, ind_joueur)
+
+
+def score_finale(valeur, distance=0):
+    """Convertir une valeur d'une table de finales (module `finales`) en score.
+    Args:
+        valeur (int): La valeur de la position dans la table de finales.
+        distance (int): Nombre de demi-coups entre la racine et la position.
+    Returns:
+        int: Le score de la position du point de vue du joueur au trait.
+    """
+    if valeur > 0:
+        return GAGNÉ - distance - (valeur - 1)
+    if valeur < 0:
+        return distance + (-valeur - 1) - GAGNÉ
+    return 0
+
+
+def _score_vers_table(score, distance):
+    """Rendre un score de victoire relatif au noeud plutôt qu'à la racine."""
+    if score >= _SEUIL_GAGNÉ:
+        return score + distance
+    if score <= -_SEUIL_GAGNÉ:
+        return score - distance
+    return score
+
+
+def _score_depuis_table(score, distance):
+    """Rendre un score de victoire de la table relatif à la racine."""
+    if score >= _SEUIL_GAGNÉ:
+        return score - distance
+    if score <= -_SEUIL_GAGNÉ:
+        return score + distance
+    return score
+
+
+class _TempsÉcoulé(Exception):
+    '''
+    Interrompt une recherche dont le budget de temps est écoulé.
+    '''
+
+
+class Recherche:
+    '''
+    Recherche alpha-bêta par approfondissement itératif.
+    '''
+
+    def __init__(self, évaluation=évaluer, table=None, finales=None, arrêt=None):
+        """Constructeur de la classe Recherche.
+        Args:
+            évaluation (callable): Fonction d'évaluation d'une position compacte,
+                du point de vue du joueur au trait.
+            table (TableTransposition): Table de transposition à utiliser et à
+                conserver d'une recherche à l'autre; None pour s'en passer.
+            finales (TableFinale): Table de finales donnant le score exact des
+                positions qu'elle couvre; None pour s'en passer.
+            arrêt (threading.Event): Événement qui interrompt la recherche, comme
+                l'écoulement du budget de temps, lorsqu'il est levé par un autre fil.
+        """
+        self.évaluation = évaluation
+        self.table = table
+        self.finales = finales
+        self.arrêt = arrêt
+        self.noeuds = 0
+        self.coupures = 0
+        # Nombre de positions résolues par la table de finales
+        self.finales_trouvées = 0
+        self.échéance = 0.0
+
+    def chercher(self, code, temps=1.0, profondeur_max=PROFONDEUR_MAX):
+        """Chercher le meilleur coup d'une position.
+        Args:
+            code (int): L'entier compact représentant la position.
+            temps (float): Budget de temps en secondes.
+            profondeur_max (int): Profondeur maximale à atteindre.
+        Returns:
+            Rapport: Le meilleur coup de la dernière profondeur complétée.
+        """
+        début = perf_counter()
+        self.échéance = début + temps
+        self.noeuds = 0
+        self.coupures = 0
+        self.finales_trouvées = 0
+        if self.table is not None:
+            self.table.nouvelle_recherche()
+        clé = hacher(code)
+
+        coups = pions_actifs(code)
+        rapport = Rapport(coups[0], 0, 0, 0, 0.0)
+        for profondeur in range(1, profondeur_max + 1):
+            try:
+                coup, score = self._racine(code, clé, coups, profondeur)
+            except _TempsÉcoulé:
+                break
+            rapport = Rapport(coup, score, profondeur, self.noeuds, perf_counter() - début)
+            # Essayer le meilleur coup en premier à la prochaine itération
+            coups.remove(coup)
+            coups.insert(0, coup)
+            if abs(score) >= _SEUIL_GAGNÉ:
+                break
+
+        return rapport._replace(noeuds=self.noeuds, durée=perf_counter() - début)
+
+    def _racine(self, code, clé, coups, profondeur):
+        """Chercher à la racine pour une profondeur donnée.
+        Returns:
+            tuple: Le meilleur coup et son score.
+        """
+        alpha = -GAGNÉ - 1
+        meilleur = coups[0]
+        for pion in coups:
+            nouveau = jouer_compact(code, pion)
+            clé_nouveau = hacher_coup(clé, code, nouveau) if self.table is not None else 0
+            score = -self._alphabeta(nouveau, clé_nouveau, profondeur - 1,
+                                     -GAGNÉ - 1, -alpha, 1)
+            if score > alpha:
+                alpha = score
+                meilleur = pion
+        if self.table is not None:
+            self.table.enregistrer(clé, alpha, profondeur, EXACT, meilleur)
+        return meilleur, alpha
+
+    def _alphabeta(self, code, clé, profondeur, alpha, beta, distance):
+        """Évaluer une position par négamax avec élagage alpha-bêta.
+        Args:
+            code (int): L'entier compact représentant la position.
+            clé (int): La clé de Zobrist de la position.
+            profondeur (int): Profondeur restante.
+            alpha (int): Borne inférieure de la fenêtre.
+            beta (int): Borne supérieure de la fenêtre.
+            distance (int): Nombre de demi-coups depuis la racine.
+        Returns:
+            int: Le score de la position du point de vue du joueur au trait.
+        Raises:
+            _TempsÉcoulé: Le budget de temps est écoulé.
+        """
+        self.noeuds += 1
+        if self.noeuds % INTERVALLE_HORLOGE == 0 and (perf_counter() > self.échéance or (
+                self.arrêt is not None and self.arrêt.is_set())):
+            raise _TempsÉcoulé()
+
+        vainqueur = gagnant(code)
+        if vainqueur is not None:
+            # Préférer les victoires rapides et les défaites lentes
+            if vainqueur == trait(code):
+                return GAGNÉ - distance
+            return distance - GAGNÉ
+
+        if self.finales is not None:
+            valeur = self.finales.sonder(code)
+            if valeur is not None:
+                self.finales_trouvées += 1
+                return score_finale(valeur, distance)
+
+        if profondeur == 0:
+            return self.évaluation(code)
+
+        coups = pions_actifs(code)
+        table = self.table
+        if table is not None:
+            entrée = table.sonder(clé)
+            if entrée is not None:
+                score, profondeur_table, type_entrée, coup_table = entrée
+                if profondeur_table >= profondeur:
+                    score = _score_depuis_table(score, distance)
+                    if type_entrée == EXACT \
+                            or (type_entrée == MINIMUM and score >= beta) \
+                            or (type_entrée == MAXIMUM and score <= alpha):
+                        return score
+                if coup_table in coups:
+                    # Essayer le meilleur coup connu en premier
+                    coups.remove(coup_table)
+                    coups.insert(0, coup_table)
+
+        alpha_initial = alpha
+        meilleur_score = -GAGNÉ - 1
+        meilleur = 0
+        for pion in coups:
+            nouveau = jouer_compact(code, pion)
+            clé_nouveau = hacher_coup(clé, code, nouveau) if table is not None else 0
+            score = -self._alphabeta(nouveau, clé_nouveau, profondeur - 1,
+                                     -beta, -alpha, distance + 1)
+            if score > meilleur_score:
+                meilleur_score = score
+                meilleur = pion
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        self.coupures += 1
+                        break
+
+        if table is not None:
+            if meilleur_score >= beta:
+                type_entrée = MINIMUM
+            elif meilleur_score > alpha_initial:
+                type_entrée = EXACT
+            else:
+                type_entrée = MAXIMUM
+            table.enregistrer(clé, _score_vers_table(meilleur_score, distance),
+                              profondeur, type_entrée, meilleur)
+        return meilleur_score
+
+
+def chercher(code, temps=1.0, profondeur_max=PROFONDEUR_MAX, table=None, finales=None,
+             évaluation=évaluer):
+    """Lancer une recherche alpha-bêta limitée dans le temps.
+    Args:
+        code (int): L'entier compact représentant la position.
+        temps (float): Budget de temps en secondes.
+        profondeur_max (int): Profondeur maximale à atteindre.
+        table (TableTransposition): Table de transposition à réutiliser, le cas échéant.
+        finales (TableFinale): Table de finales à consulter, le cas échéant.
+        évaluation (callable): Fonction d'évaluation des feuilles (voir `Recherche`).
+    Returns:
+        Rapport: Le meilleur coup, son score, la profondeur atteinte et le
+            nombre de noeuds visités.
+    """
+    return Recherche(évaluation, table, finales).chercher(code, temps, profondeur_max)
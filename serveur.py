@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""Module du serveur local du jeu Squadro
+Ce module remplace localement le serveur de jeu: il sert les mêmes points
+d'accès (`parties`, `partie` et `jouer`) avec les mêmes réponses JSON, en
+s'appuyant sur la classe `Squadro`. Une partie débutée par un seul joueur
+l'oppose à un robot dont la stratégie est configurable. Chaque connexion est
+servie par son propre fil et reste ouverte d'une requête à l'autre, ce qui
+permet de mener des milliers de parties simultanées hors ligne.
+Attributes:
+    PORT (int): Le port d'écoute par défaut.
+    ROBOT (str): Le nom du robot adverse.
+    TAILLE_TABLE (int): Taille en Mo de chaque table de transposition du robot.
+    ANTICIPATIONS_MAX (int): Nombre maximal de parties dont le robot anticipe à la fois.
+    TABLES_MAX (int): Nombre maximal de tables de transposition du robot, toutes
+        parties confondues.
+    LIMITE_ANTICIPATION (float): Durée maximale d'une anticipation du robot, en secondes.
+Classes:
+    * ServeurSquadro - Serveur HTTP local du jeu.
+Functions:
+    * lancer - Démarre un serveur local dans un fil d'arrière-plan.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from argparse import ArgumentParser
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from anticipation import Anticipation
+from squadro import Squadro, SquadroError
+from transposition import TableTransposition
+
+PORT = 8000
+ROBOT = 'robot'
+TAILLE_TABLE = 2
+ANTICIPATIONS_MAX = os.cpu_count() or 1
+TABLES_MAX = 2 * ANTICIPATIONS_MAX
+LIMITE_ANTICIPATION = 10.0
+PARTIES_LISTÉES = 20
+
+
+class _PartieServeur:
+    '''
+    Une partie en cours sur le serveur local.
+    '''
+
+    def __init__(self, iduls):
+        self.id = str(uuid.uuid4())
+        self.date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.joueurs = list(iduls) if len(iduls) == 2 else [iduls[0], ROBOT]
+        self.jeu = Squadro(*self.joueurs)
+        self.prochain_joueur = self.joueurs[0]
+        self.gagnant = None
+        self.verrou = threading.Lock()
+
+    def réponse(self, gagnant=False):
+        rep = {'id': self.id, 'prochain_joueur': self.prochain_joueur,
+               'état': self.jeu.cloner().état}  # sans la copie profonde d'état_partie
+        if gagnant:
+            rep['gagnant'] = self.gagnant
+        return rep
+
+    def résumé(self):
+        return {'id': self.id, 'date': self.date, 'joueurs': self.joueurs,
+                'gagnant': self.gagnant}
+
+
+class _Gestionnaire(BaseHTTPRequestHandler):
+    '''
+    Traitement des requêtes du serveur local.
+    '''
+    protocol_version = 'HTTP/1.1'  # connexions persistantes
+    disable_nagle_algorithm = True  # l'en-tête et le corps partent en deux écritures
+
+    def log_message(self, format, *args):
+        if self.server.journal:
+            super().log_message(format, *args)
+
+    def _répondre(self, code, contenu):
+        corps = json.dumps(contenu).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _formulaire(self):
+        longueur = int(self.headers.get('Content-Length', 0))
+        return parse_qs(self.rfile.read(longueur).decode('utf-8'))
+
+    def _traiter(self, méthode):
+        adresse = urlsplit(self.path)
+        point = adresse.path.rstrip('/').rsplit('/', 1)[-1]
+        paramètres = parse_qs(adresse.query) if méthode == 'GET' else self._formulaire()
+        traitement = getattr(self.server, f'_{méthode.lower()}_{point}', None)
+        if traitement is None:
+            self._répondre(404, {'message': f"Le point d'accès '{adresse.path}' est inexistant."})
+            return
+        try:
+            self._répondre(200, traitement(paramètres))
+        except (KeyError, ValueError, SquadroError) as erreur:
+            message = f"Paramètre manquant: {erreur}." if isinstance(erreur, KeyError) \
+                else str(erreur)
+            self._répondre(406, {'message': message})
+        except Exception as erreur:
+            # Une erreur imprévue, par exemple dans le coup du robot, ne doit pas
+            # laisser la connexion sans réponse
+            self.log_error("%s %s: %r", méthode, self.path, erreur)
+            self._répondre(500, {'message': f"Erreur interne du serveur: {erreur}."})
+
+    def do_GET(self):
+        self._traiter('GET')
+
+    def do_POST(self):
+        self._traiter('POST')
+
+    def do_PUT(self):
+        self._traiter('PUT')
+
+
+class ServeurSquadro(ThreadingHTTPServer):
+    '''
+    Serveur HTTP local du jeu.
+    '''
+    daemon_threads = True
+    request_queue_size = 4096
+
+    def __init__(self, adresse=('127.0.0.1', PORT), strategie='hasard', temps=0.1,
+                 journal=False, anticiper=False, taille_table=TAILLE_TABLE,
+                 anticipations_max=ANTICIPATIONS_MAX, limite_anticipation=LIMITE_ANTICIPATION,
+                 tables_max=TABLES_MAX):
+        """Constructeur de la classe ServeurSquadro.
+        Args:
+            adresse (tuple): L'hôte et le port d'écoute; le port 0 en choisit un libre.
+            strategie (str): La stratégie du robot (voir `Squadro.jouer_coup`).
+            temps (float): Budget de temps par coup du robot en secondes.
+            journal (bool): Afficher chaque requête reçue.
+            anticiper (bool): Faire réfléchir le robot alphabeta pendant le temps
+                du joueur (voir `Squadro.anticiper`); un fil par partie en cours,
+                dans la limite de `anticipations_max` parties.
+            taille_table (int): Taille en Mo de chaque table de transposition du
+                robot alphabeta.
+            anticipations_max (int): Nombre maximal de parties dont le robot anticipe
+                à la fois; l'anticipation des parties jouées le moins récemment est
+                arrêtée au-delà.
+            limite_anticipation (float): Durée maximale d'une anticipation, après
+                laquelle une partie sans activité n'occupe plus le processeur.
+            tables_max (int): Nombre maximal de tables de transposition. Les parties
+                empruntent une table le temps du coup du robot et la rendent
+                ensuite, sauf si le robot anticipe; une partie attend qu'une table
+                soit rendue lorsqu'elles sont toutes en usage.
+        """
+        super().__init__(adresse, _Gestionnaire)
+        self.strategie = strategie
+        self.temps = temps
+        self.journal = journal
+        self.anticiper = anticiper and strategie == 'alphabeta'
+        self.parties = {}
+        self._verrou = threading.Lock()
+        self.taille_table = taille_table
+        self.anticipations_max = anticipations_max
+        self.limite_anticipation = limite_anticipation
+        self.tables_max = tables_max
+        # Réserve des tables de transposition: une table ne sert qu'à une partie à
+        # la fois, les recherches des parties tournant dans des fils concurrents
+        self._tables = []
+        self._tables_créées = 0
+        self._disponible = threading.Condition(self._verrou)
+        # Parties dont le robot anticipe, de la moins à la plus récemment jouée;
+        # chacune garde sa table jusqu'à son prochain coup
+        self._anticipations = OrderedDict()
+
+    @property
+    def url(self):
+        """str: Le début de l'url du serveur, à donner à `api.configurer`."""
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/"
+
+    def _partie(self, paramètres):
+        partie = self.parties.get(paramètres['id'][0])
+        if partie is None:
+            raise ValueError("La partie est inexistante.")
+        return partie
+
+    def _get_parties(self, paramètres):
+        iduls = set(paramètres['iduls'])
+        with self._verrou:
+            parties = [partie for partie in self.parties.values()
+                       if iduls.intersection(partie.joueurs)]
+        return {'parties': [partie.résumé() for partie in parties[-PARTIES_LISTÉES:][::-1]]}
+
+    def _get_partie(self, paramètres):
+        partie = self._partie(paramètres)
+        with partie.verrou:
+            return partie.réponse()
+
+    def _post_partie(self, paramètres):
+        iduls = paramètres['iduls']
+        if not 1 <= len(iduls) <= 2:
+            raise ValueError("Une partie compte un ou deux joueurs.")
+        partie = _PartieServeur(iduls)
+        with self._verrou:
+            self.parties[partie.id] = partie
+        return partie.réponse()
+
+    def _put_jouer(self, paramètres):
+        partie = self._partie(paramètres)
+        idul = paramètres['idul'][0]
+        with partie.verrou:
+            if partie.gagnant:
+                raise ValueError("La partie est déjà terminée.")
+            if idul != partie.prochain_joueur:
+                raise ValueError(f"Ce n'est pas le tour de {idul}.")
+            pion = int(paramètres['pion'][0])
+            if not 1 <= pion <= 5:
+                raise SquadroError(
+                    'Le numéro du pion devrait être entre 1 à 5 inclusivement.')
+            réserve = self.strategie == 'alphabeta' and ROBOT in partie.joueurs
+            if réserve:
+                self._emprunter_table(partie)
+            try:
+                partie.jeu.déplacer_pion(idul, pion)
+                partie.prochain_joueur = partie.joueurs[partie.joueurs.index(idul) - 1]
+
+                if not partie.jeu.partie_terminée() and partie.prochain_joueur == ROBOT:
+                    partie.jeu.jouer_coup(ROBOT, self.strategie, self.temps)
+                    partie.prochain_joueur = idul
+                    if self.anticiper:
+                        if partie.jeu.anticipation is None:
+                            partie.jeu.anticipation = Anticipation(self.limite_anticipation)
+                        partie.jeu.anticiper(idul)
+                partie.gagnant = partie.jeu.partie_terminée() or None
+            finally:
+                if réserve:
+                    self._rendre_table(partie)
+            return partie.réponse(gagnant=True)
+
+    def _emprunter_table(self, partie):
+        """Fournir une table de transposition au robot d'une partie: la sienne s'il
+        anticipe encore, sinon une table de la réserve, une nouvelle dans la limite
+        de `tables_max` ou celle de l'anticipation la plus ancienne, arrêtée; à
+        défaut, attendre qu'une table soit rendue."""
+        while True:
+            with self._disponible:
+                if self._anticipations.pop(partie.id, None) is not None:
+                    return
+                if self._tables:
+                    partie.jeu.table = self._tables.pop()
+                    return
+                if self._tables_créées < self.tables_max:
+                    self._tables_créées += 1
+                    break
+                if not self._anticipations:
+                    self._disponible.wait()
+                    continue
+                évincée = self._retirer_table(self._anticipations.popitem(last=False)[1])
+            # Hors du verrou du serveur, pour ne pas bloquer les autres parties
+            self._libérer(*évincée)
+        partie.jeu.table = TableTransposition(self.taille_table)
+
+    def _rendre_table(self, partie):
+        """Rendre la table d'une partie à la réserve après le coup du robot. Si le
+        robot anticipe, la partie garde sa table et c'est la partie jouée le moins
+        récemment qui rend la sienne au-delà de `anticipations_max`."""
+        with self._disponible:
+            if self.anticiper and not partie.gagnant:
+                self._anticipations[partie.id] = partie
+                if len(self._anticipations) <= self.anticipations_max:
+                    return
+                partie = self._anticipations.popitem(last=False)[1]
+            libérée = self._retirer_table(partie)
+        self._libérer(*libérée)
+
+    @staticmethod
+    def _retirer_table(partie):
+        """Retirer sa table à une partie, sous le verrou du serveur.
+        Returns:
+            tuple: L'anticipation de la partie, à arrêter avant de réutiliser la
+                table, et la table.
+        """
+        table, partie.jeu.table = partie.jeu.table, None
+        return partie.jeu.anticipation, table
+
+    def _libérer(self, anticipation, table):
+        """Arrêter l'anticipation qui utilise une table et remettre la table dans
+        la réserve."""
+        if anticipation is not None:
+            anticipation.arrêter()
+        if table is not None:
+            with self._disponible:
+                self._tables.append(table)
+                self._disponible.notify()
+
+
+def lancer(adresse=('127.0.0.1', 0), strategie='hasard', temps=0.1, anticiper=False):
+    """Démarrer un serveur local dans un fil d'arrière-plan.
+    Args:
+        adresse (tuple): L'hôte et le port d'écoute; par défaut, un port libre.
+        strategie (str): La stratégie du robot.
+        temps (float): Budget de temps par coup du robot en secondes.
+        anticiper (bool): Faire réfléchir le robot pendant le temps du joueur.
+    Returns:
+        ServeurSquadro: Le serveur démarré; `serveur.shutdown()` l'arrête.
+    """
+    serveur = ServeurSquadro(adresse, strategie, temps, anticiper=anticiper)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Serveur local")
+    analyseur.add_argument('--hote', default='127.0.0.1', help="Hôte d'écoute.")
+    analyseur.add_argument('--port', type=int, default=PORT, help="Port d'écoute.")
+    analyseur.add_argument('--strategie', default='hasard',
+                           help="Stratégie du robot (hasard, alphabeta ou mcts).")
+    analyseur.add_argument('-t', '--temps', type=float, default=0.1,
+                           help="Budget de temps par coup du robot en secondes.")
+    analyseur.add_argument('--journal', action='store_true',
+                           help="Afficher chaque requête reçue.")
+    analyseur.add_argument('--anticiper', action='store_true',
+                           help="Faire réfléchir le robot pendant le temps du joueur.")
+    arguments = analyseur.parse_args()
+    with ServeurSquadro((arguments.hote, arguments.port), arguments.strategie,
+                        arguments.temps, arguments.journal, arguments.anticiper) as serveur:
+        print(f"Serveur Squadro à l'écoute sur {serveur.url}")
+        serveur.serve_forever()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Module de simulation du jeu Squadro
+Ce module joue un grand nombre de parties entre deux stratégies de
+`Squadro.jouer_coup` en répartissant les parties sur plusieurs processus.
+Les parties sont regroupées en lots; chaque partie possède sa propre graine,
+la graine de la simulation plus son numéro, afin que les résultats ne
+dépendent ni du nombre de processus ni de la taille des lots.
+Attributes:
+    NOMS (tuple): Le nom donné aux deux joueurs des parties simulées.
+    COUPS_MAX (int): Nombre de coups au-delà duquel une partie est déclarée nulle.
+Functions:
+    * jouer_partie - Joue une partie complète entre deux stratégies.
+    * simuler - Joue plusieurs parties sur un bassin de processus.
+    * afficher_simulation - Formate les résultats d'une simulation.
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import instruments
+from archive import ÉcrivainParties
+from mcts import MCTS
+from moteur import ÉTAT_INITIAL
+from squadro import Squadro
+from transposition import TableTransposition
+
+NOMS = ('joueur1', 'joueur2')
+COUPS_MAX = 1000
+LOTS_PAR_PROCESSUS = 4
+
+# Table de transposition de la stratégie alphabeta, allouée une fois par
+# processus et vidée avant chaque partie
+_table = None
+
+
+def jouer_partie(strategies, temps=0.1, coups_max=COUPS_MAX, coups=None, graine=None,
+                 table=None):
+    """Jouer une partie complète entre deux stratégies.
+    Le joueur 1 joue le premier coup.
+    Args:
+        strategies (tuple): La stratégie du joueur 1 et celle du joueur 2.
+        temps (float): Budget de temps par coup des stratégies de recherche.
+        coups_max (int): Nombre de coups au-delà duquel la partie est nulle.
+        coups (list): Liste à laquelle ajouter l'indice du joueur et le pion de
+            chaque coup joué, le cas échéant.
+        graine (int): Graine du générateur de la stratégie mcts; None pour un
+            générateur non reproductible.
+        table (TableTransposition): Table de la stratégie alphabeta, vidée avant
+            la partie; None pour en allouer une nouvelle.
+    Returns:
+        tuple: L'indice du gagnant (None si la partie est nulle) et le nombre de coups joués.
+    """
+    partie = Squadro.depuis_compact(ÉTAT_INITIAL, NOMS)
+    if 'mcts' in strategies:
+        partie.arbre = MCTS(graine=graine)
+    if table is not None:
+        table.vider()
+        partie.table = table
+    joués = 0
+    while not partie.partie_terminée():
+        if joués >= coups_max:
+            return None, joués
+        _, pion = partie.jouer_coup(NOMS[joués % 2], strategies[joués % 2], temps)
+        if coups is not None:
+            coups.append((joués % 2, pion))
+        joués += 1
+    return NOMS.index(partie.partie_terminée()), joués
+
+
+def _jouer_lot(strategies, temps, graine, parties, archiver=False, statistiques=False,
+               poids=None):
+    """Jouer un lot de parties dans un processus.
+    La partie `ind` du lot est jouée avec la graine `graine + ind`, et toutes
+    les parties du processus partagent une même table de transposition.
+    Returns:
+        dict: Les victoires par joueur, les parties nulles, le nombre de coups et,
+            si `archiver` est vrai, le gagnant et les coups de chaque partie;
+            si `statistiques` est vrai, les mesures du module `instruments`.
+    """
+    if statistiques:
+        instruments.activer()
+        instruments.réinitialiser()
+    if poids is not None:
+        # Importé ici: le module evaluation nécessite NumPy
+        from evaluation import Évaluateur
+        Squadro.évaluation = staticmethod(Évaluateur(poids))
+    global _table
+    if _table is None and 'alphabeta' in strategies:
+        _table = TableTransposition()
+    victoires = [0, 0]
+    nulles = 0
+    coups = 0
+    jouées = []
+    for ind in range(parties):
+        random.seed(graine + ind)
+        liste_coups = [] if archiver else None
+        vainqueur, longueur = jouer_partie(strategies, temps, coups=liste_coups,
+                                           graine=graine + ind, table=_table)
+        if vainqueur is None:
+            nulles += 1
+        else:
+            victoires[vainqueur] += 1
+        coups += longueur
+        if archiver:
+            jouées.append((vainqueur, liste_coups))
+    return {'victoires': victoires, 'nulles': nulles, 'coups': coups, 'parties': jouées,
+            'mesures': instruments.instantané() if statistiques else None}
+
+
+def simuler(parties, strategies=('hasard', 'hasard'), temps=0.1,
+            processus=None, graine=0, taille_lot=None, archive=None, statistiques=False,
+            poids=None):
+    """Jouer plusieurs parties sur un bassin de processus.
+    Args:
+        parties (int): Le nombre de parties à jouer.
+        strategies (tuple): La stratégie du joueur 1 et celle du joueur 2.
+        temps (float): Budget de temps par coup des stratégies de recherche.
+        processus (int): Le nombre de processus; par défaut, le nombre de coeurs.
+        graine (int): La graine de la simulation.
+        taille_lot (int): Le nombre de parties par lot; par défaut, environ
+            4 lots par processus.
+        archive (str): Le fichier où archiver les parties jouées (voir le
+            module `archive`), le cas échéant.
+        statistiques (bool): Instrumenter les parties et ajouter les mesures de
+            chaque processus à celles du module `instruments`.
+        poids (dict/str): Les poids de l'évaluation de la stratégie alphabeta, ou
+            leur fichier (voir le module `evaluation`); None pour `recherche.évaluer`.
+    Returns:
+        dict: Les victoires et le taux de victoire de chaque joueur, les parties
+            nulles, la longueur moyenne des parties et le nombre de coups par seconde.
+    """
+    processus = processus or os.cpu_count() or 1
+    taille_lot = taille_lot or max(1, -(-parties // (processus * LOTS_PAR_PROCESSUS)))
+
+    début = perf_counter()
+    victoires = [0, 0]
+    nulles = 0
+    coups = 0
+    écrivain = ÉcrivainParties(archive) if archive else None
+    try:
+        with ProcessPoolExecutor(max_workers=processus) as exécuteur:
+            lots = [exécuteur.submit(_jouer_lot, tuple(strategies), temps, graine + premier,
+                                     min(taille_lot, parties - premier), écrivain is not None,
+                                     statistiques, poids)
+                    for premier in range(0, parties, taille_lot)]
+            for lot in lots:
+                résultat = lot.result()
+                victoires[0] += résultat['victoires'][0]
+                victoires[1] += résultat['victoires'][1]
+                nulles += résultat['nulles']
+                coups += résultat['coups']
+                for vainqueur, liste_coups in résultat['parties']:
+                    écrivain.écrire(NOMS, liste_coups, gagnant=vainqueur)
+                if statistiques:
+                    instruments.fusionner(résultat['mesures'])
+    finally:
+        if écrivain is not None:
+            écrivain.fermer()
+    durée = perf_counter() - début
+
+    return {
+        'parties': parties,
+        'strategies': list(strategies),
+        'victoires': victoires,
+        'taux_victoire': [gains / parties if parties else 0.0 for gains in victoires],
+        'nulles': nulles,
+        'longueur_moyenne': coups / parties if parties else 0.0,
+        'coups_par_seconde': coups / durée if durée else 0.0,
+        'durée': durée,
+        'processus': processus,
+    }
+
+
+def afficher_simulation(résultats):
+    """Formater les résultats d'une simulation.
+    Args:
+        résultats (dict): Les résultats retournés par `simuler`.
+    Returns:
+        str: Les résultats sous forme de texte.
+    """
+    aff = f"{résultats['parties']} parties sur {résultats['processus']} processus " \
+        f"en {résultats['durée']:.2f} s\n"
+    for ind, strategie in enumerate(résultats['strategies']):
+        aff += f"Joueur {ind + 1} ({strategie}): {résultats['victoires'][ind]} victoires " \
+            f"({100 * résultats['taux_victoire'][ind]:.1f} %)\n"
+    aff += f"Parties nulles: {résultats['nulles']}\n"
+    aff += f"Longueur moyenne: {résultats['longueur_moyenne']:.1f} coups\n"
+    aff += f"Coups par seconde: {résultats['coups_par_seconde']:.0f}\n"
+    return aff
@@ -5,34 +5,86 @@ Classes:
     * SquadroError: Soulève l'exception SquadroError selon les paramètres du jeu.
     * Squadro: Mécanique du jeu Squadro Hors-Ligne
 """
+import atexit
 from random import choice
 from argparse import ArgumentParser
 from squadro_interface import SquadroInterface
+from affichage import dessiner
+from anticipation import Anticipation
+from moteur import CROISEMENTS, compacter, décompacter, transition
+from mcts import MCTS
+from recherche import Rapport, chercher, score_finale, évaluer
+from stockage import DépôtParties
+from transposition import TableTransposition
 
 
 def analyser_commande():
     """Génère un analyseur de ligne de commande
     En utilisant le module argparse, génère un analyseur de ligne de commande.
     L'analyseur offre (1) argument positionnel:
-        IDUL: IDUL du ou des joueurs.
-    Ainsi que les (2) arguments optionnel:
+        IDUL: IDUL du ou des joueurs (optionnel en mode simulation).
+    Ainsi que les arguments optionnels:
         help: show this help message and exit
+        automatique: Jouer automatiquement contre le serveur.
         parties: Lister les 20 dernières parties.
+        local: Jouer contre un serveur local (voir le module `serveur`).
+        simuler: Nombre de parties à simuler entre deux stratégies.
+        strategies: Stratégies des joueurs 1 et 2 lors de la simulation.
+        temps: Budget de temps par coup des stratégies de recherche.
+        processus: Nombre de processus de la simulation.
+        archive: Fichier où archiver les parties simulées.
+        poids: Fichier des poids de l'évaluation de la stratégie alphabeta.
+        coeurs: Nombre de processus des recherches alphabeta et mcts.
+        finales: Fichier de la table de finales de la recherche alphabeta.
+        stats: Afficher des mesures de performance à la sortie.
+        stats_json: Fichier où sauvegarder ces mesures en JSON.
     Returns:
         Namespace: Retourne un objet de type Namespace possédant
-            les clef «IDUL» et «parties».
+            les clef «IDUL», «automatique», «parties», «local», «simuler»,
+            «strategies», «temps», «processus», «archive», «poids», «coeurs»,
+            «finales», «stats» et «stats_json».
     """
 
     parser = ArgumentParser(description="Squadro - Phase 3")
-    parser.add_argument('-a', '--automatique', dest='parties', action='store_true',
-                        help="Activer le mode automatique.")
-    parser.add_argument('-l', '--local', dest='parties', action='store_true',
+    parser.add_argument('-a', '--automatique', dest='automatique', action='store_true',
+                        help="Activer le mode automatique: le joueur 1 joue avec "
+                        "la première stratégie.")
+    parser.add_argument('-l', '--local', dest='local', action='store_true',
                         help="Jouer localement.")
     parser.add_argument('-p', '--parties', dest='parties', action='store_true',
                         help="Lister les 20 dernières parties.")
-    parser.add_argument('IDUL', nargs='+', help="IDUL du ou des joueurs.")
-
-    return parser.parse_args()
+    parser.add_argument('-s', '--simuler', dest='simuler', type=int, default=0,
+                        metavar='N', help="Simuler N parties entre deux stratégies.")
+    parser.add_argument('--strategies', nargs=2, default=['hasard', 'hasard'],
+                        metavar=('J1', 'J2'),
+                        help="Stratégies des joueurs 1 et 2 (hasard, alphabeta ou mcts).")
+    parser.add_argument('-t', '--temps', type=float, default=0.1,
+                        help="Budget de temps par coup en secondes.")
+    parser.add_argument('--processus', type=int, default=None,
+                        help="Nombre de processus de la simulation.")
+    parser.add_argument('--archive', default=None, metavar='FICHIER',
+                        help="Archiver les parties simulées dans ce fichier.")
+    parser.add_argument('--poids', default=None, metavar='FICHIER',
+                        help="Évaluer les positions de la stratégie alphabeta avec les "
+                        "poids de ce fichier (voir le module evaluation).")
+    parser.add_argument('--coeurs', type=int, default=None, metavar='N',
+                        help="Répartir la recherche des stratégies alphabeta et mcts sur "
+                        "N processus (voir les modules parallele et mcts).")
+    parser.add_argument('--finales', default=None, metavar='FICHIER',
+                        help="Consulter la table de finales de ce fichier lors de la "
+                        "recherche de la stratégie alphabeta (voir le module finales).")
+    parser.add_argument('--stats', action='store_true',
+                        help="Afficher des mesures de performance à la sortie.")
+    parser.add_argument('--stats-json', dest='stats_json', default=None, metavar='FICHIER',
+                        help="Sauvegarder ces mesures en JSON dans ce fichier "
+                        "(implique --stats).")
+    parser.add_argument('IDUL', nargs='*', help="IDUL du ou des joueurs.")
+
+    args = parser.parse_args()
+    if not args.IDUL and not args.simuler:
+        parser.error("l'argument IDUL est requis.")
+
+    return args
 
 
 def afficher_parties(parties):
@@ -42,7 +94,7 @@ def afficher_parties(parties):
     """
 
     aff_parties = ''
-    for i in enumerate(parties):
+    for i, _ in enumerate(parties):
         winner = (", gagnant: " +
                   str(parties[i]['gagnant']) if parties[i]['gagnant'] else '')
         sep = (" : " if i < 9 else ": ")
@@ -53,36 +105,58 @@ def afficher_parties(parties):
     return aff_parties
 
 
-def sauvergarder_partie_local(id, prochain_joueur, état, gagnant=None):
-    return id, prochain_joueur, état, gagnant
+_dépôt = None
 
 
-def lister_parties_local(iduls):
-    rep = requests.get(URL+'parties', params={'iduls': iduls})
+def dépôt_local():
+    """Retourner la base locale des parties (voir le module `stockage`).
+    Returns:
+        DépôtParties: La base, ouverte au premier appel.
+    """
+    global _dépôt
+    if _dépôt is None:
+        _dépôt = DépôtParties()
+        # Valider les sauvegardes en attente à la sortie du programme
+        atexit.register(_dépôt.fermer)
+    return _dépôt
 
-    if rep.status_code == 200:
-        rep = rep.json()
-        rep = list(rep['parties'])
-        return rep
 
-    if rep.status_code == 406:
-        rep = rep.json()
-        raise RuntimeError(rep)
+def sauvergarder_partie_local(id, prochain_joueur, état, gagnant=None):
+    """Sauvegarder localement l'état d'une partie.
+    Les sauvegardes sont écrites par lots; la fin d'une partie les valide.
+    Args:
+        id (str): Identifiant de la partie.
+        prochain_joueur (str): Nom du prochain joueur à jouer.
+        état (list): État courant du jeu.
+        gagnant (str): Nom du gagnant, si la partie est terminée.
+    Returns:
+        tuple: L'identifiant, le prochain joueur, l'état et le gagnant sauvegardés.
+    """
+    dépôt_local().sauvegarder(id, prochain_joueur, état, gagnant)
+    return id, prochain_joueur, état, gagnant
 
-    print(
-        f"Le GET sur '{URL}parties' a produit le code d'erreur suivant {rep.status_code}.")
 
+def lister_parties_local(iduls):
+    """Lister les 20 parties locales les plus récentes.
+    Args:
+        iduls (list): Liste des identifiant des joueurs.
+    Returns:
+        list: Liste des parties, sous la même forme que celles du serveur.
+    """
+    return dépôt_local().lister(iduls)
 
-def récupérer_parties_local():
-    if rep.status_code == 200:
-        rep = rep.json()
-        return (rep['id'], rep['prochain_joueur'], rep['état'])
 
-    if rep.status_code == 406:
-        rep = rep.json()
-        raise RuntimeError(rep)
-    print(
-        f"Le GET sur '{URL}parties' a produit le code d'erreur suivant {rep.status_code}.")
+def récupérer_parties_local(id_partie):
+    """Récupérer une partie locale depuis son identifiant.
+    Args:
+        id_partie (str): Identifiant de la partie à récupérer.
+    Returns:
+        tuple: Tuple constitué de l'identifiant de la partie,
+            du prochain joueur à jouer et de l'état courant du jeu.
+    Raises:
+        RuntimeError: La partie est inexistante.
+    """
+    return dépôt_local().récupérer(id_partie)
 
 
 class SquadroError(Exception):
@@ -97,6 +171,35 @@ class Squadro(SquadroInterface):
     La classe Squadro implémente la mécanique de jeux.
     '''
 
+    # Rapport de la dernière recherche, table de transposition et arbre Monte-Carlo
+    # conservés d'un coup à l'autre pendant la partie.
+    rapport = None
+    table = None
+    arbre = None
+    # Livre d'ouvertures (voir le module `ouvertures`) et table de finales
+    # (voir le module `finales`) consultés par les stratégies de recherche
+    # avant de chercher.
+    ouvertures = None
+    finales = None
+    # Recherche en arrière-plan pendant le temps de l'adversaire (voir `anticiper`).
+    anticipation = None
+    # Fonction d'évaluation de la stratégie alpha-bêta, par exemple un
+    # `evaluation.Évaluateur` aux poids ajustés. Une fonction assignée à la classe
+    # doit être enveloppée par `staticmethod`, comme celle par défaut, pour ne
+    # pas devenir une méthode liée.
+    évaluation = staticmethod(évaluer)
+    # Recherche alpha-bêta répartie sur plusieurs processus (voir le module
+    # `parallele`), construite avec la même évaluation et la même table de
+    # finales; None pour chercher dans le seul processus courant.
+    parallèle = None
+    # Nombre de processus de la stratégie mcts, chacun développant un arbre
+    # indépendant fusionné à la racine (voir `MCTS`).
+    processus_mcts = 1
+    # Nombre de pions arrivés de chaque joueur, tenu à jour par
+    # `mecanique_bouger_pion` et `annuler`; None pour le recompter. Le code qui
+    # modifie directement `état` doit le remettre à None.
+    arrivés = None
+
     def validation(self, joueur1, joueur2):
         """Validateur d'initialisation d'une instance de la classe Squadro.
         Valide les données arguments de construction de l'instance et retourne
@@ -167,247 +270,42 @@ class Squadro(SquadroInterface):
             return [{'nom': joueur1, 'pions': [0, 0, 0, 0, 0]},
                     {'nom': joueur2, 'pions': [0, 0, 0, 0, 0]}]
 
+    @classmethod
+    def depuis_compact(cls, code, noms):
+        """Créer une partie à partir d'un entier compact, sans validation.
+        Réservé aux positions produites par le moteur lui-même: contrairement au
+        constructeur, ni `validation` ni copie profonde ne sont effectuées.
+        Args:
+            code (int): L'entier compact de la position (voir le module `moteur`).
+            noms (tuple): Le nom des deux joueurs, le joueur 1 en premier.
+        Returns:
+            Squadro: La nouvelle partie.
+        """
+        partie = cls.__new__(cls)
+        partie.état = décompacter(code, noms)
+        return partie
+
+    def cloner(self):
+        """Copier la partie sans validation ni copie profonde.
+        Seules les deux listes de pions sont copiées; les tables de recherche
+        (`table`, `arbre`, `ouvertures` et `finales`) sont partagées avec la copie,
+        mais pas l'anticipation en cours.
+        Returns:
+            Squadro: La copie de la partie.
+        """
+        partie = self.__class__.__new__(self.__class__)
+        partie.__dict__.update(self.__dict__)
+        partie.__dict__.pop('anticipation', None)
+        partie.état = [{'nom': joueur['nom'], 'pions': list(joueur['pions'])}
+                       for joueur in self.état]
+        if self.arrivés is not None:
+            partie.arrivés = list(self.arrivés)
+        return partie
+
     def __str__(self):
-        # Nom des joueurs
-        joueur1 = self.état[0]['nom']  # nom joueur 1
-        joueur2 = self.état[1]['nom']  # nom joueur 2
-
-        # Listes d'état des pions des joueurs 1 et 2
-        j1 = self.état[0]['pions']  # pions joueur 1
-        j2 = self.état[1]['pions']  # pions joueur 2
-
-        # Initialisation de la grille
-        p = []
-        for i in range(85):
-            p.append('|')
-        for i in range(85)[10::15]:
-            p[i] = "─────┼──"
-            for j in range(3):
-                p[i+j+1] = "──|──"
-            p[i+4] = "──┼─────"
-
-    # JOUEUR 1 - Ligne - Blanc
-
-        for i in range(5):
-            # Aller
-            if j1[i] == 0:
-                p[10+15*i] = '□□ ○─┼──'
-            elif j1[i] == 1:
-                p[10+15*i] = '────□□ ○'
-            elif j1[i] == 2:
-                p[11+15*i] = '─□□ ○'
-            elif j1[i] == 3:
-                p[12+15*i] = '─□□ ○'
-            elif j1[i] == 4:
-                p[13+15*i] = '─□□ ○'
-            elif j1[i] == 5:
-                p[14+15*i] = '─□□ ○───'
-        # Tourne
-            elif j1[i] == 6:
-                p[14+15*i] = '──┼─○ □□'
-        # Retour
-            elif j1[i] == 7:
-                p[14+15*i] = '○ □□────'
-            elif j1[i] == 8:
-                p[13+15*i] = '○ □□─'
-            elif j1[i] == 9:
-                p[12+15*i] = '○ □□─'
-            elif j1[i] == 10:
-                p[11+15*i] = '○ □□─'
-            elif j1[i] == 11:
-                p[10+15*i] = '───○ □□─'
-            elif j1[i] == 12:
-                p[10+15*i] = '○ □□─┼──'
-
-        # JOUEUR 2 - Colonne - Noir
-
-        # Colonne 1 - Début de colonne; ne peut être bouclé
-
-        i = 0
-        # Aller
-        if j2[i] == 0:
-            p[0] = '█'
-            p[5] = '●'
-        elif j2[i] == 1:
-            p[10] = p[10][0:4] + '─█──'
-            p[15] = '●'
-        elif j2[i] == 2:
-            p[25] = p[25][0:4] + '─█──'
-            p[30] = '●'
-        elif j2[i] == 3:
-            p[40] = p[40][0:4] + '─█──'
-            p[45] = '●'
-        elif j2[i] == 4:
-            p[55] = p[55][0:4] + '─█──'
-            p[60] = '●'
-        elif j2[i] == 5:
-            p[70] = p[70][0:4] + '─█──'
-            p[75] = '●'
-
-        # Tourne
-        elif j2[i] == 6:
-            p[75] = '●'
-            p[80] = '█'
-        # Retour
-        elif j2[i] == 7:
-            p[65] = '●'
-            p[70] = p[70][0:4] + '─█──'
-        elif j2[i] == 8:
-            p[50] = '●'
-            p[55] = p[55][0:4] + '─█──'
-        elif j2[i] == 9:
-            p[35] = '●'
-            p[40] = p[40][0:4] + '─█──'
-        elif j2[i] == 10:
-            p[20] = '●'
-            p[25] = p[25][0:4] + '─█──'
-        elif j2[i] == 11:
-            p[5] = '●'
-            p[10] = p[10][0:4] + '─█──'
-        elif j2[i] == 12:
-            p[0] = '●'
-            p[5] = '█'
-
-        # Colonne 2,3,4
-        # Les colonnes 2, 3 et 4 ont une form similaire donc peuvent être bouclés.
-
-        for i in range(1, 4):
-            # Aller
-            if j2[i] == 0:
-                p[0 + i] = '█'
-                p[5 + i] = '●'
-            elif j2[i] == 1:
-                p[10 + i] = '──█──'
-                p[15 + i] = '●'
-            elif j2[i] == 2:
-                p[25 + i] = '──█──'
-                p[30 + i] = '●'
-            elif j2[i] == 3:
-                p[40 + i] = '──█──'
-                p[45 + i] = '●'
-            elif j2[i] == 4:
-                p[55 + i] = '──█──'
-                p[60 + i] = '●'
-            elif j2[i] == 5:
-                p[70 + i] = '──█──'
-                p[75 + i] = '●'
-
-        # Milieu
-            elif j2[i] == 6:
-                p[75 + i] = '●'
-                p[80 + i] = '█'
-        # Retour
-            elif j2[i] == 7:
-                p[65 + i] = '●'
-                p[70 + i] = '──█──'
-            elif j2[i] == 8:
-                p[50 + i] = '●'
-                p[55 + i] = '──█──'
-            elif j2[i] == 9:
-                p[35 + i] = '●'
-                p[40 + i] = '──█──'
-            elif j2[i] == 10:
-                p[20 + i] = '●'
-                p[25 + i] = '──█──'
-            elif j2[i] == 11:
-                p[5 + i] = '●'
-                p[10 + i] = '──█──'
-            elif j2[i] == 12:
-                p[0 + i] = '●'
-                p[5 + i] = '█'
-
-        # Colonne 5. Fin de Colonne; ne peut être bouclé
-
-        i = 4
-        # Aller
-        if j2[i] == 0:
-            p[0 + i] = '█'
-            p[5 + i] = '●'
-        elif j2[i] == 1:
-            p[10 + i] = '──█─' + p[10 + i][4:]
-            p[15 + i] = '●'
-        elif j2[i] == 2:
-            p[25 + i] = '──█─' + p[25 + i][4:]
-            p[30 + i] = '●'
-        elif j2[i] == 3:
-            p[40 + i] = '──█─' + p[40 + i][4:]
-            p[45 + i] = '●'
-        elif j2[i] == 4:
-            p[55 + i] = '──█─' + p[55 + i][4:]
-            p[60 + i] = '●'
-        elif j2[i] == 5:
-            p[70 + i] = '──█─' + p[70 + i][4:]
-            p[75 + i] = '●'
-
-        # Milieu
-        elif j2[i] == 6:
-            p[75 + i] = '●'
-            p[80 + i] = '█'
-
-        # Retour
-        elif j2[i] == 7:
-            p[65 + i] = '●'
-            p[70 + i] = '──█─' + p[70 + i][4:]
-        elif j2[i] == 8:
-            p[50 + i] = '●'
-            p[55 + i] = '──█─' + p[55 + i][4:]
-        elif j2[i] == 9:
-            p[35 + i] = '●'
-            p[40 + i] = '──█─' + p[40 + i][4:]
-        elif j2[i] == 10:
-            p[20 + i] = '●'
-            p[25 + i] = '──█─' + p[25 + i][4:]
-        elif j2[i] == 11:
-            p[5 + i] = '●'
-            p[10 + i] = '──█─' + p[10 + i][4:]
-        elif j2[i] == 12:
-            p[0 + i] = '●'
-            p[5 + i] = '█'
-
-        # Construction de la grille
-
-        damier = "            Légende:\n"
-        damier += "              □ = " + joueur1 + "\n"
-        damier += "              ■ = " + joueur2 + "\n\n"
-
-        damier += "                   . | . : | : : | : : | : . | .     \n"
-        damier += "                     " + p[0] + "   . " + p[1] + " .   " + p[2] + "   . " \
-            + p[3] + " .   " + p[4] + "       \n"
-        damier += "              ...    " + p[5] + "     " + p[6] + "     " + p[7] + "     " \
-            + p[8] + "     " + p[9] + "      .\n"
-        damier += "            1 ──" + p[10] + "─" + p[11] + "─" + p[12] + "─" + p[13] + "─" \
-            + p[14] + "──\n"
-        damier += "              ...    " + p[15] + "     " + p[16] + "     " + p[17] + "     " \
-            + p[18] + "     " + p[19] + "      .\n"
-        damier += "              .      " + p[20] + "     " + p[21] + "     " + p[22] + "     " \
-            + p[23] + "     " + p[24] + "    ...\n"
-        damier += "            2 ──" + p[25] + "─" + p[26] + "─" + p[27] + "─" + p[28] + "─" \
-            + p[29] + "──\n"
-        damier += "              .      " + p[30] + "     " + p[31] + "     " + p[32] + "     " \
-            + p[33] + "     " + p[34] + "    ...\n"
-        damier += "              ..     " + p[35] + "     " + p[36] + "     " + p[37] + "     " \
-            + p[38] + "     " + p[39] + "     ..\n"
-        damier += "            3 ──" + p[40] + "─" + p[41] + "─" + p[42] + "─" + p[43] + "─" \
-            + p[44] + "──\n"
-        damier += "              ..     " + p[45] + "     " + p[46] + "     " + p[47] + "     " \
-            + p[48] + "     " + p[49] + "     ..\n"
-        damier += "              .      " + p[50] + "     " + p[51] + "     " + p[52] + "     " \
-            + p[53] + "     " + p[54] + "    ...\n"
-        damier += "            4 ──" + p[55] + "─" + p[56] + "─" + p[57] + "─" + p[58] + "─" \
-            + p[59] + "──\n"
-        damier += "              .      " + p[60] + "     " + p[61] + "     " + p[62] + "     " \
-            + p[63] + "     " + p[64] + "    ...\n"
-        damier += "              ...    " + p[65] + "     " + p[66] + "     " + p[67] + "     " \
-            + p[68] + "     " + p[69] + "      .\n"
-        damier += "            5 ──" + p[70] + "─" + p[71] + "─" + p[72] + "─" + p[73] + "─" \
-            + p[74] + "──\n"
-        damier += "              ...    " + p[75] + "     " + p[76] + "     " + p[77] + "     " \
-            + p[78] + "     " + p[79] + "      .\n"
-        damier += "                   . " + p[80] + " .   " + p[81] + "     " + p[82] + "     " \
-            + p[83] + "   . " + p[84] + " .     \n"
-        damier += "                   : | : . | . : | : . | . : | :"
-
-        return damier
+        # Le plateau est rendu à partir de glyphes précalculés et mis en cache
+        # par position (voir le module `affichage`).
+        return dessiner((self.état[0]['nom'], self.état[1]['nom']), compacter(self.état))
 
     def déplacer_pion(self, joueur, pion):
         if 1 > pion > 5:
@@ -416,120 +314,206 @@ class Squadro(SquadroInterface):
 
         if self.état[0]['nom'] == joueur:
 
-            for i, _ in enumerate(self.état):
-                pionroundtrip = 0
-                for j in self.état[i]['pions']:
-                    if j == 12:
-                        pionroundtrip += 1
-                if pionroundtrip == 4:
-                    raise SquadroError(
-                        'SquadroError: La partie est déjà terminée.')
+            if self.partie_terminée():
+                raise SquadroError(
+                    'SquadroError: La partie est déjà terminée.')
 
             if self.état[0]['pions'][pion-1] == 12:
                 raise SquadroError(
                     'Ce pion a déjà atteint la destination finale.')
-                # établir mécanique pour avancer pions
-            if pion in (1, 5):
-                self.mecanique_bouger_pion(0, pion, 3, 1)
-            if pion in (2, 4):
-                self.mecanique_bouger_pion(0, pion, 1, 3)
-            if pion == 3:
-                self.mecanique_bouger_pion(0, pion, 2, 2)
+            # établir mécanique pour avancer pions
+            self.mecanique_bouger_pion(0, pion)
 
         elif self.état[1]['nom'] == joueur:
 
-            for i, _ in enumerate(self.état):
-                pionroundtrip = 0
-                for j in self.état[i]['pions']:
-                    if j == 12:
-                        pionroundtrip += 1
-                if pionroundtrip == 4:
-                    raise SquadroError(
-                        'SquadroError: La partie est déjà terminée.')
+            if self.partie_terminée():
+                raise SquadroError(
+                    'SquadroError: La partie est déjà terminée.')
 
             if self.état[1]['pions'][pion-1] >= 12:
                 raise SquadroError(
                     'Ce pion a déjà atteint la destination finale.')
 
             # établir mécanique pour avancer pions
-            if pion in (1, 5):
-                self.mecanique_bouger_pion(1, pion, 1, 3)
-            if pion in (2, 4):
-                self.mecanique_bouger_pion(1, pion, 3, 1)
-            if pion == 3:
-                self.mecanique_bouger_pion(1, pion, 2, 2)
+            self.mecanique_bouger_pion(1, pion)
 
         else:
             raise SquadroError(
                 'Le nom du joueur est inexistant pour la partie en cours.')
 
-    def mecanique_bouger_pion(self, ind_joueur, pion, aller, retour):
+    def mecanique_bouger_pion(self, ind_joueur, pion):
         '''
         La mécanique de bouger_pion a été mise en place dans cette fonction.
+        Le résultat du déplacement (nouvelle position et pions adverses renvoyés)
+        provient de la table précalculée `moteur.TRANSITIONS`.
+        Retourne l'ancienne position du pion et le masque des pions adverses renvoyés.
         '''
 
-        # avancer le pion selon la ligne ou la colonne
-
-        if ind_joueur == 0:
-            ind_autrejoueur = 1
-        else:
-            ind_autrejoueur = 0
-
         pjactif = self.état[ind_joueur]['pions']
-        pjautre = self.état[ind_autrejoueur]['pions']
-
-        partant = 0
-
-        if pjactif[pion-1] <= 5:
-            tot_pas = aller
-            partant = 1
-        elif pjactif[pion-1] >= 6:
-            tot_pas = retour
-
-        rencontre = 0
-
-        for _ in range(tot_pas):
-
-            pjactif[pion - 1] += 1  # Déplacer de un le pion actif
-
-            pos = 0
-
-            # Bouclier pour voir s'il y a des superpositions
-            if pjactif[pion - 1] in (0, 6, 12):
-                pass
-            if 0 < pjactif[pion - 1] <= 5:
-                pos = pjactif[pion - 1]
-            elif 6 <= pjactif[pion - 1] < 12:
-                pos = 12 - pjactif[pion - 1]
-
-            while 0 < pos <= 5 and (pjautre[pos-1] == pion or pjautre[pos-1] == 12 - pion):
-                if pjautre[pos-1] <= 5:
-                    # Retourner le pion adverse à la case départ
-                    pjautre[pos-1] = 0
-                elif pjautre[pos-1] >= 6:
-                    # Retourner le pion adverse à la case de retournement
-                    pjautre[pos-1] = 6
-                pjactif[pion-1] += 1  # Ajouter 1 si superpostion
-                pos += 1
-                rencontre = 1
-
-            # Conditions de cessation de l'ajout de pas.
-            if pjactif[pion-1] >= 6 and partant == 1:
-                pjactif[pion-1] = 6
-                break
-
-            if pjactif[pion-1] >= 12:
-                pjactif[pion-1] = 12
-                break
+        pjautre = self.état[1 - ind_joueur]['pions']
+
+        # Pions adverses présents sur la voie du pion actif
+        croise = CROISEMENTS[pion]
+        croisés = croise[pjautre[0]] | croise[pjautre[1]] << 1 | croise[pjautre[2]] << 2 \
+            | croise[pjautre[3]] << 3 | croise[pjautre[4]] << 4
+
+        ancienne = pjactif[pion - 1]
+        pjactif[pion - 1], renvoyés = transition(ind_joueur, pion, ancienne, croisés)
+        # Un pion renvoyé n'était jamais arrivé: seul le pion actif change le compte
+        if pjactif[pion - 1] == 12 and self.arrivés is not None:
+            self.arrivés[ind_joueur] += 1
+
+        reste = renvoyés
+        while reste:
+            # Retourner le pion adverse à la case départ ou de retournement
+            ind = (reste & -reste).bit_length() - 1
+            pjautre[ind] = 0 if pjautre[ind] <= 5 else 6
+            reste &= reste - 1
+
+        return ancienne, renvoyés
+
+    def _indice_joueur(self, joueur):
+        """Retourner l'indice d'un joueur dans l'état.
+        Raises:
+            SquadroError: Le nom du joueur est inexistant pour la partie en cours.
+        """
+        if self.état[0]['nom'] == joueur:
+            return 0
+        if self.état[1]['nom'] == joueur:
+            return 1
+        raise SquadroError(
+            "Le nom du joueur est inexistant pour la partie en cours.")
 
-            if rencontre == 1:  # Condition si pion adverse a été rencontré
-                break
+    def coups_légaux(self, joueur):
+        """Énumérer les coups légaux d'un joueur.
+        Args:
+            joueur (str): Le nom du joueur tel que présent dans l'état.
+        Raises:
+            SquadroError: Le nom du joueur est inexistant pour la partie en cours.
+        Returns:
+            List[Tuple[str, int]]: Les coups légaux sous la forme (joueur, pion);
+                une liste vide si la partie est terminée.
+        """
+        ind_joueur = self._indice_joueur(joueur)
+        if self.partie_terminée():
+            return []
+        return [(joueur, ind_pion + 1)
+                for ind_pion, valeur in enumerate(self.état[ind_joueur]['pions'])
+                if valeur < 12]
+
+    def jouer(self, coup):
+        """Jouer un coup en conservant de quoi l'annuler.
+        Contrairement à `déplacer_pion`, le coup n'est pas validé: il doit provenir
+        de `coups_légaux`.
+        Args:
+            coup (Tuple[str, int]): Le nom du joueur et le numéro du pion à déplacer.
+        Raises:
+            SquadroError: Le nom du joueur est inexistant pour la partie en cours.
+        Returns:
+            tuple: L'enregistrement d'annulation (indice du joueur, pion, ancienne
+                position et masque des pions adverses renvoyés) à donner à `annuler`.
+        """
+        ind_joueur = self._indice_joueur(coup[0])
+        return (ind_joueur, coup[1]) + self.mecanique_bouger_pion(ind_joueur, coup[1])
 
-    def jouer_coup(self, joueur):
+    def annuler(self, annulation):
+        """Annuler un coup joué avec `jouer`.
+        Les coups doivent être annulés dans l'ordre inverse où ils ont été joués.
+        Args:
+            annulation (tuple): L'enregistrement retourné par `jouer`.
+        """
+        ind_joueur, pion, ancienne, renvoyés = annulation
+        pions = self.état[ind_joueur]['pions']
+        if pions[pion - 1] == 12 and self.arrivés is not None:
+            self.arrivés[ind_joueur] -= 1
+        pions[pion - 1] = ancienne
+
+        # Un pion renvoyé à 0 était à l'aller sur la voie du pion,
+        # un pion renvoyé à 6 y était au retour.
+        pjautre = self.état[1 - ind_joueur]['pions']
+        while renvoyés:
+            ind = (renvoyés & -renvoyés).bit_length() - 1
+            pjautre[ind] = pion if pjautre[ind] == 0 else 12 - pion
+            renvoyés &= renvoyés - 1
+
+    def jouer_coup(self, joueur, strategie='hasard', temps=1.0):
+        """Jouer un coup automatique pour un joueur.
+        Args:
+            joueur (str): Le nom du jouer tel que représenté dans l'état.
+            strategie (str): `hasard` pour choisir un pion au hasard, `alphabeta`
+                pour une recherche minimax avec élagage alpha-bêta ou `mcts` pour
+                une recherche Monte-Carlo.
+            temps (float): Budget de temps en secondes de la recherche.
+        Raises:
+            SquadroError: Le nom du joueur est inexistant pour la partie en cours.
+            SquadroError: La stratégie est inconnue.
+        Returns:
+            Tuple[str, int]: Un tuple composé du nom du joueur et du numéro du pion joué.
+                Le rapport de la recherche, le cas échéant, est conservé dans
+                l'attribut `rapport`, la table de transposition dans l'attribut `table`
+                et l'arbre Monte-Carlo dans l'attribut `arbre`.
+        """
 
         if isinstance(self.partie_terminée(), str):
             return
 
+        anticipé = None
+        if self.anticipation is not None:
+            # Le coup adverse est joué: interrompre l'anticipation
+            anticipé = self.anticipation.conclure(self.état_compact(joueur))
+
+        if strategie != 'hasard' and self.ouvertures is not None:
+            ouverture = self.ouvertures.chercher(self.état_compact(joueur))
+            if ouverture is not None:
+                self.rapport = Rapport(ouverture[0], ouverture[1], 0, 0, 0.0)
+                self.déplacer_pion(joueur, ouverture[0])
+
+                return (joueur, ouverture[0])
+
+        if strategie != 'hasard' and self.finales is not None:
+            finale = self.finales.meilleur_coup(self.état_compact(joueur))
+            if finale is not None:
+                self.rapport = Rapport(finale[0], score_finale(finale[1]), 0, 0, 0.0)
+                self.déplacer_pion(joueur, finale[0])
+
+                return (joueur, finale[0])
+
+        if strategie == 'alphabeta':
+            if self.parallèle is not None:
+                self.table = self.parallèle.table
+            elif self.table is None:
+                self.table = TableTransposition()
+            if anticipé is not None and anticipé.durée >= temps:
+                self.rapport = anticipé
+            else:
+                # Compléter la réflexion faite pendant le temps de l'adversaire
+                reste = temps - (anticipé.durée if anticipé else 0.0)
+                if self.parallèle is not None:
+                    self.rapport = self.parallèle.chercher(self.état_compact(joueur), reste)
+                else:
+                    self.rapport = chercher(self.état_compact(joueur), reste,
+                                            table=self.table, finales=self.finales,
+                                            évaluation=self.évaluation)
+                if anticipé is not None and anticipé.profondeur > self.rapport.profondeur:
+                    self.rapport = anticipé
+            self.déplacer_pion(joueur, self.rapport.coup)
+
+            return (joueur, self.rapport.coup)
+
+        if strategie == 'mcts':
+            if self.arbre is None:
+                self.arbre = MCTS(processus=self.processus_mcts)
+            self.rapport = self.arbre.chercher(self.état_compact(joueur), temps)
+            self.déplacer_pion(joueur, self.rapport.coup)
+            if self.partie_terminée():
+                # Arrêter les processus de la recherche à la fin de la partie
+                self.arbre.fermer()
+
+            return (joueur, self.rapport.coup)
+
+        if strategie != 'hasard':
+            raise SquadroError(f"La stratégie {strategie} est inconnue.")
+
         if self.état[0]['nom'] == joueur:
 
             pionsactifs = []
@@ -559,6 +543,27 @@ class Squadro(SquadroInterface):
         raise SquadroError(
             "Le nom du joueur est inexistant pour la partie en cours.")
 
+    def anticiper(self, joueur):
+        """Réfléchir en arrière-plan pendant que l'adversaire choisit son coup.
+        Les réponses aux coups possibles de l'adversaire sont cherchées par un fil
+        d'arrière-plan jusqu'au prochain appel de `jouer_coup`, qui l'interrompt
+        et reprend la réponse déjà calculée (voir le module `anticipation`).
+        Args:
+            joueur (str): Le nom de l'adversaire, au trait.
+        Raises:
+            SquadroError: Le nom du joueur est inexistant pour la partie en cours.
+        """
+        if self.partie_terminée():
+            return
+        if self.anticipation is None:
+            self.anticipation = Anticipation()
+        if self.parallèle is not None:
+            self.table = self.parallèle.table
+        elif self.table is None:
+            self.table = TableTransposition()
+        self.anticipation.démarrer(self.état_compact(joueur), self.table, self.finales,
+                                   self.évaluation)
+
     def demander_coup(self, joueur):
         """
         Demander le coup à jouer via le terminal
@@ -591,19 +596,34 @@ class Squadro(SquadroInterface):
 
         return npion
 
+    def état_compact(self, joueur):
+        """Produire l'état actuel de la partie sous forme d'entier compact.
+        Args:
+            joueur (str): Le nom du joueur au trait.
+        Raises:
+            SquadroError: Le nom du joueur est inexistant pour la partie en cours.
+        Returns:
+            int: L'entier compact de la position (voir le module `moteur`).
+        """
+        for ind_joueur, valeur in enumerate(self.état):
+            if valeur['nom'] == joueur:
+                return compacter(self.état, ind_joueur)
+
+        raise SquadroError(
+            "Le nom du joueur est inexistant pour la partie en cours.")
+
     def partie_terminée(self):
         """Déterminer si la partie est terminée.
+        Le nombre de pions arrivés de chaque joueur est tenu à jour à chaque coup
+        (attribut `arrivés`); il n'est compté sur l'état qu'au premier appel.
         Returns:
             str/bool: Le nom du gagnant si la partie est terminée; False autrement.
         """
-
-        # Itérer sur chacun des joueurs pour déterminer le vainqueur:
-        for i, joueur in enumerate(self.état):
-            pionroundtrip = 0
-            for j in self.état[i]['pions']:
-                if j == 12:
-                    pionroundtrip += 1
-            if pionroundtrip == 4:
-                return joueur["nom"]
-
+        arrivés = self.arrivés
+        if arrivés is None:
+            arrivés = self.arrivés = [joueur['pions'].count(12) for joueur in self.état]
+        if arrivés[0] >= 4:
+            return self.état[0]['nom']
+        if arrivés[1] >= 4:
+            return self.état[1]['nom']
         return False
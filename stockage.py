@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Module de stockage local des parties du jeu Squadro
+Ce module conserve les parties jouées localement dans une base SQLite: pour
+chaque partie, son identifiant, ses joueurs, sa date, son gagnant et tout
+l'historique de ses états. Une table d'association indexée par IDUL et par
+numéro de séquence (l'ordre d'arrivée des parties, plus fin que leur date à la
+seconde près) fait de la liste des dernières parties d'un joueur une requête
+indexée plutôt qu'un parcours de toutes les parties.
+
+Les écritures sont regroupées: chaque sauvegarde s'ajoute à la transaction en
+cours, qui n'est validée (et écrite sur le disque) qu'après un lot de
+sauvegardes, à la fin d'une partie ou lors d'une lecture.
+Attributes:
+    FICHIER (str): Le fichier de la base par défaut.
+    TAILLE_LOT (int): Le nombre de sauvegardes par transaction.
+Classes:
+    * DépôtParties - Base locale des parties.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+FICHIER = 'squadro.db'
+TAILLE_LOT = 64
+
+_SCHÉMA = """
+CREATE TABLE IF NOT EXISTS parties (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    joueur1 TEXT NOT NULL,
+    joueur2 TEXT NOT NULL,
+    prochain_joueur TEXT,
+    état TEXT NOT NULL,
+    gagnant TEXT,
+    coups INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS joueurs (
+    idul TEXT NOT NULL,
+    séquence INTEGER NOT NULL,  -- rowid de la partie, croissant: aucune partie n'est supprimée
+    id TEXT NOT NULL REFERENCES parties(id),
+    PRIMARY KEY (idul, id)
+);
+CREATE INDEX IF NOT EXISTS joueurs_séquence ON joueurs (idul, séquence DESC);
+CREATE TABLE IF NOT EXISTS historique (
+    id TEXT NOT NULL REFERENCES parties(id),
+    numéro INTEGER NOT NULL,
+    prochain_joueur TEXT,
+    état TEXT NOT NULL,
+    PRIMARY KEY (id, numéro)
+) WITHOUT ROWID;
+"""
+
+
+class DépôtParties:
+    '''
+    Base locale des parties.
+    '''
+
+    def __init__(self, chemin=FICHIER, taille_lot=TAILLE_LOT):
+        """Constructeur de la classe DépôtParties.
+        Args:
+            chemin (str): Le fichier de la base; ':memory:' pour une base en mémoire.
+            taille_lot (int): Le nombre de sauvegardes par transaction.
+        """
+        self.taille_lot = taille_lot
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        # Journal WAL: une validation n'attend pas la synchronisation du fichier principal
+        self._connexion.execute('PRAGMA journal_mode=WAL')
+        self._connexion.execute('PRAGMA synchronous=NORMAL')
+        self._connexion.executescript(_SCHÉMA)
+        self._verrou = threading.Lock()
+        self._en_attente = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.fermer()
+
+    def fermer(self):
+        """Valider les sauvegardes en attente et fermer la base."""
+        self.vider()
+        self._connexion.close()
+
+    def vider(self):
+        """Valider les sauvegardes en attente."""
+        with self._verrou:
+            self._valider()
+
+    def _valider(self):
+        if self._en_attente:
+            self._connexion.commit()
+            self._en_attente = 0
+
+    def sauvegarder(self, id_partie, prochain_joueur, état, gagnant=None):
+        """Sauvegarder l'état d'une partie et l'ajouter à son historique.
+        Args:
+            id_partie (str): L'identifiant de la partie.
+            prochain_joueur (str): Le nom du prochain joueur à jouer.
+            état (list): L'état de la partie, le joueur 1 en premier.
+            gagnant (str): Le nom du gagnant, si la partie est terminée.
+        """
+        état_json = json.dumps(état)
+        with self._verrou:
+            curseur = self._connexion.execute(
+                'UPDATE parties SET prochain_joueur = ?, état = ?, gagnant = ?, '
+                'coups = coups + 1 WHERE id = ? RETURNING coups',
+                (prochain_joueur, état_json, gagnant, id_partie))
+            ligne = curseur.fetchone()
+            if ligne is None:
+                date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                noms = (état[0]['nom'], état[1]['nom'])
+                séquence = self._connexion.execute(
+                    'INSERT INTO parties VALUES (?, ?, ?, ?, ?, ?, ?, 0)',
+                    (id_partie, date, *noms, prochain_joueur, état_json, gagnant)).lastrowid
+                self._connexion.executemany(
+                    'INSERT OR IGNORE INTO joueurs (idul, séquence, id) VALUES (?, ?, ?)',
+                    [(nom, séquence, id_partie) for nom in noms])
+                numéro = 0
+            else:
+                numéro = ligne[0]
+            self._connexion.execute('INSERT OR REPLACE INTO historique VALUES (?, ?, ?, ?)',
+                                    (id_partie, numéro, prochain_joueur, état_json))
+            self._en_attente += 1
+            if gagnant or self._en_attente >= self.taille_lot:
+                self._valider()
+
+    def lister(self, iduls, nombre=20):
+        """Lister les parties les plus récentes de un ou plusieurs joueurs.
+        Args:
+            iduls (list): Les noms des joueurs.
+            nombre (int): Le nombre maximal de parties.
+        Returns:
+            list: Les parties, la plus récente en premier, sous la même forme que
+                celles du serveur (`id`, `date`, `joueurs` et `gagnant`).
+        """
+        with self._verrou:
+            self._valider()
+            lignes = self._connexion.execute(
+                'SELECT id, date, joueur1, joueur2, gagnant FROM parties WHERE rowid IN ('
+                ' SELECT DISTINCT séquence FROM joueurs WHERE idul IN ({})'
+                ' ORDER BY séquence DESC LIMIT ?) ORDER BY rowid DESC'.format(
+                    ', '.join('?' * len(iduls))),
+                (*iduls, nombre)).fetchall()
+        return [{'id': id_partie, 'date': date, 'joueurs': [joueur1, joueur2], 'gagnant': gagnant}
+                for id_partie, date, joueur1, joueur2, gagnant in lignes]
+
+    def récupérer(self, id_partie):
+        """Récupérer une partie depuis son identifiant.
+        Args:
+            id_partie (str): L'identifiant de la partie.
+        Raises:
+            RuntimeError: La partie est inexistante.
+        Returns:
+            tuple: L'identifiant de la partie, le prochain joueur à jouer et l'état courant.
+        """
+        with self._verrou:
+            self._valider()
+            ligne = self._connexion.execute(
+                'SELECT prochain_joueur, état FROM parties WHERE id = ?',
+                (id_partie,)).fetchone()
+        if ligne is None:
+            raise RuntimeError(f"La partie {id_partie} est inexistante.")
+        return id_partie, ligne[0], json.loads(ligne[1])
+
+    def historique(self, id_partie):
+        """Récupérer tous les états successifs d'une partie.
+        Args:
+            id_partie (str): L'identifiant de la partie.
+        Returns:
+            list: Le prochain joueur et l'état de chaque sauvegarde, dans l'ordre.
+        """
+        with self._verrou:
+            self._valider()
+            lignes = self._connexion.execute(
+                'SELECT prochain_joueur, état FROM historique WHERE id = ? ORDER BY numéro',
+                (id_partie,)).fetchall()
+        return [(prochain_joueur, json.loads(état)) for prochain_joueur, état in lignes]
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""Module de tournoi du jeu Squadro
+Ce module fait s'affronter des configurations du robot (une stratégie de
+`Squadro.jouer_coup`, un budget de temps et, pour la stratégie alphabeta, des
+poids d'évaluation) sur un bassin de processus, à la ronde ou en défi (le
+premier participant contre chacun des autres). Les deux participants d'une
+paire commencent à tour de rôle et chacun garde sa propre table de
+transposition et son propre arbre Monte-Carlo.
+
+Chaque partie terminée est ajoutée à un journal (une ligne JSON par partie):
+un tournoi interrompu reprend là où il s'était arrêté lorsqu'il est relancé
+avec le même journal. Les résultats sont résumés par une estimation Elo avec
+intervalle de confiance, par paire et par participant. Un test séquentiel
+(SPRT) peut arrêter une paire dès que l'issue est tranchée.
+Attributes:
+    STRATÉGIES (tuple): Les stratégies de `Squadro.jouer_coup`.
+    MODES (tuple): `ronde` (toutes les paires) ou `défi` (le premier participant
+        contre chacun des autres).
+    PARTIES (int): Nombre de parties par paire par défaut.
+    SPRT_MINIMUM (int): Nombre de parties d'une paire avant le premier test séquentiel.
+    Z (float): Quantile de la loi normale des intervalles de confiance à 95 %.
+Classes:
+    * Participant - Configuration du robot inscrite au tournoi.
+Functions:
+    * analyser_participant - Construit un participant à partir de sa description.
+    * elo - Convertit un score moyen en écart Elo.
+    * llr_sprt - Calcule le log-rapport de vraisemblance du test séquentiel.
+    * classement - Estime l'Elo de chaque participant.
+    * tournoi - Joue un tournoi reprenable sur un bassin de processus.
+    * afficher_tournoi - Formate les résultats d'un tournoi.
+"""
+import json
+import math
+import os
+import random
+import zlib
+from argparse import ArgumentParser
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+from time import perf_counter
+
+from moteur import ÉTAT_INITIAL
+from recherche import évaluer
+from simulation import COUPS_MAX, NOMS
+from squadro import Squadro
+
+STRATÉGIES = ('hasard', 'alphabeta', 'mcts')
+MODES = ('ronde', 'défi')
+PARTIES = 20
+SPRT_MINIMUM = 10
+Z = 1.96
+_VARIANCE_MIN = 0.01  # évite une variance nulle lorsqu'un participant gagne tout
+_EPSILON = 1e-9  # un score plus proche de 0 ou de 1 est arrondi à la limite
+
+_évaluateurs = {}
+
+
+class Participant(namedtuple('Participant', ['nom', 'strategie', 'temps', 'poids'])):
+    """Configuration du robot inscrite au tournoi.
+    Attributes:
+        nom (str): Le nom unique du participant.
+        strategie (str): La stratégie de `Squadro.jouer_coup`.
+        temps (float): Budget de temps par coup en secondes.
+        poids (str): Le fichier des poids de l'évaluation de la stratégie
+            alphabeta (voir le module `evaluation`); None pour `recherche.évaluer`.
+    """
+    __slots__ = ()
+
+
+def analyser_participant(description):
+    """Construire un participant à partir de sa description.
+    La description a la forme `[nom=]strategie[:temps[:poids]]`, par exemple
+    `hasard`, `ab1=alphabeta:1.0` ou `pondéré=alphabeta:0.1:poids.json`.
+    Args:
+        description (str): La description du participant.
+    Returns:
+        Participant: Le participant; son nom est la description elle-même s'il
+            n'est pas donné.
+    Raises:
+        ValueError: La stratégie est inconnue ou le temps n'est pas un nombre.
+    """
+    nom, _, configuration = description.rpartition('=')
+    strategie, temps, poids = (configuration.split(':', 2) + ['', ''])[:3]
+    if strategie not in STRATÉGIES:
+        raise ValueError(f"La stratégie {strategie} est inconnue.")
+    return Participant(nom or description, strategie, float(temps or 0.1), poids or None)
+
+
+def _évaluateur(poids):
+    """Retourner l'évaluation d'un fichier de poids, chargée une fois par processus;
+    `recherche.évaluer` sans fichier."""
+    if poids is None:
+        return évaluer
+    if poids not in _évaluateurs:
+        # Importé ici: le module evaluation nécessite NumPy
+        from evaluation import Évaluateur
+        _évaluateurs[poids] = Évaluateur(poids)
+    return _évaluateurs[poids]
+
+
+def _jouer_partie(premier, second, graine):
+    """Jouer une partie entre deux participants dans un processus.
+    Returns:
+        tuple: L'indice du gagnant (0 pour `premier`, None si la partie est
+            nulle) et le nombre de coups joués.
+    """
+    random.seed(graine)
+    partie = Squadro.depuis_compact(ÉTAT_INITIAL, NOMS)
+    côtés = (premier, second)
+    tables = [None, None]
+    arbres = [None, None]
+    joués = 0
+    while not partie.partie_terminée():
+        if joués >= COUPS_MAX:
+            return None, joués
+        ind = joués % 2
+        # Chaque participant garde ses propres tables d'un coup à l'autre
+        partie.table, partie.arbre = tables[ind], arbres[ind]
+        partie.évaluation = _évaluateur(côtés[ind].poids)
+        partie.jouer_coup(NOMS[ind], côtés[ind].strategie, côtés[ind].temps)
+        tables[ind], arbres[ind] = partie.table, partie.arbre
+        joués += 1
+    return NOMS.index(partie.partie_terminée()), joués
+
+
+def elo(score):
+    """Convertir un score moyen en écart Elo.
+    Args:
+        score (float): Le score moyen, entre 0 et 1 (une nulle vaut 1/2).
+    Returns:
+        float: L'écart Elo correspondant; infini si le score vaut 0 ou 1, à
+            l'erreur d'arrondi près.
+    """
+    if score <= _EPSILON:
+        return -math.inf
+    if score >= 1.0 - _EPSILON:
+        return math.inf
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def _moyenne_variance(victoires, nulles, défaites):
+    """Retourner le score moyen par partie et sa variance."""
+    parties = victoires + nulles + défaites
+    score = (victoires + nulles / 2) / parties
+    variance = (victoires * (1.0 - score) ** 2 + nulles * (0.5 - score) ** 2
+                + défaites * score ** 2) / parties
+    return score, variance
+
+
+def llr_sprt(victoires, nulles, défaites, elo0, elo1):
+    """Calculer le log-rapport de vraisemblance du test séquentiel.
+    Le test oppose l'hypothèse H0, un écart de `elo0`, à l'hypothèse H1, un
+    écart de `elo1`, selon l'approximation normale du modèle trinomial.
+    Args:
+        victoires (int): Les victoires du participant évalué.
+        nulles (int): Les parties nulles.
+        défaites (int): Les défaites du participant évalué.
+        elo0 (float): L'écart Elo de l'hypothèse H0.
+        elo1 (float): L'écart Elo de l'hypothèse H1.
+    Returns:
+        float: Le log-rapport de vraisemblance de H1 contre H0.
+    """
+    parties = victoires + nulles + défaites
+    if not parties:
+        return 0.0
+    score, variance = _moyenne_variance(victoires, nulles, défaites)
+    score0 = 1.0 / (1.0 + 10.0 ** (-elo0 / 400.0))
+    score1 = 1.0 / (1.0 + 10.0 ** (-elo1 / 400.0))
+    return parties * (score1 - score0) * (2.0 * score - score0 - score1) \
+        / (2.0 * max(variance, _VARIANCE_MIN))
+
+
+def _décision_sprt(résultat, sprt):
+    """Retourner le log-rapport de vraisemblance d'une paire et l'hypothèse
+    acceptée (`H0`, `H1` ou None si le test n'est pas tranché)."""
+    if sprt is None:
+        return None, None
+    elo0, elo1, alpha, beta = sprt
+    victoires, défaites = résultat['victoires']
+    llr = llr_sprt(victoires, résultat['nulles'], défaites, elo0, elo1)
+    if résultat['parties'] < SPRT_MINIMUM:
+        return llr, None
+    if llr >= math.log((1.0 - beta) / alpha):
+        return llr, 'H1'
+    if llr <= math.log(beta / (1.0 - alpha)):
+        return llr, 'H0'
+    return llr, None
+
+
+def classement(noms, résultats, itérations=200):
+    """Estimer l'Elo de chaque participant.
+    Les cotes sont celles du modèle de Bradley-Terry ajusté par maximum de
+    vraisemblance (une nulle compte pour une demi-victoire), centrées sur 0.
+    Une partie nulle fictive par paire jouée garde les cotes finies lorsqu'un
+    participant gagne ou perd toutes ses parties.
+    Args:
+        noms (list): Les noms des participants.
+        résultats (dict): Pour chaque paire de noms, un dict des victoires de
+            chacun, des parties nulles et du nombre de parties.
+        itérations (int): Le nombre d'itérations de l'ajustement.
+    Returns:
+        list: Pour chaque participant, du mieux au moins bien classé, un dict du
+            nom, de l'Elo, de la marge de l'intervalle de confiance à 95 %, du
+            nombre de parties et du score moyen.
+    """
+    indices = {nom: ind for ind, nom in enumerate(noms)}
+    points = [0.0] * len(noms)
+    jouées = [0] * len(noms)
+    rencontres = {}
+    for (nom_a, nom_b), résultat in résultats.items():
+        if not résultat['parties']:
+            continue
+        a, b = indices[nom_a], indices[nom_b]
+        points[a] += résultat['victoires'][0] + résultat['nulles'] / 2
+        points[b] += résultat['victoires'][1] + résultat['nulles'] / 2
+        jouées[a] += résultat['parties']
+        jouées[b] += résultat['parties']
+        # Avec la partie nulle fictive
+        rencontres[(a, b)] = rencontres[(b, a)] = résultat['parties'] + 1
+    fictives = [sum(1 for joueur, _ in rencontres if joueur == ind) / 2
+                for ind in range(len(noms))]
+
+    cotes = [1.0] * len(noms)
+    for _ in range(itérations):
+        for ind in range(len(noms)):
+            dénominateur = sum(parties / (cotes[ind] + cotes[autre])
+                               for (joueur, autre), parties in rencontres.items()
+                               if joueur == ind)
+            if dénominateur:
+                cotes[ind] = (points[ind] + fictives[ind]) / dénominateur
+        moyenne = math.exp(sum(math.log(cote) for cote in cotes) / len(cotes))
+        cotes = [cote / moyenne for cote in cotes]
+
+    facteur = 400.0 / math.log(10.0)
+    lignes = []
+    for ind, nom in enumerate(noms):
+        information = 0.0
+        for (joueur, autre), nombre in rencontres.items():
+            if joueur == ind:
+                probabilité = cotes[ind] / (cotes[ind] + cotes[autre])
+                information += nombre * probabilité * (1.0 - probabilité)
+        lignes.append({
+            'nom': nom,
+            'elo': facteur * math.log(cotes[ind]),
+            'marge': Z * facteur / math.sqrt(information) if information else math.inf,
+            'parties': jouées[ind],
+            'score': points[ind] / jouées[ind] if jouées[ind] else 0.0,
+        })
+    return sorted(lignes, key=lambda ligne: ligne['elo'], reverse=True)
+
+
+def _résumer_paire(paire, résultat, sprt):
+    """Ajouter à une paire son score, son écart Elo et l'état du test séquentiel."""
+    résumé = {'joueurs': list(paire), **résultat}
+    victoires, défaites = résultat['victoires']
+    if résultat['parties']:
+        # Intervalle de Wilson, qui reste informatif lorsqu'un participant gagne tout
+        parties = résultat['parties']
+        score, variance = _moyenne_variance(victoires, résultat['nulles'], défaites)
+        centre = (score + Z * Z / (2 * parties)) / (1 + Z * Z / parties)
+        marge = Z * math.sqrt(variance / parties + Z * Z / (4 * parties * parties)) \
+            / (1 + Z * Z / parties)
+        résumé.update(score=score, elo=elo(score),
+                      intervalle=(elo(max(0.0, centre - marge)), elo(min(1.0, centre + marge))))
+    else:
+        résumé.update(score=0.0, elo=0.0, intervalle=(-math.inf, math.inf))
+    résumé['llr'], résumé['décision'] = _décision_sprt(résultat, sprt)
+    return résumé
+
+
+def _lire_journal(chemin, participants, résultats):
+    """Reprendre les parties d'un journal.
+    Returns:
+        set: Les parties déjà jouées, par paire de noms et numéro.
+    Raises:
+        ValueError: Un participant du journal porte le même nom qu'un participant
+            du tournoi, mais avec une autre configuration.
+    """
+    jouées = set()
+    if not os.path.exists(chemin):
+        return jouées
+    configurations = {participant.nom: list(participant) for participant in participants}
+    with open(chemin, encoding='utf-8') as fichier:
+        for ligne in fichier:
+            try:
+                entrée = json.loads(ligne)
+            except ValueError:
+                # Dernière ligne tronquée par l'interruption du tournoi
+                continue
+            if 'participants' in entrée:
+                for configuration in entrée['participants']:
+                    nom = configuration[0]
+                    if nom in configurations and configurations[nom] != configuration:
+                        raise ValueError(f"Le participant {nom} du journal {chemin} "
+                                         "a une autre configuration.")
+                continue
+            paire = tuple(entrée['paire'])
+            if paire not in résultats or (paire, entrée['partie']) in jouées:
+                continue
+            jouées.add((paire, entrée['partie']))
+            _ajouter(résultats[paire], paire, entrée['gagnant'], entrée['coups'])
+    return jouées
+
+
+def _ajouter(résultat, paire, gagnant, coups):
+    """Ajouter une partie aux résultats d'une paire."""
+    résultat['parties'] += 1
+    résultat['coups'] += coups
+    if gagnant is None:
+        résultat['nulles'] += 1
+    else:
+        résultat['victoires'][paire.index(gagnant)] += 1
+
+
+def tournoi(participants, mode='ronde', parties=PARTIES, journal=None, processus=None,
+            sprt=None, graine=0):
+    """Jouer un tournoi reprenable sur un bassin de processus.
+    Les parties des différentes paires sont entrelacées, de sorte que le test
+    séquentiel s'applique à toutes les paires au même rythme.
+    Args:
+        participants (list): Les participants (voir `Participant`).
+        mode (str): `ronde` ou `défi` (voir `MODES`).
+        parties (int): Le nombre de parties par paire, arrondi au nombre pair
+            supérieur pour que chacun commence autant de fois.
+        journal (str): Le fichier où ajouter chaque partie jouée et d'où
+            reprendre les parties déjà jouées, le cas échéant.
+        processus (int): Le nombre de processus; par défaut, le nombre de coeurs.
+        sprt (tuple): Les paramètres `(elo0, elo1, alpha, beta)` du test
+            séquentiel qui arrête une paire dès qu'il est tranché; None pour
+            jouer toutes les parties.
+        graine (int): La graine du tournoi.
+    Returns:
+        dict: Le classement des participants, le résumé de chaque paire et la durée.
+    Raises:
+        ValueError: Le mode est inconnu, deux participants portent le même nom
+            ou le journal est incompatible avec les participants.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Le mode {mode} est inconnu.")
+    noms = [participant.nom for participant in participants]
+    if len(set(noms)) != len(noms):
+        raise ValueError("Les noms des participants doivent être uniques.")
+    par_nom = dict(zip(noms, participants))
+    if mode == 'ronde':
+        paires = list(combinations(noms, 2))
+    else:
+        paires = [(noms[0], nom) for nom in noms[1:]]
+    parties += parties % 2
+    processus = processus or os.cpu_count() or 1
+
+    résultats = {paire: {'victoires': [0, 0], 'nulles': 0, 'parties': 0, 'coups': 0}
+                 for paire in paires}
+    jouées = _lire_journal(journal, participants, résultats) if journal else set()
+    à_jouer = ((paire, numéro) for numéro in range(parties) for paire in paires
+               if (paire, numéro) not in jouées)
+
+    début = perf_counter()
+    fichier = open(journal, 'a', encoding='utf-8') if journal else None
+    try:
+        if fichier is not None:
+            fichier.write(json.dumps({'participants': [list(participant)
+                                                       for participant in participants]},
+                                     ensure_ascii=False) + '\n')
+        with ProcessPoolExecutor(max_workers=processus) as exécuteur:
+            en_vol = {}
+            while True:
+                # Garder chaque processus occupé sans soumettre d'avance les parties
+                # qu'un test séquentiel tranché rendrait inutiles
+                for paire, numéro in à_jouer:
+                    if _décision_sprt(résultats[paire], sprt)[1] is not None:
+                        continue
+                    # Les participants de la paire commencent à tour de rôle
+                    premier, second = paire if numéro % 2 == 0 else paire[::-1]
+                    graine_partie = graine ^ zlib.crc32(f'{premier}|{second}|{numéro}'.encode())
+                    en_vol[exécuteur.submit(_jouer_partie, par_nom[premier], par_nom[second],
+                                            graine_partie)] = (paire, numéro, (premier, second))
+                    if len(en_vol) >= 2 * processus:
+                        break
+                if not en_vol:
+                    break
+                terminées, _ = wait(en_vol, return_when=FIRST_COMPLETED)
+                for future in terminées:
+                    paire, numéro, côtés = en_vol.pop(future)
+                    vainqueur, coups = future.result()
+                    gagnant = None if vainqueur is None else côtés[vainqueur]
+                    _ajouter(résultats[paire], paire, gagnant, coups)
+                    if fichier is not None:
+                        fichier.write(json.dumps({'paire': list(paire), 'partie': numéro,
+                                                  'gagnant': gagnant, 'coups': coups},
+                                                 ensure_ascii=False) + '\n')
+                        fichier.flush()
+    finally:
+        if fichier is not None:
+            fichier.close()
+
+    return {
+        'mode': mode,
+        'classement': classement(noms, résultats),
+        'paires': [_résumer_paire(paire, résultats[paire], sprt) for paire in paires],
+        'durée': perf_counter() - début,
+        'processus': processus,
+    }
+
+
+def afficher_tournoi(résultats):
+    """Formater les résultats d'un tournoi.
+    Args:
+        résultats (dict): Les résultats retournés par `tournoi`.
+    Returns:
+        str: Le classement et le résultat de chaque paire sous forme de texte.
+    """
+    aff = f"Tournoi ({résultats['mode']}) sur {résultats['processus']} processus " \
+        f"en {résultats['durée']:.2f} s\n"
+    for rang, ligne in enumerate(résultats['classement'], 1):
+        aff += f"{rang:>3}. {ligne['nom']:<20} {ligne['elo']:+7.0f} ± {ligne['marge']:<5.0f} " \
+            f"{ligne['parties']:>5} parties, score {100 * ligne['score']:.1f} %\n"
+    aff += "\n"
+    for paire in résultats['paires']:
+        bas, haut = paire['intervalle']
+        aff += f"{paire['joueurs'][0]} - {paire['joueurs'][1]}: " \
+            f"+{paire['victoires'][0]} ={paire['nulles']} -{paire['victoires'][1]} " \
+            f"({paire['parties']} parties), Elo {paire['elo']:+.0f} [{bas:+.0f}, {haut:+.0f}]"
+        if paire['llr'] is not None:
+            aff += f", LLR {paire['llr']:.2f}"
+            if paire['décision'] is not None:
+                aff += f" ({paire['décision']} acceptée)"
+        aff += "\n"
+    return aff
+
+
+if __name__ == '__main__':
+    analyseur = ArgumentParser(description="Squadro - Tournoi entre configurations du robot")
+    analyseur.add_argument('participants', nargs='+', type=analyser_participant,
+                           metavar='[NOM=]STRATEGIE[:TEMPS[:POIDS]]',
+                           help="Participants, par exemple hasard, ab=alphabeta:0.1 ou "
+                           "pondéré=alphabeta:0.1:poids.json.")
+    analyseur.add_argument('--mode', choices=MODES, default='ronde',
+                           help="À la ronde ou en défi du premier participant.")
+    analyseur.add_argument('--parties', type=int, default=PARTIES,
+                           help="Nombre de parties par paire.")
+    analyseur.add_argument('--journal', default=None, metavar='FICHIER',
+                           help="Journal des parties jouées, d'où reprendre le tournoi.")
+    analyseur.add_argument('--processus', type=int, default=None,
+                           help="Nombre de processus.")
+    analyseur.add_argument('--sprt', type=float, nargs=2, default=None,
+                           metavar=('ELO0', 'ELO1'),
+                           help="Arrêter une paire dès que le test séquentiel de H0 "
+                           "(écart ELO0) contre H1 (écart ELO1) est tranché.")
+    analyseur.add_argument('--alpha', type=float, default=0.05,
+                           help="Risque de première espèce du test séquentiel.")
+    analyseur.add_argument('--beta', type=float, default=0.05,
+                           help="Risque de seconde espèce du test séquentiel.")
+    analyseur.add_argument('--graine', type=int, default=0, help="Graine du tournoi.")
+    arguments = analyseur.parse_args()
+    print(afficher_tournoi(tournoi(
+        arguments.participants, arguments.mode, arguments.parties, arguments.journal,
+        arguments.processus,
+        (*arguments.sprt, arguments.alpha, arguments.beta) if arguments.sprt else None,
+        arguments.graine)))
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Module de la table de transposition du jeu Squadro
+Ce module possède une table de transposition indexée par les clés de Zobrist
+des positions compactes du module `moteur`. La table est préallouée à une
+taille fixe (en Mo) et chaque indice possède deux cases: une case remplacée
+selon la profondeur et une case toujours remplacée.
+Attributes:
+    ZOBRIST (tuple): Clé aléatoire de 64 bits pour chaque pion et chaque position.
+    ZOBRIST_TRAIT (int): Clé aléatoire de 64 bits du joueur 2 au trait.
+    EXACT (int): Type d'une entrée dont le score est exact.
+    MINIMUM (int): Type d'une entrée dont le score est une borne inférieure.
+    MAXIMUM (int): Type d'une entrée dont le score est une borne supérieure.
+Classes:
+    * TableTransposition - Table de transposition de taille fixe.
+Functions:
+    * hacher - Calcule la clé de Zobrist d'une position.
+    * hacher_coup - Met à jour une clé de Zobrist après un coup.
+"""
+from array import array
+from random import Random
+
+from moteur import BITS_PION, BIT_TRAIT, MASQUE_PION
+
+_GRAINE_ZOBRIST = 0x5C0AD2
+_MASQUE_PIONS = (1 << BIT_TRAIT) - 1
+
+_générateur = Random(_GRAINE_ZOBRIST)
+ZOBRIST = tuple(
+    tuple(_générateur.getrandbits(64) for _ in range(16))
+    for _ in range(10))
+ZOBRIST_TRAIT = _générateur.getrandbits(64)
+del _générateur
+
+EXACT = 1
+MINIMUM = 2
+MAXIMUM = 3
+
+# Disposition des données d'une entrée (64 bits)
+_DÉCALAGE_SCORE = 1 << 15  # les scores sont stockés avec ce décalage sur 16 bits
+_BITS_PROFONDEUR = 16
+_BITS_TYPE = 24
+_BITS_COUP = 26
+_BITS_GÉNÉRATION = 32
+_OCTETS_ENTRÉE = 16  # 8 octets de clé et 8 octets de données
+
+
+def hacher(code):
+    """Calculer la clé de Zobrist d'une position.
+    Args:
+        code (int): L'entier compact représentant la position.
+    Returns:
+        int: La clé de Zobrist de 64 bits.
+    """
+    clé = ZOBRIST_TRAIT if (code >> BIT_TRAIT) & 1 else 0
+    for ind in range(10):
+        clé ^= ZOBRIST[ind][(code >> (ind * BITS_PION)) & MASQUE_PION]
+    return clé
+
+
+def hacher_coup(clé, code, nouveau):
+    """Mettre à jour une clé de Zobrist après un coup.
+    Seuls les pions ayant changé de position sont considérés.
+    Args:
+        clé (int): La clé de Zobrist de la position `code`.
+        code (int): L'entier compact de la position avant le coup.
+        nouveau (int): L'entier compact de la position après le coup.
+    Returns:
+        int: La clé de Zobrist de la position `nouveau`.
+    """
+    clé ^= ZOBRIST_TRAIT
+    différence = (code ^ nouveau) & _MASQUE_PIONS
+    while différence:
+        ind = ((différence & -différence).bit_length() - 1) // BITS_PION
+        décalage = ind * BITS_PION
+        clé ^= ZOBRIST[ind][(code >> décalage) & MASQUE_PION] \
+            ^ ZOBRIST[ind][(nouveau >> décalage) & MASQUE_PION]
+        différence &= ~(MASQUE_PION << décalage)
+    return clé
+
+
+class TableTransposition:
+    '''
+    Table de transposition de taille fixe avec deux cases par indice.
+    La case paire est remplacée si la nouvelle entrée est au moins aussi profonde
+    ou si elle provient d'une recherche précédente; la case impaire est toujours
+    remplacée.
+    '''
+
+    def __init__(self, taille_mo=16):
+        """Constructeur de la classe TableTransposition.
+        Args:
+            taille_mo (int): La taille maximale de la table en Mo. Le nombre
+                d'entrées est arrondi à la puissance de deux inférieure.
+        """
+        entrées = max(2, (taille_mo * 1024 * 1024) // _OCTETS_ENTRÉE)
+        entrées = 1 << (entrées.bit_length() - 1)
+        self.masque = (entrées // 2) - 1
+        self.clés = array('Q', bytes(8 * entrées))
+        self.données = array('Q', bytes(8 * entrées))
+        self.génération = 0
+        self.succès = 0
+        self.échecs = 0
+        self.collisions = 0
+
+    def __len__(self):
+        return len(self.clés)
+
+    def nouvelle_recherche(self):
+        """Débuter une nouvelle recherche.
+        Les entrées des recherches précédentes restent disponibles, mais peuvent
+        être remplacées en priorité.
+        """
+        self.génération = (self.génération + 1) & 0xFF
+
+    def vider(self):
+        """Effacer toutes les entrées, sans réallouer la table, et remettre les
+        compteurs à zéro."""
+        vide = bytes(8 * len(self.clés))
+        memoryview(self.clés).cast('B')[:] = vide
+        memoryview(self.données).cast('B')[:] = vide
+        self.succès = self.échecs = self.collisions = 0
+
+    def sonder(self, clé):
+        """Chercher une position dans la table.
+        Args:
+            clé (int): La clé de Zobrist de la position.
+        Returns:
+            tuple/None: Le score, la profondeur, le type et le meilleur coup de
+                l'entrée; None si la position est absente.
+        """
+        case = (clé & self.masque) << 1
+        for ind in (case, case + 1):
+            if self.clés[ind] == clé:
+                données = self.données[ind]
+                if données:
+                    self.succès += 1
+                    return ((données & 0xFFFF) - _DÉCALAGE_SCORE,
+                            (données >> _BITS_PROFONDEUR) & 0xFF,
+                            (données >> _BITS_TYPE) & 0x3,
+                            (données >> _BITS_COUP) & 0x7)
+        self.échecs += 1
+        if self.données[case] or self.données[case + 1]:
+            self.collisions += 1
+        return None
+
+    def enregistrer(self, clé, score, profondeur, type_entrée, coup):
+        """Enregistrer le résultat d'une recherche.
+        Args:
+            clé (int): La clé de Zobrist de la position.
+            score (int): Le score de la position.
+            profondeur (int): La profondeur de la recherche ayant produit le score.
+            type_entrée (int): EXACT, MINIMUM ou MAXIMUM.
+            coup (int): Le meilleur coup trouvé (0 si aucun).
+        """
+        case = (clé & self.masque) << 1
+        données_profondeur = self.données[case]
+        if (self.clés[case] == clé or not données_profondeur
+                or profondeur >= (données_profondeur >> _BITS_PROFONDEUR) & 0xFF
+                or (données_profondeur >> _BITS_GÉNÉRATION) != self.génération):
+            ind = case
+        else:
+            ind = case + 1
+        self.clés[ind] = clé
+        self.données[ind] = ((score + _DÉCALAGE_SCORE)
+                             | profondeur << _BITS_PROFONDEUR
+                             | type_entrée << _BITS_TYPE
+                             | coup << _BITS_COUP
+                             | self.génération << _BITS_GÉNÉRATION)
+
+    def statistiques(self):
+        """Produire les compteurs de la table.
+        Returns:
+            dict: Le nombre de succès, d'échecs et de collisions ainsi que
+                le taux de succès.
+        """
+        sondages = self.succès + self.échecs
+        return {'succès': self.succès, 'échecs': self.échecs,
+                'collisions': self.collisions,
+                'taux': self.succès / sondages if sondages else 0.0}